@@ -0,0 +1,67 @@
+import threading
+import time
+from result_cache import create_cache
+
+# App config keys that shape the shared analyzers
+ANALYZER_CONFIG_KEYS = ('RESULT_CACHE_SIZE', 'RESULT_CACHE_MAX_BYTES', 'RESULT_CACHE_PATH',
+                        'KEYWORD_MODE', 'SENTENCE_WEIGHTING', 'SENTIMENT_BACKEND', 'SENTIMENT_THRESHOLDS',
+                        'LINEAR_MODEL_PATH', 'METRICS_DIR')
+
+_config = {}
+_analyzers = {}
+_cache = None
+_cache_ready = False
+_lock = threading.Lock()
+
+
+def configure_analyzers(config):
+    """Record analyzer settings from app config and apply the backend settings; nothing is loaded yet"""
+    global _config
+    _config = {key: config.get(key) for key in ANALYZER_CONFIG_KEYS}
+    from sentiment_backends import configure_backends
+    configure_backends(_config)
+    return dict(_config)
+
+
+def get_analyzer(keyword_mode=None):
+    """Return this process's shared SentimentAnalyzer for a keyword mode, creating it once"""
+    mode = keyword_mode or _config.get('KEYWORD_MODE') or 'fast'
+    analyzer = _analyzers.get(mode)
+    if analyzer is None:
+        with _lock:
+            analyzer = _analyzers.get(mode)
+            if analyzer is None:
+                from sentiment_analyzer import SentimentAnalyzer
+                analyzer = SentimentAnalyzer(cache=_shared_cache(), keyword_mode=mode,
+                                             sentence_weighting=_config.get('SENTENCE_WEIGHTING') or 'length',
+                                             backend=_config.get('SENTIMENT_BACKEND') or 'textblob')
+                _analyzers[mode] = analyzer
+    return analyzer
+
+
+def _shared_cache():
+    # Called under _lock; one cache serves every keyword mode (keys are namespaced by mode)
+    global _cache, _cache_ready
+    if not _cache_ready:
+        _cache = create_cache(_config)
+        _cache_ready = True
+    return _cache
+
+
+def preload():
+    """Load every sentiment backend, TextBlob and heavy modules into this process ahead of time.
+
+    Meant for the gunicorn master under --preload: workers forked afterwards share
+    these pages copy-on-write instead of each loading them on first request. It
+    deliberately creates no analyzer or cache, since their SQLite handle and
+    locks must be opened after the fork. Returns the seconds spent.
+    """
+    started = time.perf_counter()
+    from textblob import TextBlob
+    from sentiment_backends import SENTIMENT_BACKENDS, get_backend
+    import pandas  # noqa: F401  (CSV uploads)
+
+    for name in SENTIMENT_BACKENDS:
+        get_backend(name)
+    TextBlob('warm up the pattern lexicon').sentiment
+    return time.perf_counter() - started
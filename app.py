@@ -1,13 +1,16 @@
 import os
+import json
 import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from db_config import configure_engine, database_settings, engine_options
+from sentiment_backends import SENTIMENT_BACKENDS, parse_thresholds
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging (DEBUG formats a record for every SQL statement and request)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
 
 class Base(DeclarativeBase):
     pass
@@ -20,17 +23,95 @@ app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# configure the database
+# configure the database; SQLite gets WAL and a busy timeout per connection, PostgreSQL
+# a sized pool and statement timeout (SQLITE_* / DB_* variables, see db_config.py)
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///sentiment_app.db")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+app.config.update(database_settings())
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"], app.config, {
     "pool_recycle": 300,
     "pool_pre_ping": True,
-}
+    "insertmanyvalues_page_size": int(os.environ.get("INSERT_BATCH_SIZE", 1000)),
+})
+app.config["INSERT_BATCH_SIZE"] = int(os.environ.get("INSERT_BATCH_SIZE", 1000))
 
 # File upload configuration
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['EXPORT_FOLDER'] = 'exports'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', 256)) * 1024 * 1024
+
+# Result cache for repeated texts: entry limit (0 disables), optional byte budget
+# and optional SQLite file shared between processes
+app.config['RESULT_CACHE_SIZE'] = int(os.environ.get('RESULT_CACHE_SIZE', 50000))
+app.config['RESULT_CACHE_MAX_BYTES'] = int(os.environ.get('RESULT_CACHE_MAX_MB', 64)) * 1024 * 1024
+app.config['RESULT_CACHE_PATH'] = os.environ.get('RESULT_CACHE_PATH')
+
+# Keyword extraction: 'fast' (regex words and bigrams) or 'accurate' (TextBlob noun phrases)
+app.config['KEYWORD_MODE'] = os.environ.get('KEYWORD_MODE', 'fast')
+
+# Default sentiment backend: 'textblob', 'vader' (rule-based, social-media aware) or
+# 'linear' (hashed-feature model from LINEAR_MODEL_PATH); requests and uploads may override it
+app.config['SENTIMENT_BACKEND'] = os.environ.get('SENTIMENT_BACKEND', 'textblob')
+if app.config['SENTIMENT_BACKEND'] not in SENTIMENT_BACKENDS:
+    raise ValueError(f"Unknown SENTIMENT_BACKEND: {app.config['SENTIMENT_BACKEND']}")
+# Model file for the 'linear' backend (default data/hashed_linear.npz, see `flask train-linear-model`)
+app.config['LINEAR_MODEL_PATH'] = os.environ.get('LINEAR_MODEL_PATH')
+
+# Label thresholds per backend as 'backend:positive:negative,...' (e.g. 'textblob:0.15:-0.15');
+# unlisted backends keep their defaults. Stored rows follow after `flask relabel`
+app.config['SENTIMENT_THRESHOLDS'] = parse_thresholds(os.environ.get('SENTIMENT_THRESHOLDS'))
+
+# Sentence-level mode: how sentence scores combine into the document score
+# ('mean', 'length', 'intensity' or 'recency'; see sentences.py)
+app.config['SENTENCE_WEIGHTING'] = os.environ.get('SENTENCE_WEIGHTING', 'length')
+
+# Limits for /api/analyze/batch requests
+app.config['BATCH_MAX_ITEMS'] = int(os.environ.get('BATCH_MAX_ITEMS', 1000))
+app.config['BATCH_MAX_BYTES'] = int(os.environ.get('BATCH_MAX_MB', 5)) * 1024 * 1024
+
+# Upload deduplication: 'exact' collapses texts equal up to whitespace, 'near' also texts
+# whose MinHash similarity reaches DEDUP_THRESHOLD, 'off' stores every line as read. With
+# 'off' or 'exact' TXT workers read byte ranges and score repeats too (dedup then applies to
+# what they return); 'near' reads on one process and scores each distinct text once.
+# DEDUP_STORE 'fanout' stores a row per occurrence; 'count' one row per text with its count
+app.config['DEDUP_MODE'] = os.environ.get('DEDUP_MODE', 'exact').lower()
+if app.config['DEDUP_MODE'] not in ('off', 'exact', 'near'):
+    raise ValueError(f"Unknown DEDUP_MODE: {app.config['DEDUP_MODE']}")
+app.config['DEDUP_STORE'] = os.environ.get('DEDUP_STORE', 'fanout').lower()
+if app.config['DEDUP_STORE'] not in ('fanout', 'count'):
+    raise ValueError(f"Unknown DEDUP_STORE: {app.config['DEDUP_STORE']}")
+app.config['DEDUP_THRESHOLD'] = float(os.environ.get('DEDUP_THRESHOLD', 0.8))
+if not 0 < app.config['DEDUP_THRESHOLD'] <= 1:
+    raise ValueError(f"DEDUP_THRESHOLD must be in (0, 1], not {app.config['DEDUP_THRESHOLD']}")
+
+# Micro-batching for /analyze: concurrent requests arriving within the window (ms) are
+# scored in one batch and stored in one commit, up to the max size; 0 disables. Pays off
+# with threaded workers (e.g. gunicorn --threads 16)
+app.config['ANALYZE_BATCH_WINDOW_MS'] = float(os.environ.get('ANALYZE_BATCH_WINDOW_MS', 0))
+app.config['ANALYZE_BATCH_MAX_SIZE'] = int(os.environ.get('ANALYZE_BATCH_MAX_SIZE', 64))
+
+# Background upload jobs run on this many threads per process
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 1))
+# Running jobs with no progress for this long are marked failed when a process starts,
+# as their worker died (deploy, OOM, worker restart)
+app.config['JOB_STALE_SECONDS'] = int(os.environ.get('JOB_STALE_SECONDS', 900))
+
+# Instrumentation: /metrics is open unless METRICS_TOKEN is set; a PROFILE_SAMPLE_RATE
+# above 0 profiles that fraction of requests (optionally only PROFILE_ROUTES) into PROFILE_DIR
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+# Directory where each process (gunicorn and pool workers) writes its metrics so any worker's
+# /metrics reports them summed; clear it when redeploying. Unset, each worker reports only its own
+app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR')
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+app.config['PROFILE_ROUTES'] = ([route.strip() for route in os.environ['PROFILE_ROUTES'].split(',')]
+                                if os.environ.get('PROFILE_ROUTES') else None)
+
+# Load lexicons, TextBlob and pandas at import, e.g. in the `gunicorn --preload` master so
+# forked workers share them copy-on-write; otherwise they load on first use in each process
+app.config['PRELOAD_MODELS'] = os.environ.get('PRELOAD_MODELS', '').lower() in ('1', 'true', 'yes')
+
+# Analysis execution: 0 workers analyzes uploads in the request process
+app.config['ANALYSIS_WORKERS'] = int(os.environ.get('ANALYSIS_WORKERS', 0))
+app.config['ANALYSIS_CHUNK_SIZE'] = int(os.environ.get('ANALYSIS_CHUNK_SIZE', 2000))
 
 # Initialize extensions
 db.init_app(app)
@@ -38,20 +119,50 @@ login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 
-# Create upload and export directories
+# Create upload directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
 
 with app.app_context():
     # Import models and routes
-    from models import User, SentimentAnalysis
+    from models import (User, SentimentAnalysis, AnalysisJob, Keyword, AnalysisKeyword,
+                        UserSentimentAggregate, SentimentRollup, ReanalysisJob)
     from routes import register_routes
+    from commands import register_commands
+    from metrics import register_metrics
     
-    # Create tables
+    configure_engine(db.engine, app.config)
+    
+    # Create tables and add new nullable columns (new indexes need `flask create-indexes`)
     db.create_all()
+    from database import ensure_columns
+    ensure_columns()
+    # Full-text index over analysis texts, kept in sync by the database itself,
+    # and the interned keyword layout
+    from search import ensure_search_index
+    ensure_search_index()
+    # Aggregates and rollups for history from before they were maintained
+    from database import backfill_aggregates
+    if backfill_aggregates():
+        logging.getLogger(__name__).info('Built sentiment aggregates and rollups from stored analyses')
+    # Don't hand pooled connections to forked workers
+    db.engine.dispose()
     
     # Register routes
     register_routes(app)
+    register_commands(app)
+    register_metrics(app)
+
+if app.config['PRELOAD_MODELS']:
+    from analyzer_registry import preload
+    logging.getLogger(__name__).info('Preloaded analysis models in %.2fs', preload())
+
+@app.template_filter('from_json')
+def from_json_filter(value):
+    """Parse a JSON string column (e.g. keywords) in templates"""
+    try:
+        return json.loads(value) if value else None
+    except ValueError:
+        return None
 
 @login_manager.user_loader
 def load_user(user_id):
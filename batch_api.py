@@ -0,0 +1,61 @@
+import json
+
+# Body formats accepted by /api/analyze/batch
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-seq')
+
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+# Options a JSON object body may carry next to "texts"
+OPTION_KEYS = ('persist', 'keywords', 'source_name', 'sentences', 'weighting', 'backend')
+
+
+class BatchRequestError(ValueError):
+    """Invalid batch request; status is the HTTP code to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_batch_body(body, content_type, max_items):
+    """Decode a batch body into (texts, options).
+
+    Accepts a JSON array of texts, a JSON object {"texts": [...]} carrying any of
+    OPTION_KEYS, or NDJSON with one text per line. Items may be strings or objects
+    with a "text" field.
+    """
+    options = {}
+    try:
+        if content_type in NDJSON_TYPES:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            payload = json.loads(body)
+            if isinstance(payload, dict):
+                items = payload.get('texts')
+                options = {key: payload[key] for key in OPTION_KEYS if key in payload}
+            else:
+                items = payload
+    except ValueError:
+        raise BatchRequestError('Body is not valid JSON or NDJSON')
+
+    if not isinstance(items, list) or not items:
+        raise BatchRequestError('Expected a non-empty list of texts')
+    if len(items) > max_items:
+        raise BatchRequestError(f'Too many texts: {len(items)} (limit {max_items})', 413)
+
+    texts = []
+    for index, item in enumerate(items):
+        text = item.get('text') if isinstance(item, dict) else item
+        if not isinstance(text, str) or not text.strip():
+            raise BatchRequestError(f'Item {index} has no text')
+        texts.append(text.strip())
+    return texts, options
+
+
+def parse_flag(value, default=True):
+    """Read a boolean option given as JSON or as a query string value"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.lower() not in FALSE_VALUES
+    return bool(value)
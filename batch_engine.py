@@ -0,0 +1,212 @@
+import numpy as np
+from textblob.en import sentiment as pattern_sentiment
+from textblob._text import (
+    ABBREVIATIONS, EMOTICONS, PUNCTUATION, RE_ABBR1, RE_ABBR2, RE_ABBR3, RE_EMOTICONS,
+    RE_SARCASM, replacements
+)
+
+# Characters split off the start/end of a token (periods are handled separately)
+_EDGE_PUNCTUATION = PUNCTUATION.replace('.', '')
+_CONTRACTIONS = tuple(replacements.items())
+
+
+def _join_emoticon(match):
+    return match.group(1).replace(' ', '') + match.group(2)
+
+
+def tokenize(text):
+    """Split text into lowercase tokens the same way the pattern sentiment lexicon does"""
+    for contraction, replacement in _CONTRACTIONS:
+        if contraction in text:
+            text = text.replace(contraction, replacement)
+    text = (text.replace('“', ' “ ').replace('”', ' ” ')
+                .replace('‘', ' ‘ ').replace('’', ' ’ ')
+                .replace("'", " ' ").replace('"', ' " '))
+
+    tokens = []
+    split_punctuation = False
+    for t in text.split():
+        # Fast path: plain words need no punctuation handling
+        if t.isalnum():
+            tokens.append(t)
+            continue
+        split_punctuation = True
+        tail = []
+        while t and t[0] in _EDGE_PUNCTUATION:
+            tokens.append(t[0])
+            t = t[1:]
+        while t and (t[-1] in _EDGE_PUNCTUATION or t[-1] == '.'):
+            if t[-1] in _EDGE_PUNCTUATION:
+                tail.append(t[-1])
+                t = t[:-1]
+            if t.endswith('...'):
+                tail.append('...')
+                t = t[:-3].rstrip('.')
+            if t.endswith('.'):
+                if (t in ABBREVIATIONS or RE_ABBR1.match(t) or
+                        RE_ABBR2.match(t) or RE_ABBR3.match(t)):
+                    break
+                tail.append('.')
+                t = t[:-1]
+        if t:
+            tokens.append(t)
+        tokens.extend(reversed(tail))
+
+    if split_punctuation:
+        # Re-join sarcasm marks and emoticons that were split apart above
+        joined = RE_SARCASM.sub('(!)', ' '.join(tokens))
+        tokens = RE_EMOTICONS.sub(_join_emoticon, joined).split()
+    return [t.lower() for t in tokens]
+
+
+class LexiconTable:
+    """Compact token -> (polarity, subjectivity, intensity) table built from the pattern lexicon"""
+
+    UNKNOWN = 0
+
+    def __init__(self, lexicon=None):
+        lexicon = pattern_sentiment if lexicon is None else lexicon
+        self.negations = frozenset(pattern_sentiment.negations)
+
+        words = ['']
+        scores = [(0.0, 0.0, 1.0)]
+        modifiers = [False]
+        for word, tags in lexicon.items():
+            words.append(word)
+            scores.append(tuple(tags[None]))
+            modifiers.append(any(pos in tags for pos in pattern_sentiment.modifiers))
+        self.known_count = len(words)
+
+        # Tokens outside the lexicon that still change the score
+        self.emoticons = {}
+        for (_, polarity), faces in EMOTICONS.items():
+            for face in faces:
+                face = face.lower()
+                if not face.isalpha() and len(face) <= 5 and face not in PUNCTUATION:
+                    self.emoticons.setdefault(face, polarity)
+        extra = [w for w in sorted(self.negations | set(self.emoticons) | {'!', '(!)'})
+                 if w not in lexicon]
+        for word in extra:
+            words.append(word)
+            scores.append((0.0, 0.0, 1.0))
+            modifiers.append(False)
+
+        self.index = {word: i for i, word in enumerate(words) if word}
+        self.words = words
+        self.polarity = np.array([s[0] for s in scores], dtype=np.float64)
+        self.subjectivity = np.array([s[1] for s in scores], dtype=np.float64)
+        self.intensity = np.array([s[2] for s in scores], dtype=np.float64)
+        self.modifier = np.array(modifiers, dtype=bool)
+        self.known = np.arange(len(words)) < self.known_count
+        self.known[self.UNKNOWN] = False
+        # Texts containing any of these need the sequential negation/modifier rules
+        self.special = self.modifier.copy()
+        self.special[self.known_count:] = True
+        for word in self.negations:
+            if word in self.index:
+                self.special[self.index[word]] = True
+
+        # Plain lists are faster than arrays for scalar lookups in the sequential path
+        self._polarity = self.polarity.tolist()
+        self._subjectivity = self.subjectivity.tolist()
+        self._intensity = self.intensity.tolist()
+        self._modifier = self.modifier.tolist()
+
+    def lookup(self, tokens):
+        """Map tokens to table ids, using 0 for unknown tokens"""
+        get = self.index.get
+        return [get(t, 0) for t in tokens]
+
+    def assess(self, tokens, ids):
+        """Return (polarity, subjectivity) pairs for one text, following pattern's rules"""
+        known_count = self.known_count
+        a = []
+        m = None  # preceding modifier
+        n = None  # preceding negation
+        for w, i in zip(tokens, ids):
+            if 0 < i < known_count:
+                p, s, intensity = self._polarity[i], self._subjectivity[i], self._intensity[i]
+                if m is None:
+                    a.append([p, s, intensity, 1])
+                else:
+                    prev = a[-1]
+                    prev[0] = max(-1.0, min(p * prev[2], 1.0))
+                    prev[1] = max(-1.0, min(s * prev[2], 1.0))
+                    prev[2] = intensity
+                if n is not None:
+                    a[-1][2] = 1.0 / a[-1][2]
+                    a[-1][3] = -1
+                m = w if self._modifier[i] else None
+                n = w if w in self.negations else None
+            else:
+                if w in self.negations:
+                    n = w
+                elif n and len(w.strip("'")) > 1:
+                    n = None
+                if n is not None and m is not None and m.endswith('ly'):
+                    a[-1][3] = -1
+                    n = None
+                elif m and len(w) > 2:
+                    m = None
+                if w == '!' and a:
+                    a[-1][0] = max(-1.0, min(a[-1][0] * 1.25, 1.0))
+                if w == '(!)':
+                    a.append([0.0, 1.0, 1.0, 1])
+                if w in self.emoticons:
+                    a.append([self.emoticons[w], 1.0, 1.0, 1])
+        return [(p * -0.5 if neg < 0 else p, s) for p, s, _, neg in a]
+
+
+class BatchSentimentEngine:
+    """Score many texts at once against a shared LexiconTable"""
+
+    def __init__(self, table=None):
+        self.table = table if table is not None else get_lexicon_table()
+
+    def score(self, token_lists):
+        """Return (polarity, subjectivity) arrays for a list of token lists"""
+        table = self.table
+        count = len(token_lists)
+        lengths = np.fromiter((len(t) for t in token_lists), dtype=np.int64, count=count)
+        flat_ids = np.fromiter(
+            (i for tokens in token_lists for i in table.lookup(tokens)),
+            dtype=np.int64, count=int(lengths.sum())
+        )
+        text_index = np.repeat(np.arange(count), lengths)
+
+        needs_rules = np.bincount(text_index, weights=table.special[flat_ids],
+                                  minlength=count) > 0
+
+        # Texts without modifiers/negations/emphasis: every known token scores as-is
+        simple = table.known[flat_ids] & ~needs_rules[text_index]
+        simple_ids = flat_ids[simple]
+        simple_texts = text_index[simple]
+        polarity_sum = np.bincount(simple_texts, weights=table.polarity[simple_ids],
+                                   minlength=count)
+        subjectivity_sum = np.bincount(simple_texts, weights=table.subjectivity[simple_ids],
+                                       minlength=count)
+        assessed = np.bincount(simple_texts, minlength=count).astype(np.float64)
+
+        # Remaining texts go through pattern's sequential negation/modifier rules
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        for t in np.flatnonzero(needs_rules):
+            ids = flat_ids[offsets[t]:offsets[t + 1]].tolist()
+            scores = table.assess(token_lists[t], ids)
+            if scores:
+                polarity_sum[t] = sum(p for p, _ in scores)
+                subjectivity_sum[t] = sum(s for _, s in scores)
+                assessed[t] = len(scores)
+
+        divisor = np.maximum(assessed, 1.0)
+        return polarity_sum / divisor, subjectivity_sum / divisor
+
+
+_lexicon_table = None
+
+
+def get_lexicon_table():
+    """Return the process-wide LexiconTable, building it on first use"""
+    global _lexicon_table
+    if _lexicon_table is None:
+        _lexicon_table = LexiconTable()
+    return _lexicon_table
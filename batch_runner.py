@@ -0,0 +1,264 @@
+import glob
+import hashlib
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+from database import AGGREGATE_COUNTERS, bulk_insert_analyses
+from exporter import EXPORT_COLUMNS, EXPORT_FORMATS, stream_jsonl, stream_parquet
+from mmap_reader import MappedLines, read_range
+
+# Shard assignment is a pure function of these sizes and each file's name and
+# bytes; every machine splitting one backfill must use the same values
+SHARD_BLOCK_BYTES = 16 << 20  # TXT files are split into line-aligned blocks of about this size
+CSV_BLOCK_TEXTS = 20000  # CSV files are split into blocks of this many texts
+
+# Rows per output file before the next part is started
+ROWS_PER_FILE = 500000
+
+OUTPUT_FORMATS = ('jsonl', 'parquet', 'db')
+
+# Result keys written to JSONL/Parquet parts; rows only get ids when loaded
+OUTPUT_COLUMNS = [column for column in EXPORT_COLUMNS if column != 'id']
+
+_STREAMS = {'jsonl': (stream_jsonl, 'w'), 'parquet': (stream_parquet, 'wb')}
+
+
+def shard_owner(name, block, shard_count):
+    """Shard that processes one block of an input file.
+
+    Blocks go round-robin from an offset hashed from the file name, so each
+    file is split evenly and no two files start on the same shard.
+    """
+    offset = int.from_bytes(hashlib.blake2b(name.encode('utf-8'), digest_size=8).digest(), 'big')
+    return (offset + block) % shard_count
+
+
+def check_inputs(paths, shard_index, shard_count):
+    """Validate a shard's arguments; files are identified by name, which must be unique"""
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise ValueError(f'Shard {shard_index} of {shard_count} does not exist; '
+                         f'indexes run from 0 to count - 1')
+    names = {}
+    for path in paths:
+        name = os.path.basename(path)
+        if '.' not in name or name.rsplit('.', 1)[1].lower() not in ('txt', 'csv'):
+            raise ValueError(f'Only .txt and .csv files are supported: {path}')
+        if name in names:
+            raise ValueError(f'Input file names must be unique: {names[name]} and {path}')
+        names[name] = path
+
+
+def iter_shard_results(paths, shard_index, shard_count, processor, user_id=None, backend=None,
+                       progress=None):
+    """Analyze this shard's blocks of every input file, yielding result chunks in file order.
+
+    TXT blocks are byte ranges the pool workers map and read themselves; CSV files
+    are parsed in full on every shard (quoted cells may span lines) and only the
+    shard's blocks of texts are analyzed.
+    """
+    for path in paths:
+        name = os.path.basename(path)
+        blocks = 0
+        if name.rsplit('.', 1)[1].lower() == 'txt':
+            with MappedLines(path) as lines:
+                owned = [byte_range for block, byte_range in enumerate(lines.split(SHARD_BLOCK_BYTES))
+                         if shard_owner(name, block, shard_count) == shard_index]
+            blocks = len(owned)
+            if owned and processor.workers > 0:
+                for results, _ in processor.iter_analyzed_ranges(path, name, user_id, backend, owned):
+                    yield results
+            else:
+                for start, end in owned:
+                    yield processor.analyze_file_content(read_range(path, start, end), name, user_id, backend)
+        else:
+            for block, (texts, _) in enumerate(processor.iter_text_chunks(path, name, CSV_BLOCK_TEXTS)):
+                if shard_owner(name, block, shard_count) == shard_index:
+                    blocks += 1
+                    yield processor.analyze_file_content(texts, name, user_id, backend)
+        if progress:
+            progress(name, blocks)
+
+
+class ShardStats:
+    """Additive sentiment counters for one shard's results, overall and per input file"""
+
+    def __init__(self):
+        self.totals = _empty_counters()
+        self.by_source = {}
+        self.backends = set()
+        self.model_versions = set()
+
+    def count(self, chunks):
+        """Yield the results of each chunk, counting them on the way through"""
+        for results in chunks:
+            for result in results:
+                source = self.by_source.get(result['source_name'])
+                if source is None:
+                    source = self.by_source[result['source_name']] = _empty_counters()
+                for counters in (self.totals, source):
+                    _add_result(counters, result)
+                self.backends.add(result['backend'])
+                self.model_versions.add(result['model_version'])
+                yield result
+
+
+def run_shard(paths, shard_index, shard_count, processor, output_dir, output_format='jsonl',
+              user_id=None, backend=None, rows_per_file=ROWS_PER_FILE, insert_batch_size=1000,
+              progress=None):
+    """Analyze one shard of the inputs into output_dir, then write its stats file.
+
+    JSONL/Parquet results go to numbered part files and 'db' bulk-loads them into
+    the analyses table. The stats file is written last, so its presence marks
+    the shard complete; rerunning a shard replaces its parts (but would load a
+    second copy into the database).
+    """
+    check_inputs(paths, shard_index, shard_count)
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = f'part-{shard_index:04d}-of-{shard_count:04d}'
+    stats_path = os.path.join(output_dir, f'stats-{shard_index:04d}-of-{shard_count:04d}.json')
+    if os.path.exists(stats_path):
+        os.remove(stats_path)
+    stats = ShardStats()
+    started = time.perf_counter()
+    results = stats.count(iter_shard_results(paths, shard_index, shard_count, processor,
+                                             user_id, backend, progress))
+    if output_format == 'db':
+        outputs = []
+        bulk_insert_analyses(results, insert_batch_size)
+    else:
+        for stale in glob.glob(os.path.join(output_dir, f'{prefix}-*')):
+            os.remove(stale)
+        outputs = write_parts(results, output_dir, prefix, output_format, rows_per_file)
+
+    shard = {
+        'shard_index': shard_index, 'shard_count': shard_count,
+        'block_bytes': SHARD_BLOCK_BYTES, 'csv_block_texts': CSV_BLOCK_TEXTS,
+        'inputs': sorted(os.path.basename(path) for path in paths),
+        'format': output_format, 'outputs': outputs,
+        'backends': sorted(stats.backends), 'model_versions': sorted(stats.model_versions),
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'finished_at': datetime.utcnow().isoformat(),
+        'totals': stats.totals, 'by_source': stats.by_source,
+    }
+    write_stats(stats_path, shard)
+    return shard
+
+
+def write_parts(results, output_dir, prefix, output_format, rows_per_file=ROWS_PER_FILE):
+    """Stream result dicts into <prefix>-NNNNN part files of up to rows_per_file rows each.
+
+    Each part is written under a temporary name and renamed when complete.
+    Returns the part file names.
+    """
+    stream, mode = _STREAMS[output_format]
+    extension = EXPORT_FORMATS[output_format][1]
+    created_at = datetime.utcnow().isoformat()
+    rows = (tuple(created_at if column == 'created_at' else result.get(column)
+                  for column in OUTPUT_COLUMNS)
+            for result in results)
+    names = []
+    for part in itertools.count():
+        first = next(rows, None)
+        if first is None:
+            break
+        name = f'{prefix}-{part:05d}.{extension}'
+        path = os.path.join(output_dir, name)
+        with open(path + '.tmp', mode) as handle:
+            for data in stream(itertools.chain([first], itertools.islice(rows, rows_per_file - 1)),
+                               OUTPUT_COLUMNS):
+                handle.write(data)
+        os.replace(path + '.tmp', path)
+        names.append(name)
+    return names
+
+
+def merge_stats(paths):
+    """Combine shard stats files (or directories holding them) into one summary.
+
+    Raises ValueError when the shards come from different splits or models, or
+    when a shard is missing or appears twice.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, 'stats-*-of-*.json'))))
+        else:
+            files.append(path)
+    if not files:
+        raise ValueError('No shard stats files found')
+
+    shards = []
+    for path in files:
+        with open(path, encoding='utf-8') as handle:
+            shards.append(json.load(handle))
+
+    first = shards[0]
+    for key in ('shard_count', 'block_bytes', 'csv_block_texts', 'inputs'):
+        if any(shard[key] != first[key] for shard in shards):
+            raise ValueError(f'Shards disagree on {key}; they were not split from the same run')
+    backends = sorted({name for shard in shards for name in shard['backends']})
+    model_versions = sorted({version for shard in shards for version in shard['model_versions']})
+    if len(backends) > 1 or len(model_versions) > 1:
+        raise ValueError(f"Shards were scored by different models: {', '.join(model_versions)}")
+    seen = [shard['shard_index'] for shard in shards]
+    duplicates = sorted({index for index in seen if seen.count(index) > 1})
+    if duplicates:
+        raise ValueError(f"Shard stats given more than once: {', '.join(map(str, duplicates))}")
+    missing = sorted(set(range(first['shard_count'])) - set(seen))
+    if missing:
+        raise ValueError(f"Missing stats for shards {', '.join(map(str, missing))} "
+                         f"of {first['shard_count']}")
+
+    totals = _empty_counters()
+    by_source = {}
+    for shard in shards:
+        _add_counters(totals, shard['totals'])
+        for name, counters in shard['by_source'].items():
+            _add_counters(by_source.setdefault(name, _empty_counters()), counters)
+    return {
+        'shard_count': first['shard_count'], 'inputs': first['inputs'],
+        'backend': backends[0] if backends else None,
+        'model_version': model_versions[0] if model_versions else None,
+        'outputs': sorted(name for shard in shards for name in shard['outputs']),
+        # Shards run side by side, so the slowest one is the backfill's wall time
+        'elapsed_seconds': max(shard['elapsed_seconds'] for shard in shards),
+        'totals': _with_averages(totals),
+        'by_source': {name: _with_averages(counters) for name, counters in sorted(by_source.items())},
+    }
+
+
+def _empty_counters():
+    counters = dict.fromkeys(AGGREGATE_COUNTERS, 0)
+    counters['polarity_sum'] = counters['subjectivity_sum'] = counters['confidence_sum'] = 0.0
+    return counters
+
+
+def _add_result(counters, result):
+    counters['total'] += 1
+    if result['sentiment'] in ('positive', 'negative', 'neutral'):
+        counters[result['sentiment']] += 1
+    counters['polarity_sum'] += result.get('polarity') or 0.0
+    counters['subjectivity_sum'] += result.get('subjectivity') or 0.0
+    counters['confidence_sum'] += result.get('confidence') or 0.0
+
+
+def _add_counters(counters, other):
+    for key in AGGREGATE_COUNTERS:
+        counters[key] += other[key]
+
+
+def _with_averages(counters):
+    """Counters plus the averages User.get_stats reports"""
+    total = counters['total'] or 1
+    return dict(counters, avg_polarity=counters['polarity_sum'] / total,
+                avg_confidence=counters['confidence_sum'] / total,
+                avg_subjectivity=counters['subjectivity_sum'] / total)
+
+
+def write_stats(path, data):
+    """Write JSON under a temporary name and rename it into place"""
+    with open(path + '.tmp', 'w', encoding='utf-8') as handle:
+        json.dump(data, handle, indent=2)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,69 @@
+"""Compare sentiment backends on accuracy and throughput.
+
+Run from the project root:  python -m benchmarks.bench_backends --size 10000
+
+Accuracy is measured on the bundled labeled sample (data/labeled_sample.tsv, test
+split by default; the linear model was trained on the train split). Throughput
+uses the synthetic review corpus, scored with keywords off and no result cache
+so only the backend is timed.
+"""
+import argparse
+import time
+from benchmarks.corpus import make_corpus
+from linear_model import CLASSES, load_labeled_sample
+from sentiment_backends import SENTIMENT_BACKENDS
+from sentiment_analyzer import SentimentAnalyzer
+
+
+def accuracy_report(analyzer, backend, texts, labels):
+    """Accuracy and macro-averaged F1 over the labeled texts"""
+    predicted = [result['sentiment'] for result in
+                 analyzer.analyze_batch(texts, keywords=False, backend=backend)]
+    correct = sum(p == g for p, g in zip(predicted, labels))
+    f1_scores = []
+    for label in CLASSES:
+        true_positive = sum(p == g == label for p, g in zip(predicted, labels))
+        predicted_count = predicted.count(label)
+        actual_count = labels.count(label)
+        precision = true_positive / predicted_count if predicted_count else 0.0
+        recall = true_positive / actual_count if actual_count else 0.0
+        f1_scores.append(2 * precision * recall / (precision + recall) if precision + recall else 0.0)
+    return correct / len(labels), sum(f1_scores) / len(f1_scores)
+
+
+def throughput(analyzer, backend, texts, batch):
+    """Texts per second through analyze_batch (batch) or analyze_text one by one"""
+    started = time.perf_counter()
+    if batch:
+        analyzer.analyze_batch(texts, keywords=False, backend=backend)
+    else:
+        for text in texts:
+            analyzer.analyze_text(text, keywords=False, backend=backend)
+    return len(texts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help='synthetic texts for throughput')
+    parser.add_argument('--split', default='test', help="labeled sample split, or 'all'")
+    parser.add_argument('--backends', default=','.join(SENTIMENT_BACKENDS))
+    args = parser.parse_args()
+
+    texts, labels = load_labeled_sample(split=None if args.split == 'all' else args.split)
+    corpus = make_corpus(args.size)
+    analyzer = SentimentAnalyzer()
+    print(f'{len(texts)} labeled texts ({args.split}), {args.size} synthetic texts for throughput')
+    print(f"{'backend':>9} {'accuracy':>9} {'macro F1':>9} {'batch/s':>10} {'single/s':>10} {'load ms':>8}")
+    for backend in args.backends.split(','):
+        started = time.perf_counter()
+        analyzer.get_backend(backend)
+        load_seconds = time.perf_counter() - started
+        accuracy, macro_f1 = accuracy_report(analyzer, backend, texts, labels)
+        batch_rate = throughput(analyzer, backend, corpus, batch=True)
+        single_rate = throughput(analyzer, backend, corpus[:max(1, args.size // 5)], batch=False)
+        print(f'{backend:>9} {accuracy:>9.3f} {macro_f1:>9.3f} {batch_rate:>10,.0f} '
+              f'{single_rate:>10,.0f} {load_seconds * 1000:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
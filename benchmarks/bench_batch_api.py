@@ -0,0 +1,78 @@
+"""Compare one /analyze request per text with /api/analyze/batch requests.
+
+Run from the project root:  python -m benchmarks.bench_batch_api --texts 5000
+Uses a throwaway SQLite database unless --database-url is given.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def run_batches(client, texts, batch_size, persist):
+    """POST texts in batches; return (elapsed seconds, per-request latencies)"""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        sent = time.perf_counter()
+        response = client.post(f"/api/analyze/batch?persist={'true' if persist else 'false'}",
+                               json=texts[i:i + batch_size])
+        latencies.append(time.perf_counter() - sent)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return time.perf_counter() - start, latencies
+
+
+def report(label, count, elapsed, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label}: {count / elapsed:,.0f} texts/sec, "
+          f"p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--texts', type=int, default=5000)
+    parser.add_argument('--batch-sizes', default='100,1000')
+    parser.add_argument('--single', type=int, default=500,
+                        help='texts sent one per /analyze request for the baseline')
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ.setdefault('RESULT_CACHE_SIZE', '0')  # measure analysis, not cache hits
+
+    from app import app, db
+    from benchmarks.corpus import make_corpus
+    from models import User
+
+    texts = make_corpus(args.texts)
+    username = f'bench-{os.getpid()}'
+    with app.app_context():
+        user = User(username=username, email=f'{username}@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'username': username, 'password': 'bench'})
+    client.post('/api/analyze/batch?persist=false', json=texts[:10])  # warm the engine
+
+    latencies = []
+    start = time.perf_counter()
+    for text in texts[:args.single]:
+        sent = time.perf_counter()
+        client.post('/analyze', json={'text': text})
+        latencies.append(time.perf_counter() - sent)
+    report('/analyze (one text per request)', args.single, time.perf_counter() - start, latencies)
+
+    for batch_size in (int(size) for size in args.batch_sizes.split(',')):
+        for persist in (False, True):
+            elapsed, latencies = run_batches(client, texts, batch_size, persist)
+            report(f'/api/analyze/batch size {batch_size} persist={persist}',
+                   len(texts), elapsed, latencies)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Compare SentimentAnalyzer.analyze_batch against the per-text analyze_text loop.
+
+Run from the project root:  python -m benchmarks.bench_batch_engine --size 20000
+"""
+import argparse
+import time
+from textblob import TextBlob
+from benchmarks.corpus import make_corpus
+from sentiment_analyzer import SentimentAnalyzer
+
+
+def check_parity(analyzer, texts, tolerance):
+    """Return the largest polarity/subjectivity deviation from TextBlob"""
+    results = analyzer.analyze_batch(texts)
+    worst = 0.0
+    mismatches = 0
+    for text, result in zip(texts, results):
+        expected = TextBlob(analyzer._clean_text(text)).sentiment
+        deviation = max(abs(expected.polarity - result['polarity']),
+                        abs(expected.subjectivity - result['subjectivity']))
+        worst = max(worst, deviation)
+        if deviation > tolerance:
+            mismatches += 1
+    return worst, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=20000)
+    parser.add_argument('--tolerance', type=float, default=1e-6)
+    parser.add_argument('--skip-loop', action='store_true',
+                        help='skip the per-text loop (needs the NLTK corpora)')
+    args = parser.parse_args()
+
+    texts = make_corpus(args.size)
+    analyzer = SentimentAnalyzer()
+    analyzer.analyze_batch(texts[:10])  # warm the lexicon table
+
+    start = time.perf_counter()
+    analyzer.analyze_batch(texts)
+    batch_elapsed = time.perf_counter() - start
+    print(f"analyze_batch: {args.size / batch_elapsed:,.0f} lines/sec")
+
+    if not args.skip_loop:
+        start = time.perf_counter()
+        for text in texts:
+            analyzer.analyze_text(text)
+        loop_elapsed = time.perf_counter() - start
+        print(f"analyze_text loop: {args.size / loop_elapsed:,.0f} lines/sec "
+              f"({loop_elapsed / batch_elapsed:.1f}x slower)")
+
+    worst, mismatches = check_parity(analyzer, texts, args.tolerance)
+    print(f"parity vs TextBlob: max deviation {worst:.2e}, "
+          f"{mismatches} texts outside tolerance {args.tolerance}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Compare ORM add-per-row persistence with the bulk insert path.
+
+Run from the project root:  python -m benchmarks.bench_bulk_insert --rows 20000
+Uses a throwaway SQLite database unless --database-url is given.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    from app import app, db
+    from benchmarks.corpus import make_corpus
+    from database import bulk_insert_analyses
+    from models import User, SentimentAnalysis
+    from sentiment_analyzer import SentimentAnalyzer
+
+    results = SentimentAnalyzer().analyze_batch(make_corpus(args.rows))
+
+    with app.app_context():
+        user = User(username=f'bench-{os.getpid()}', email=f'bench-{os.getpid()}@example.com')
+        db.session.add(user)
+        db.session.commit()
+        for result in results:
+            result.update(user_id=user.id, source_type='file', source_name='bench.txt')
+
+        start = time.perf_counter()
+        for result in results:
+            analysis = SentimentAnalysis()
+            for column, value in result.items():
+                setattr(analysis, column, value)
+            db.session.add(analysis)
+        db.session.commit()
+        orm_elapsed = time.perf_counter() - start
+        print(f"ORM add loop: {len(results) / orm_elapsed:,.0f} rows/sec")
+
+        start = time.perf_counter()
+        bulk_insert_analyses(results, args.batch_size)
+        bulk_elapsed = time.perf_counter() - start
+        print(f"bulk insert (batch {args.batch_size}): {len(results) / bulk_elapsed:,.0f} rows/sec "
+              f"({orm_elapsed / bulk_elapsed:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Stress the database with parallel writer processes, as concurrent gunicorn workers would.
+
+Run from the project root:
+    python -m benchmarks.bench_concurrency --writers 8
+    python -m benchmarks.bench_concurrency --writers 8 --configs wal,legacy
+
+Each writer is a separate interpreter committing small /analyze-sized inserts
+(--rows-per-commit) through database.insert_analyses, optionally alongside readers
+streaming the export query. Every config runs against a fresh SQLite database
+unless --database-url is given; 'legacy' is the previous setup (rollback journal,
+synchronous=FULL, pysqlite's 5 s busy timeout).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CONFIGS = {
+    'wal': {},
+    'wal-full-sync': {'SQLITE_SYNCHRONOUS': 'FULL'},
+    'legacy': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL',
+               'SQLITE_BUSY_TIMEOUT_MS': '5000', 'SQLITE_MMAP_MB': '0'},
+}
+
+# Seconds allowed for the child interpreters to import the app before the run starts
+STARTUP_GRACE = 8.0
+
+
+def make_result(i, user_id):
+    sentiment = ('positive', 'negative', 'neutral')[i % 3]
+    return {'user_id': user_id, 'text': f'Stress test review number {i}', 'sentiment': sentiment,
+            'confidence': 0.5, 'polarity': 0.5, 'subjectivity': 0.5,
+            'keywords': json.dumps({'stress': 1, 'review': 1}), 'source_type': 'text'}
+
+
+def run_writer(args):
+    """Commit --commits inserts; report latencies and lock errors as JSON"""
+    from sqlalchemy.exc import OperationalError
+    from app import app
+    from database import insert_analyses
+
+    latencies = []
+    errors = 0
+    with app.app_context():
+        _wait_until(args.start_at)
+        started = time.time()
+        for commit in range(args.commits):
+            rows = [make_result(commit * args.rows_per_commit + i, args.user_id)
+                    for i in range(args.rows_per_commit)]
+            began = time.perf_counter()
+            try:
+                insert_analyses(rows)
+                latencies.append(time.perf_counter() - began)
+            except OperationalError as e:
+                if 'locked' not in str(e) and 'busy' not in str(e):
+                    raise
+                errors += 1
+    return {'latencies': latencies, 'errors': errors, 'started': started, 'finished': time.time()}
+
+
+def run_reader(args):
+    """Stream the export query repeatedly until told to stop (a writer-blocking read pre-WAL)"""
+    from app import app
+    from exporter import EXPORT_COLUMNS, iter_export_rows
+
+    scans = 0
+    with app.app_context():
+        _wait_until(args.start_at)
+        deadline = time.time() + args.duration
+        while time.time() < deadline:
+            for _ in iter_export_rows(args.user_id, EXPORT_COLUMNS, {}):
+                pass
+            scans += 1
+    return {'scans': scans}
+
+
+def _wait_until(start_at):
+    time.sleep(max(0.0, start_at - time.time()))
+
+
+def run_config(name, args):
+    env = dict(os.environ, **CONFIGS[name])
+    env['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    env['JOB_WORKERS'] = '0'
+    setup = subprocess.run([sys.executable, '-m', 'benchmarks.bench_concurrency', '--role', 'setup',
+                            '--seed-rows', str(args.seed_rows)],
+                           env=env, capture_output=True, text=True, check=True)
+    user_id = setup.stdout.strip().splitlines()[-1]
+
+    # Everyone starts together once the interpreters have imported the app
+    common = ['--user-id', user_id, '--commits', str(args.commits),
+              '--rows-per-commit', str(args.rows_per_commit),
+              '--start-at', str(time.time() + STARTUP_GRACE)]
+    writers = [subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_concurrency', '--role', 'writer']
+                                + common, env=env, stdout=subprocess.PIPE, text=True)
+               for _ in range(args.writers)]
+    readers = [subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_concurrency', '--role', 'reader',
+                                 '--duration', str(args.duration)] + common,
+                                env=env, stdout=subprocess.PIPE, text=True)
+               for _ in range(args.readers)]
+    results = [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in writers]
+    elapsed = (max(result['finished'] for result in results)
+               - min(result['started'] for result in results))
+    scans = sum(json.loads(process.communicate()[0].strip().splitlines()[-1])['scans']
+                for process in readers)
+
+    latencies = sorted(latency for result in results for latency in result['latencies'])
+    commits = len(latencies)
+    errors = sum(result['errors'] for result in results)
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000 if latencies else 0.0
+
+    print(f'{name:>14} {commits / elapsed:>10,.0f} {commits * args.rows_per_commit / elapsed:>10,.0f} '
+          f'{percentile(0.5):>8.1f} {percentile(0.99):>8.1f} {errors:>7} {scans:>6}')
+
+
+def setup_database(args):
+    from app import app, db
+    from database import bulk_insert_analyses
+    from models import User
+    with app.app_context():
+        user = User(username=f'stress-{os.getpid()}', email=f'stress-{os.getpid()}@example.com')
+        db.session.add(user)
+        db.session.commit()
+        bulk_insert_analyses((make_result(i, user.id) for i in range(args.seed_rows)), 5000)
+        print(user.id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=1, help='processes streaming exports meanwhile')
+    parser.add_argument('--commits', type=int, default=200, help='commits per writer')
+    parser.add_argument('--rows-per-commit', type=int, default=1)
+    parser.add_argument('--seed-rows', type=int, default=50000, help='rows stored before the run')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds each reader runs')
+    parser.add_argument('--configs', default='wal,legacy')
+    parser.add_argument('--database-url')
+    parser.add_argument('--role', help=argparse.SUPPRESS)
+    parser.add_argument('--user-id', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--start-at', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role == 'setup':
+        setup_database(args)
+        return
+    if args.role:
+        print(json.dumps((run_writer if args.role == 'writer' else run_reader)(args)))
+        return
+
+    print(f'{args.writers} writers x {args.commits} commits of {args.rows_per_commit} row(s), '
+          f'{args.readers} export reader(s), {args.seed_rows:,} seeded rows')
+    print(f"{'config':>14} {'commits/s':>10} {'rows/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'locked':>7} {'scans':>6}")
+    for name in args.configs.split(','):
+        run_config(name, args)
+
+
+if __name__ == '__main__':
+    main()
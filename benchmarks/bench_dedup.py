@@ -0,0 +1,100 @@
+"""Measure upload deduplication: duplicates found, planning speed, memory and analysis saved.
+
+Run from the project root:  python -m benchmarks.bench_dedup --size 1000000
+
+The corpus repeats earlier lines (--duplicate-ratio) and near-repeats them with small
+edits (--near-ratio), then streams through Deduplicator.plan in upload-sized chunks.
+Each mode runs in a fresh interpreter so peak RSS is comparable; with --analyze the
+fresh texts are also analyzed, against analyzing every line with dedup off.
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+from benchmarks.corpus import make_corpus
+
+MODES = ('off', 'exact', 'near')
+EDITS = ('!', '.', ' really', ' :)', '!!')
+
+
+def make_upload_lines(size, duplicate_ratio, near_ratio, seed=7):
+    """Corpus lines where some repeat earlier ones exactly or with a small edit"""
+    rng = random.Random(seed)
+    lines = make_corpus(size, duplicate_ratio=duplicate_ratio)
+    for i in range(1, size):
+        if rng.random() < near_ratio:
+            lines[i] = lines[rng.randrange(i)] + rng.choice(EDITS)
+    return lines
+
+
+def run_mode(args):
+    lines = make_upload_lines(args.size, args.duplicate_ratio, args.near_ratio)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    analyzer = None
+    if args.analyze:
+        from sentiment_analyzer import SentimentAnalyzer
+        analyzer = SentimentAnalyzer()
+        analyzer.get_backend()
+
+    deduplicator = None
+    if args.mode != 'off':
+        from dedup import Deduplicator
+        deduplicator = Deduplicator(args.mode, args.threshold)
+    plan_seconds = analyze_seconds = 0.0
+    analyzed = 0
+    for start in range(0, len(lines), args.chunk_size):
+        chunk = lines[start:start + args.chunk_size]
+        if deduplicator is not None:
+            started = time.perf_counter()
+            chunk = [chunk[i] for _, i in deduplicator.plan(chunk).fresh]
+            plan_seconds += time.perf_counter() - started
+        analyzed += len(chunk)
+        if analyzer is not None:
+            started = time.perf_counter()
+            analyzer.analyze_batch(chunk, keywords=False)
+            analyze_seconds += time.perf_counter() - started
+
+    return {
+        'mode': args.mode,
+        'lines': len(lines),
+        'analyzed': analyzed,
+        'duplicates': len(lines) - analyzed,
+        'plan_lines_per_s': round(len(lines) / plan_seconds) if plan_seconds else None,
+        'analyze_s': round(analyze_seconds, 2) if analyzer is not None else None,
+        'peak_rss_growth_mb': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                                     - baseline_rss) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.3)
+    parser.add_argument('--near-ratio', type=float, default=0.1)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--analyze', action='store_true', help='also time analyzing the fresh texts')
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args)))
+        return
+
+    print(f'{args.size} lines, {args.duplicate_ratio:.0%} exact and ~{args.near_ratio:.0%} near repeats')
+    for mode in args.modes.split(','):
+        command = [sys.executable, '-m', 'benchmarks.bench_dedup', '--mode', mode] + sys.argv[1:]
+        completed = subprocess.run(command, capture_output=True, text=True, check=True)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        rate = f"{result['plan_lines_per_s']:,} lines/s" if result['plan_lines_per_s'] else '-'
+        analyze = f", analyze {result['analyze_s']}s" if result['analyze_s'] is not None else ''
+        print(f"{mode:>6}: {result['duplicates']:,} duplicates, {result['analyzed']:,} analyzed, "
+              f"plan {rate}{analyze}, peak RSS +{result['peak_rss_growth_mb']} MB")
+
+
+if __name__ == '__main__':
+    main()
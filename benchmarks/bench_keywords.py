@@ -0,0 +1,45 @@
+"""Compare keyword extraction modes and the cost of keywords inside analyze_text.
+
+Run from the project root:  python -m benchmarks.bench_keywords --size 5000
+"""
+import argparse
+import time
+from benchmarks.corpus import make_corpus
+from keyword_extractors import KEYWORD_EXTRACTORS, get_keyword_extractor
+
+
+def time_extractor(mode, texts):
+    extractor = get_keyword_extractor(mode)
+    start = time.perf_counter()
+    for text in texts:
+        extractor.extract(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=5000)
+    parser.add_argument('--modes', default=','.join(KEYWORD_EXTRACTORS),
+                        help="comma-separated modes; 'accurate' needs the NLTK corpora")
+    parser.add_argument('--analyze', action='store_true',
+                        help='also time analyze_text with and without keywords')
+    args = parser.parse_args()
+
+    texts = make_corpus(args.size)
+    for mode in args.modes.split(','):
+        elapsed = time_extractor(mode, texts)
+        print(f"{mode:>9}: {args.size / elapsed:,.0f} texts/sec")
+
+    if args.analyze:
+        from sentiment_analyzer import SentimentAnalyzer
+        analyzer = SentimentAnalyzer()
+        for keywords in (True, False):
+            start = time.perf_counter()
+            for text in texts:
+                analyzer.analyze_text(text, keywords=keywords)
+            elapsed = time.perf_counter() - start
+            print(f"analyze_text keywords={keywords}: {args.size / elapsed:,.0f} texts/sec")
+
+
+if __name__ == '__main__':
+    main()
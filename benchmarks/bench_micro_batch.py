@@ -0,0 +1,96 @@
+"""Latency versus throughput of /analyze with and without micro-batching.
+
+Run from the project root:
+    python -m benchmarks.bench_micro_batch --clients 1,8,32 --windows 0,2,5,10
+
+Each client is a thread posting /analyze in a closed loop, as requests on a
+threaded gunicorn worker would; window 0 is the unbatched path, where every
+request scores its own text and commits on its own. Failed requests (e.g. the
+connection pool running dry) are counted, not timed. Uses a throwaway SQLite
+database unless --database-url is given.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+
+def run(app, user_id, texts, clients, duration):
+    """Closed-loop clients for `duration` seconds; returns (requests/s, latencies in ms, errors)"""
+    latencies = [[] for _ in range(clients)]
+    errors = []
+    start = threading.Barrier(clients + 1)
+    stop_at = [0.0]
+
+    def client(index):
+        http = app.test_client()
+        with http.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        sent = index
+        start.wait()
+        while time.perf_counter() < stop_at[0]:
+            began = time.perf_counter()
+            response = http.post('/analyze', json={'text': texts[sent % len(texts)]})
+            if response.status_code == 200:
+                latencies[index].append((time.perf_counter() - began) * 1000)
+            else:
+                errors.append(response.status_code)
+            sent += clients
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    stop_at[0] = time.perf_counter() + duration
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    flat = sorted(latency for per_client in latencies for latency in per_client)
+    return len(flat) / elapsed, flat, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', default='1,8,32', help='comma-separated concurrency levels')
+    parser.add_argument('--windows', default='0,2,5,10', help='comma-separated batch windows in ms')
+    parser.add_argument('--max-size', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per run')
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ['RESULT_CACHE_SIZE'] = '0'
+
+    from app import app, db
+    from benchmarks.corpus import make_corpus
+    from micro_batch import analyze_batcher
+    from models import User
+
+    texts = make_corpus(5000)
+    with app.app_context():
+        user = User(username=f'bench-{os.getpid()}', email=f'bench-{os.getpid()}@example.com')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    # Warm the analyzer and backend so the first run doesn't pay for loading them
+    run(app, user_id, texts, 1, 0.5)
+
+    print(f"{'clients':>7} {'window ms':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'failed':>6}", flush=True)
+    for clients in [int(value) for value in args.clients.split(',')]:
+        for window in [float(value) for value in args.windows.split(',')]:
+            analyze_batcher.init_app(app, window_ms=window, max_size=args.max_size)
+            throughput, latencies, failed = run(app, user_id, texts, clients, args.duration)
+            p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] if latencies else 0.0
+            print(f'{clients:>7} {window:>9g} {throughput:>8,.0f} '
+                  f'{statistics.median(latencies) if latencies else 0.0:>8.1f} {p99:>8.1f} '
+                  f'{latencies[-1] if latencies else 0.0:>8.1f} {failed:>6}', flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Compare buffered and memory-mapped TXT ingestion, and text vs byte-range pool feeding.
+
+Run from the project root:  python -m benchmarks.bench_mmap --lines 1000000 --workers 4
+
+Parsing compares the old buffered line loop with MappedLines. Analysis compares
+parsing in this process and pickling chunks of texts to the pool
+(analyze_file_content) with sending byte ranges that workers map and read
+themselves (iter_analyzed_ranges); this process's CPU time shows what the
+parent is left doing. Nothing is stored.
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+from benchmarks.corpus import make_corpus, write_txt_corpus
+
+
+def parent_cpu():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def buffered_texts(path):
+    """The TXT loop FileProcessor used before MappedLines"""
+    with open(path, 'rb') as handle:
+        for raw_line in handle:
+            line = raw_line.decode('utf-8', errors='ignore').strip()
+            if line and len(line) > 10:
+                yield line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--analyze-lines', type=int, default=200000, help='lines analyzed per pool run')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args()
+    os.environ['RESULT_CACHE_SIZE'] = '0'
+
+    from file_processor import FileProcessor
+    from mmap_reader import MappedLines
+
+    workdir = tempfile.mkdtemp()
+    path = write_txt_corpus(os.path.join(workdir, 'corpus.txt'), make_corpus(args.lines))
+    size_mb = os.path.getsize(path) / 1e6
+    print(f'{args.lines:,} lines, {size_mb:.1f} MB')
+
+    for label, read in (('buffered', lambda: buffered_texts(path)),
+                        ('mmap', lambda: MappedLines(path).iter_texts())):
+        started = time.perf_counter()
+        count = sum(1 for _ in read())
+        elapsed = time.perf_counter() - started
+        print(f'parse {label:>9}: {count / elapsed:>12,.0f} lines/s {size_mb / elapsed:>8.1f} MB/s')
+
+    sample = write_txt_corpus(os.path.join(workdir, 'sample.txt'), make_corpus(args.analyze_lines))
+    processor = FileProcessor(workdir, workers=args.workers, chunk_size=args.chunk_size,
+                              analyzer_config={'RESULT_CACHE_SIZE': 0})
+    # Start and warm the pool so neither run pays for it
+    processor.analyze_file_content(make_corpus(args.chunk_size * args.workers * 2), 'warm', 0)
+
+    def texts_to_pool():
+        step = processor.chunk_size * processor.workers
+        count = 0
+        for texts, _ in processor.iter_text_chunks(sample, 'sample.txt', step):
+            count += len(processor.analyze_file_content(texts, 'sample.txt', 0))
+        return count
+
+    def ranges_to_pool():
+        return sum(len(results) for results, _ in
+                   processor.iter_analyzed_ranges(sample, 'sample.txt', 0))
+
+    for label, run in (('texts', texts_to_pool), ('ranges', ranges_to_pool)):
+        cpu, started = parent_cpu(), time.perf_counter()
+        count = run()
+        elapsed = time.perf_counter() - started
+        print(f'pool {label:>10}: {count / elapsed:>12,.0f} texts/s, parent CPU '
+              f'{parent_cpu() - cpu:.2f}s of {elapsed:.2f}s')
+    processor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
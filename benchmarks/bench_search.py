@@ -0,0 +1,101 @@
+"""Time /api/search over a large stored history against a LIKE scan.
+
+Run from the project root:  python -m benchmarks.bench_search --rows 1000000
+
+Rows are the synthetic corpus analyzed once and stored repeatedly with spread-out
+timestamps, each tagged with an order number so rare terms exist too. Uses a
+throwaway SQLite database unless --database-url is given.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+QUERIES = [
+    ('common term', 'q=battery'),
+    ('common term, negative', 'q=battery&sentiment=negative'),
+    ('phrase', 'q="staff were friendly"'),
+    ('prefix', 'q=disappoint*'),
+    ('rare term', 'q=order{rare}'),
+    ('two terms + dates', 'q=shipping slow&start={start}&end={end}'),
+    ('keyword', 'keyword=battery'),
+    ('keyword + term', 'keyword=battery&q=terrible'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--distinct', type=int, default=20000, help='texts analyzed before repeating')
+    parser.add_argument('--repeat', type=int, default=20, help='requests timed per query')
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ['RESULT_CACHE_SIZE'] = '0'
+
+    from app import app, db
+    from benchmarks.corpus import make_corpus
+    from database import bulk_insert_analyses
+    from models import SentimentAnalysis, User
+    from search import search_backend
+    from sentiment_analyzer import SentimentAnalyzer
+
+    analyzed = SentimentAnalyzer().analyze_batch(make_corpus(args.distinct))
+    first = datetime(2024, 1, 1)
+    with app.app_context():
+        user = User(username=f'bench-{os.getpid()}', email=f'bench-{os.getpid()}@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+
+        def rows():
+            for i in range(args.rows):
+                result = dict(analyzed[i % len(analyzed)])
+                result.update(text=f"{result['text']} Order{i}", user_id=user.id,
+                              source_type='file', source_name='bench.txt',
+                              created_at=first + timedelta(seconds=30 * i))
+                yield result
+
+        started = time.perf_counter()
+        bulk_insert_analyses(rows(), 5000)
+        print(f'{args.rows:,} rows stored in {time.perf_counter() - started:.1f}s '
+              f'(search backend: {search_backend()})')
+
+        # What a search would cost without the index
+        like_started = time.perf_counter()
+        SentimentAnalysis.query.filter(
+            SentimentAnalysis.user_id == user.id,
+            SentimentAnalysis.text.ilike(f'% order{args.rows // 3}')
+        ).order_by(SentimentAnalysis.id.desc()).limit(51).all()
+        like_ms = (time.perf_counter() - like_started) * 1000
+
+    client = app.test_client()
+    client.post('/login', data={'username': user.username, 'password': 'bench'})
+    span_end = first + timedelta(seconds=30 * args.rows)
+    values = {'rare': args.rows // 3, 'start': (span_end - timedelta(days=7)).strftime('%Y-%m-%d'),
+              'end': span_end.strftime('%Y-%m-%d')}
+
+    print(f"{'query':>24} {'hits':>5} {'p50 ms':>8} {'max ms':>8} {'page 2 ms':>10}")
+    for label, query in QUERIES:
+        url = '/api/search?' + query.format(**values)
+        latencies = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            body = client.get(url).get_json()
+            latencies.append((time.perf_counter() - started) * 1000)
+        page_two = ''
+        if body['next_cursor']:
+            started = time.perf_counter()
+            client.get(f"{url}&cursor={body['next_cursor']}")
+            page_two = f'{(time.perf_counter() - started) * 1000:.1f}'
+        print(f'{label:>24} {len(body["items"]):>5} {statistics.median(latencies):>8.1f} '
+              f'{max(latencies):>8.1f} {page_two:>10}')
+    print(f"{'LIKE scan, rare term':>24} {'':>5} {like_ms:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
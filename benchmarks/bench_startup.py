@@ -0,0 +1,115 @@
+"""Measure app import time and per-worker memory with and without model preloading.
+
+Run from the project root:  python -m benchmarks.bench_startup --workers 4
+
+For each mode a fresh interpreter imports the app (timed), then forks --workers
+children the way `gunicorn --preload` does. Each child serves a first analysis
+request and reports its latency and memory from /proc/self/smaps_rollup: RSS,
+and Private (memory no other worker shares; the real per-worker cost). Linux only.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {'lazy': '0', 'preload': '1'}
+
+
+def memory_mb():
+    """RSS and private memory of this process in MB, from smaps_rollup"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as handle:
+        for line in handle:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    private = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return {'rss_mb': round(values.get('Rss', 0) / 1024, 1), 'private_mb': round(private / 1024, 1)}
+
+
+def run_worker(app, write_fd):
+    """Child side: one login and first analysis request, then report"""
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+    started = time.perf_counter()
+    response = client.post('/api/analyze/batch?persist=false',
+                           json=['The battery is great', 'Terrible service, never again'])
+    first_request = time.perf_counter() - started
+    assert response.status_code == 200, response.get_data(as_text=True)
+    report = dict(memory_mb(), first_request_ms=round(first_request * 1000, 1))
+    os.write(write_fd, (json.dumps(report) + '\n').encode())
+    os._exit(0)
+
+
+def run_mode(workers):
+    """Parent side of one mode, inside its own interpreter"""
+    started = time.perf_counter()
+    from app import app, db
+    from models import User
+    import_seconds = time.perf_counter() - started
+
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+        db.engine.dispose()
+    master = memory_mb()
+
+    read_fd, write_fd = os.pipe()
+    for _ in range(workers):
+        if os.fork() == 0:
+            os.close(read_fd)
+            run_worker(app, write_fd)
+    os.close(write_fd)
+    for _ in range(workers):
+        os.wait()
+    with os.fdopen(read_fd) as reader:
+        reports = [json.loads(line) for line in reader]
+
+    def mean(key):
+        return round(sum(report[key] for report in reports) / len(reports), 1)
+
+    return {
+        'import_s': round(import_seconds, 3),
+        'master_rss_mb': master['rss_mb'],
+        'worker_first_request_ms': mean('first_request_ms'),
+        'worker_rss_mb': mean('rss_mb'),
+        'worker_private_mb': mean('private_mb'),
+        'total_private_mb': round(master['private_mb'] + sum(r['private_mb'] for r in reports), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args.workers)))
+        return
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit('bench_startup needs Linux /proc/self/smaps_rollup')
+
+    for mode, preload in MODES.items():
+        workdir = tempfile.mkdtemp(prefix='bench-')
+        env = dict(os.environ, PRELOAD_MODELS=preload, RESULT_CACHE_SIZE='0',
+                   DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_startup', '--run-mode', mode,
+             '--workers', str(args.workers)],
+            env=env, capture_output=True, text=True, check=True
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"{mode:>8}: import {result['import_s']:.2f}s, master RSS {result['master_rss_mb']} MB, "
+              f"worker first request {result['worker_first_request_ms']} ms, "
+              f"worker RSS {result['worker_rss_mb']} MB, worker private {result['worker_private_mb']} MB, "
+              f"total private ({args.workers} workers + master) {result['total_private_mb']} MB")
+
+
+if __name__ == '__main__':
+    main()
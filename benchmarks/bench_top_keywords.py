@@ -0,0 +1,112 @@
+"""Time /api/keywords/top over a large stored history against parsing the keywords JSON.
+
+Run from the project root:  python -m benchmarks.bench_top_keywords --rows 1000000
+
+Rows are the synthetic corpus analyzed once and stored repeatedly with spread-out
+timestamps, each with an extra sku keyword so the dictionary has --vocabulary
+more entries. Also reports on-disk size of the keywords JSON column next to
+the interned keyword tables (SQLite dbstat). Uses a throwaway SQLite database
+unless --database-url is given.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+QUERIES = [
+    ('all time', ''),
+    ('negative', 'sentiment=negative'),
+    ('last 7 days', 'start={start}&end={end}'),
+    ('positive, last 30 days', 'sentiment=positive&start={month}&end={end}'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--distinct', type=int, default=20000, help='texts analyzed before repeating')
+    parser.add_argument('--vocabulary', type=int, default=50000, help='extra distinct keywords')
+    parser.add_argument('--repeat', type=int, default=5, help='requests timed per query')
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ['RESULT_CACHE_SIZE'] = '0'
+
+    from sqlalchemy import select, text
+    from app import app, db
+    from benchmarks.corpus import make_corpus
+    from database import bulk_insert_analyses
+    from models import SentimentAnalysis, User
+    from sentiment_analyzer import SentimentAnalyzer
+
+    analyzed = SentimentAnalyzer().analyze_batch(make_corpus(args.distinct))
+    first = datetime(2024, 1, 1)
+    with app.app_context():
+        user = User(username=f'bench-{os.getpid()}', email=f'bench-{os.getpid()}@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+
+        def rows():
+            for i in range(args.rows):
+                result = dict(analyzed[i % len(analyzed)])
+                keywords = json.loads(result['keywords'])
+                keywords[f'sku{i % args.vocabulary}'] = 1
+                result.update(keywords=json.dumps(keywords), user_id=user.id,
+                              source_type='file', source_name='bench.txt',
+                              created_at=first + timedelta(seconds=30 * i))
+                yield result
+
+        started = time.perf_counter()
+        bulk_insert_analyses(rows(), 5000)
+        print(f'{args.rows:,} rows stored in {time.perf_counter() - started:.1f}s')
+
+        if db.engine.dialect.name == 'sqlite':
+            json_bytes = db.session.execute(
+                text('SELECT sum(length(keywords)) FROM sentiment_analysis')).scalar()
+            sizes = dict(db.session.execute(text(
+                "SELECT name, sum(pgsize) FROM dbstat WHERE name IN "
+                "('keyword', 'analysis_keyword', 'ix_analysis_keyword_user_keyword', "
+                "'sqlite_autoindex_keyword_1', 'sqlite_autoindex_analysis_keyword_1') GROUP BY name")).all())
+            print(f'keywords JSON: {json_bytes / 1e6:.1f} MB of text; interned tables and indexes: '
+                  + ', '.join(f'{name} {size / 1e6:.1f} MB' for name, size in sorted(sizes.items())))
+
+        span_end = first + timedelta(seconds=30 * args.rows)
+        values = {'start': (span_end - timedelta(days=7)).strftime('%Y-%m-%d'),
+                  'month': (span_end - timedelta(days=30)).strftime('%Y-%m-%d'),
+                  'end': span_end.strftime('%Y-%m-%d')}
+
+        # What the endpoint would cost parsing every row's JSON in Python
+        started = time.perf_counter()
+        counts = Counter()
+        for (keywords,) in db.session.execute(
+                select(SentimentAnalysis.keywords).where(SentimentAnalysis.user_id == user.id)
+                .execution_options(yield_per=5000)):
+            counts.update(json.loads(keywords))
+        counts.most_common(20)
+        python_ms = (time.perf_counter() - started) * 1000
+
+    client = app.test_client()
+    client.post('/login', data={'username': user.username, 'password': 'bench'})
+    print(f"{'query':>24} {'top':>24} {'p50 ms':>8} {'max ms':>8}")
+    for label, query in QUERIES:
+        url = '/api/keywords/top?' + query.format(**values)
+        latencies = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            body = client.get(url).get_json()
+            latencies.append((time.perf_counter() - started) * 1000)
+        top = body['keywords'][0] if body['keywords'] else {'keyword': '-', 'count': 0}
+        print(f"{label:>24} {top['keyword'] + ' x' + str(top['count']):>24} "
+              f'{statistics.median(latencies):>8.1f} {max(latencies):>8.1f}')
+    print(f"{'JSON parse, all time':>24} {'':>24} {python_ms:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
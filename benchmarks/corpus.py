@@ -0,0 +1,55 @@
+"""Synthetic review corpora for benchmarks, generated deterministically"""
+import csv
+import random
+
+SUBJECTS = ['The product', 'This phone', 'The hotel', 'Customer service', 'The delivery',
+            'This app', 'The battery', 'Our waiter', 'The movie', 'The update']
+MODIFIERS = ['', 'really ', 'very ', 'extremely ', 'not ', 'not very ', 'quite ',
+             'absolutely ', 'slightly ', 'never ']
+ADJECTIVES = ['good', 'bad', 'great', 'terrible', 'amazing', 'awful', 'slow', 'fast',
+              'helpful', 'rude', 'cheap', 'expensive', 'beautiful', 'boring', 'perfect',
+              'disappointing', 'fine', 'horrible', 'excellent', 'average']
+TAILS = ['', '!', '!!', '.', ' :)', ' :(', ' <3', ' (!)', '...', '?']
+EXTRAS = ['', ' I would buy it again.', ' Would not recommend to anyone.',
+          ' Shipping took two weeks.', " I can't believe the price.",
+          ' See https://example.com/review for photos.', ' The staff were friendly.',
+          ' Honestly the worst purchase I have made.', ' Five stars from me.']
+
+
+def make_review(rng):
+    """Build one synthetic review line"""
+    parts = []
+    for _ in range(rng.randint(1, 3)):
+        parts.append(f"{rng.choice(SUBJECTS)} is {rng.choice(MODIFIERS)}"
+                     f"{rng.choice(ADJECTIVES)}{rng.choice(TAILS)}")
+    return ' '.join(parts) + rng.choice(EXTRAS)
+
+
+def make_corpus(size, seed=42, duplicate_ratio=0.0):
+    """Return `size` review lines; `duplicate_ratio` of them repeat earlier lines"""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(size):
+        if lines and rng.random() < duplicate_ratio:
+            lines.append(rng.choice(lines))
+        else:
+            lines.append(make_review(rng))
+    return lines
+
+
+def write_txt_corpus(path, lines):
+    """Write one review per line, the upload format for .txt files"""
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write('\n'.join(lines) + '\n')
+    return path
+
+
+def write_csv_corpus(path, lines, seed=42):
+    """Write reviews into a CSV with a text column alongside id and rating columns"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['id', 'review_text', 'rating'])
+        for i, line in enumerate(lines, 1):
+            writer.writerow([i, line, rng.randint(1, 5)])
+    return path
@@ -0,0 +1,323 @@
+"""Run the analysis pipeline benchmark suite and compare it with a stored baseline.
+
+Run from the project root:
+    python -m benchmarks.suite                          # run, print, compare with baseline.json
+    python -m benchmarks.suite --sizes 1000 --cases analyze_batch,stats
+    python -m benchmarks.suite --save-baseline          # record this machine's numbers
+    python -m benchmarks.suite --profile                # also write one .prof per case
+
+Every case runs in a fresh interpreter against a throwaway SQLite database, so
+peak RSS is per case and one case cannot warm caches for the next. Results are
+saved as JSON: throughput (items/sec), p50/p95/p99 latency per operation (ms)
+and peak RSS (MB).
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+DEFAULT_SIZES = (1000, 10000)
+
+# Operations timed per case; the rest of the case is setup
+REQUESTS_PER_PAGE_CASE = 50
+BATCH_SIZE = 1000
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(items, latencies, elapsed):
+    """Throughput and latency percentiles for one case"""
+    latencies = sorted(latencies)
+    return {
+        'items': items,
+        'operations': len(latencies),
+        'seconds': round(elapsed, 4),
+        'throughput': round(items / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def timed(operations):
+    """Run (item_count, callable) operations; return (items, latencies, elapsed)"""
+    latencies = []
+    items = 0
+    start = time.perf_counter()
+    for count, operation in operations:
+        began = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - began)
+        items += count
+    return items, latencies, time.perf_counter() - start
+
+
+# Cases: each takes (size, workdir) and returns timed() output. Imports happen inside
+# so they land after DATABASE_URL is pointed at the throwaway database.
+
+def case_analyze_text(size, workdir):
+    from benchmarks.corpus import make_corpus
+    from sentiment_analyzer import SentimentAnalyzer
+    analyzer = SentimentAnalyzer()
+    texts = make_corpus(size)
+    analyzer.analyze_text(texts[0])
+    return timed((1, lambda text=text: analyzer.analyze_text(text)) for text in texts)
+
+
+def case_analyze_batch(size, workdir):
+    from benchmarks.corpus import make_corpus
+    from sentiment_analyzer import SentimentAnalyzer
+    analyzer = SentimentAnalyzer()
+    texts = make_corpus(size)
+    analyzer.analyze_batch(texts[:10])
+    chunks = [texts[i:i + BATCH_SIZE] for i in range(0, len(texts), BATCH_SIZE)]
+    return timed((len(chunk), lambda chunk=chunk: analyzer.analyze_batch(chunk)) for chunk in chunks)
+
+
+def case_analyze_sentences(size, workdir):
+    """analyze_batch in sentence-level mode, for comparison with analyze_batch"""
+    from benchmarks.corpus import make_corpus
+    from sentiment_analyzer import SentimentAnalyzer
+    analyzer = SentimentAnalyzer()
+    texts = make_corpus(size)
+    analyzer.analyze_batch(texts[:10], sentences=True)
+    chunks = [texts[i:i + BATCH_SIZE] for i in range(0, len(texts), BATCH_SIZE)]
+    return timed((len(chunk), lambda chunk=chunk: analyzer.analyze_batch(chunk, sentences=True))
+                 for chunk in chunks)
+
+
+def case_process_txt(size, workdir):
+    from benchmarks.corpus import make_corpus, write_txt_corpus
+    from file_processor import FileProcessor
+    path = write_txt_corpus(os.path.join(workdir, 'reviews.txt'), make_corpus(size))
+    processor = FileProcessor(workdir)
+    return timed((size, lambda: processor._process_txt_file(path)) for _ in range(5))
+
+
+def case_process_csv(size, workdir):
+    from benchmarks.corpus import make_corpus, write_csv_corpus
+    from file_processor import FileProcessor
+    path = write_csv_corpus(os.path.join(workdir, 'reviews.csv'), make_corpus(size))
+    processor = FileProcessor(workdir)
+    return timed((size, lambda: processor._process_csv_file(path)) for _ in range(5))
+
+
+def case_upload_to_db(size, workdir):
+    """Stream a TXT upload through analysis into the database, as the job worker does"""
+    import shutil
+    from app import app, db
+    from benchmarks.corpus import make_corpus, write_txt_corpus
+    from job_queue import job_queue
+    from models import AnalysisJob
+    texts = make_corpus(size)
+    source = write_txt_corpus(os.path.join(workdir, 'source.txt'), texts)
+    job_queue.file_processor.analyzer.analyze_batch(texts[:10])  # warm the engine
+
+    with app.app_context():
+        user = _create_user(db)
+
+        def run_job(repeat):
+            filepath = shutil.copy(source, os.path.join(workdir, f'upload-{repeat}.txt'))
+            job = AnalysisJob(user_id=user.id, filename='reviews.txt', filepath=filepath)
+            db.session.add(job)
+            db.session.commit()
+            job_queue._run(job.id)
+            assert db.session.get(AnalysisJob, job.id).status == 'completed'
+
+        return timed((size, lambda repeat=repeat: run_job(repeat)) for repeat in range(3))
+
+
+def case_results_page(size, workdir):
+    """First keyset page and a deep OFFSET page of /results over `size` stored rows"""
+    client = _client_with_history(size)
+    last_page = max(1, size // 20)
+    operations = []
+    for _ in range(REQUESTS_PER_PAGE_CASE):
+        operations.append((1, lambda: _get_ok(client, '/results')))
+        operations.append((1, lambda: _get_ok(client, f'/results?page={last_page}')))
+    return timed(operations)
+
+
+def case_stats(size, workdir):
+    client = _client_with_history(size)
+    return timed((1, lambda: _get_ok(client, '/api/stats')) for _ in range(REQUESTS_PER_PAGE_CASE))
+
+
+CASES = {
+    'analyze_text': case_analyze_text,
+    'analyze_batch': case_analyze_batch,
+    'analyze_sentences': case_analyze_sentences,
+    'process_txt': case_process_txt,
+    'process_csv': case_process_csv,
+    'upload_to_db': case_upload_to_db,
+    'results_page': case_results_page,
+    'stats': case_stats,
+}
+
+
+def _create_user(db):
+    from models import User
+    user = User(username='bench', email='bench@example.com')
+    user.set_password('bench')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _client_with_history(size):
+    from app import app, db
+    from benchmarks.corpus import make_corpus
+    from database import bulk_insert_analyses
+    from sentiment_analyzer import SentimentAnalyzer
+    with app.app_context():
+        user = _create_user(db)
+        results = SentimentAnalyzer().analyze_batch(make_corpus(size))
+        for result in results:
+            result.update(user_id=user.id, source_type='file', source_name='bench.txt')
+        bulk_insert_analyses(results)
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+    return client
+
+
+def _get_ok(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, f'{url} returned {response.status_code}'
+
+
+def run_case(name, size, profile_path=None):
+    """Run one case in this process and return its summary"""
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['RESULT_CACHE_SIZE'] = '0'  # measure analysis, not cache hits
+    os.environ['JOB_WORKERS'] = '1'
+
+    if profile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+        items, latencies, elapsed = profiler.runcall(CASES[name], size, workdir)
+        profiler.dump_stats(profile_path)
+    else:
+        items, latencies, elapsed = CASES[name](size, workdir)
+
+    summary = summarize(items, latencies, elapsed)
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    summary['peak_rss_mb'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    return summary
+
+
+def run_isolated(name, size, profile_dir=None):
+    """Run one case in a child interpreter so peak RSS and caches are per case"""
+    command = [sys.executable, '-m', 'benchmarks.suite', '--run-case', name, '--size', str(size)]
+    if profile_dir:
+        command += ['--profile-path', os.path.join(profile_dir, f'{name}@{size}.prof')]
+    completed = subprocess.run(command, capture_output=True, text=True,
+                               cwd=os.path.dirname(BENCH_DIR))
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr else 'failed'}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Return (key, metric, baseline, current, change) for metrics worse than tolerance"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous or 'error' in current or 'error' in previous:
+            continue
+        if previous.get('throughput') and current['throughput'] < previous['throughput'] * (1 - tolerance):
+            regressions.append((key, 'throughput', previous['throughput'], current['throughput'],
+                                current['throughput'] / previous['throughput'] - 1))
+        for metric in ('p95_ms', 'peak_rss_mb'):
+            if previous.get(metric) and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append((key, metric, previous[metric], current[metric],
+                                    current[metric] / previous[metric] - 1))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma-separated corpus sizes')
+    parser.add_argument('--cases', default=','.join(CASES),
+                        help=f"comma-separated cases ({', '.join(CASES)})")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results.json'))
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write this run to the baseline file instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='relative change treated as a regression')
+    parser.add_argument('--profile', action='store_true',
+                        help='write a cProfile .prof per case next to the output file')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--profile-path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.size, args.profile_path)))
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    names = [name.strip() for name in args.cases.split(',')]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    profile_dir = os.path.dirname(os.path.abspath(args.output)) if args.profile else None
+
+    results = {}
+    for size in sizes:
+        for name in names:
+            key = f'{name}@{size}'
+            results[key] = summary = run_isolated(name, size, profile_dir)
+            if 'error' in summary:
+                print(f"{key:>22}: ERROR {summary['error']}")
+            else:
+                print(f"{key:>22}: {summary['throughput']:>10,.0f} items/s  "
+                      f"p50 {summary['p50_ms']:>9.2f} ms  p95 {summary['p95_ms']:>9.2f} ms  "
+                      f"p99 {summary['p99_ms']:>9.2f} ms  rss {summary['peak_rss_mb']:>6.1f} MB")
+
+    report = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    target = args.baseline if args.save_baseline else args.output
+    with open(target, 'w') as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+    print(f'wrote {target}')
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    regressions = compare(results, baseline['results'], args.tolerance)
+    if not regressions:
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+        return
+    print(f"regressions beyond {args.tolerance:.0%} against {args.baseline}:")
+    for key, metric, previous, current, change in regressions:
+        print(f"  {key} {metric}: {previous} -> {current} ({change:+.0%})")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
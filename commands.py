@@ -0,0 +1,238 @@
+import os
+import time
+from datetime import datetime
+import click
+from app import db
+from database import ensure_indexes, rebuild_aggregates
+from search import rebuild_search_index
+
+
+def register_commands(app):
+    @app.cli.command('rebuild-stats')
+    @click.option('--user-id', type=int, help='Only rebuild this user')
+    def rebuild_stats(user_id):
+        """Recompute per-user sentiment aggregates and time-series rollups from stored analyses"""
+        rebuild_aggregates(user_id)
+        click.echo('Sentiment aggregates and rollups rebuilt')
+
+    @app.cli.command('create-indexes')
+    def create_indexes():
+        """Create indexes missing from an existing database"""
+        ensure_indexes()
+        click.echo('Indexes created')
+
+    @app.cli.command('rebuild-search-index')
+    @click.option('--user-id', type=int, help='Only rebuild keywords for this user')
+    def rebuild_search(user_id):
+        """Rebuild the full-text index and keyword table from stored analyses"""
+        written = rebuild_search_index(user_id)
+        click.echo(f'Search index rebuilt ({written} keyword rows)')
+
+    @app.cli.command('analyze-file')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--user', 'username', required=True, help='Store the analyses under this username')
+    @click.option('--backend', help='Sentiment backend (default: SENTIMENT_BACKEND)')
+    @click.option('--workers', type=int, help='Analysis processes (default: ANALYSIS_WORKERS)')
+    @click.option('--dedup', type=click.Choice(['off', 'exact', 'near']),
+                  help='Deduplication mode (default: DEDUP_MODE); near keeps TXT workers off byte ranges')
+    def analyze_file(path, username, backend, workers, dedup):
+        """Analyze a local TXT or CSV file into the database, without the upload size limit"""
+        from analyzer_registry import configure_analyzers
+        from file_processor import FileProcessor
+        from job_queue import process_upload_job
+        from models import AnalysisJob, User
+        from sentiment_backends import SENTIMENT_BACKENDS
+
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            raise click.BadParameter(f'No user named {username}', param_hint='--user')
+        if backend is not None and backend not in SENTIMENT_BACKENDS:
+            raise click.BadParameter(f'Unknown sentiment backend: {backend}', param_hint='--backend')
+        filename = os.path.basename(path)
+        processor = FileProcessor(app.config['UPLOAD_FOLDER'],
+                                  workers=app.config['ANALYSIS_WORKERS'] if workers is None else workers,
+                                  chunk_size=app.config['ANALYSIS_CHUNK_SIZE'],
+                                  analyzer_config=configure_analyzers(app.config))
+        if not processor.is_allowed_file(filename):
+            raise click.BadParameter('Only .txt and .csv files are supported', param_hint='PATH')
+        if dedup is not None:
+            app.config['DEDUP_MODE'] = dedup
+
+        # Recorded as a job so the run shows up alongside uploads; the file is left in place
+        job = AnalysisJob(user_id=user.id, filename=filename, filepath=os.path.abspath(path),
+                          backend=backend, status='running', started_at=datetime.utcnow(),
+                          heartbeat_at=datetime.utcnow())
+        db.session.add(job)
+        db.session.commit()
+        started = time.perf_counter()
+        try:
+            process_upload_job(job, processor)
+            job.status = 'completed'
+        except Exception as e:
+            db.session.rollback()
+            job.status = 'failed'
+            job.error = str(e)
+            raise click.ClickException(str(e))
+        finally:
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            processor.shutdown()
+
+        elapsed = time.perf_counter() - started
+        click.echo(f'Job {job.id}: {job.total} texts, {job.saved_count} rows stored, '
+                   f'{job.duplicates or 0} duplicates in {elapsed:.1f}s '
+                   f'({job.total / elapsed if elapsed else 0:,.0f} texts/s)')
+
+    @app.cli.command('train-linear-model')
+    @click.option('--data', type=click.Path(exists=True, dir_okay=False),
+                  help='label/split/text TSV (default: the bundled data/labeled_sample.tsv)')
+    @click.option('--split', default='train', show_default=True,
+                  help="Rows to train on; 'all' uses every row")
+    @click.option('--out', type=click.Path(dir_okay=False),
+                  help='Model file to write (default: LINEAR_MODEL_PATH or data/hashed_linear.npz)')
+    def train_linear_model(data, split, out):
+        """Train the hashed-feature model used by the 'linear' sentiment backend"""
+        from linear_model import DEFAULT_MODEL_PATH, train_from_sample
+
+        out = out or app.config['LINEAR_MODEL_PATH'] or DEFAULT_MODEL_PATH
+        model = train_from_sample(data, None if split == 'all' else split)
+        model.save(out)
+        click.echo(f'Saved {len(model.ids)} feature weights to {out}')
+
+    @app.cli.command('relabel')
+    @click.option('--backend', 'backends', multiple=True, help='Only relabel rows of this backend (repeatable)')
+    @click.option('--chunk-size', type=int, help='Ids covered per transaction')
+    def relabel_command(backends, chunk_size):
+        """Re-derive stored sentiment labels from stored scores under the current thresholds"""
+        from reanalysis import RELABEL_CHUNK_SIZE, relabel
+        from sentiment_backends import SENTIMENT_BACKENDS
+
+        for backend in backends:
+            if backend not in SENTIMENT_BACKENDS:
+                raise click.BadParameter(f'Unknown sentiment backend: {backend}', param_hint='--backend')
+        started = time.perf_counter()
+        relabeled = relabel(backends or None, chunk_size or RELABEL_CHUNK_SIZE)
+        click.echo(', '.join(f'{backend}: {count} relabeled' for backend, count in relabeled.items())
+                   + f' in {time.perf_counter() - started:.1f}s')
+
+    @app.cli.command('reanalyze')
+    @click.option('--backend', help='Backend whose rows to re-score (default: SENTIMENT_BACKEND)')
+    @click.option('--chunk-size', type=int, help='Rows re-scored per transaction and checkpoint')
+    def reanalyze(backend, chunk_size):
+        """Re-score rows stored under an older model version; rerun to resume an interrupted job"""
+        from analyzer_registry import get_analyzer
+        from reanalysis import REANALYSIS_CHUNK_SIZE, run_reanalysis, start_reanalysis
+        from sentiment_backends import SENTIMENT_BACKENDS
+
+        backend = backend or app.config['SENTIMENT_BACKEND']
+        if backend not in SENTIMENT_BACKENDS:
+            raise click.BadParameter(f'Unknown sentiment backend: {backend}', param_hint='--backend')
+        job = start_reanalysis(backend)
+        if job is None:
+            click.echo(f'Every {backend} row is already scored by the current model')
+            return
+        click.echo(f'Job {job.id}: {backend} model {job.model_version}, '
+                   f'resuming after id {job.last_id} of {job.max_id}')
+
+        reported = [int(job.progress)]
+
+        def report(job):
+            # One line per whole percent, not per chunk
+            if int(job.progress) > reported[0]:
+                reported[0] = int(job.progress)
+                click.echo(f'  {job.progress:5.1f}%  {job.processed} rescored, {job.relabeled} relabeled')
+
+        started = time.perf_counter()
+        processed = job.processed
+        try:
+            run_reanalysis(job, get_analyzer(), chunk_size or REANALYSIS_CHUNK_SIZE,
+                           app.config['SENTENCE_WEIGHTING'], progress=report)
+        except Exception as e:
+            db.session.rollback()
+            job.status = 'failed'
+            job.error = str(e)
+            db.session.commit()
+            raise click.ClickException(f'{e} (rerun to resume from id {job.last_id})')
+        elapsed = time.perf_counter() - started
+        click.echo(f'Job {job.id} completed: {job.processed} rescored, {job.relabeled} relabeled, '
+                   f'{(job.processed - processed) / elapsed if elapsed else 0:,.0f} rows/s')
+
+    @app.cli.command('batch-analyze')
+    @click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+    @click.option('--shard-index', type=int, default=0, show_default=True, help="This machine's shard, from 0")
+    @click.option('--shard-count', type=int, default=1, show_default=True,
+                  help='Machines splitting the inputs; each runs every input file with its own index')
+    @click.option('--output', 'output_dir', required=True, type=click.Path(file_okay=False),
+                  help='Directory for result parts and the shard stats file')
+    @click.option('--format', 'output_format', type=click.Choice(['jsonl', 'parquet', 'db']),
+                  default='jsonl', show_default=True, help="Write part files, or bulk-load rows with 'db'")
+    @click.option('--user', 'username', help="Store the analyses under this username (required with --format db)")
+    @click.option('--backend', help='Sentiment backend (default: SENTIMENT_BACKEND)')
+    @click.option('--workers', type=int, help='Analysis processes (default: ANALYSIS_WORKERS)')
+    @click.option('--rows-per-file', type=int, help='Rows per part file')
+    def batch_analyze(paths, shard_index, shard_count, output_dir, output_format, username, backend,
+                      workers, rows_per_file):
+        """Analyze one deterministic shard of local TXT/CSV files for an offline backfill"""
+        from analyzer_registry import configure_analyzers
+        from batch_runner import ROWS_PER_FILE, check_inputs, run_shard
+        from exporter import parquet_available
+        from file_processor import FileProcessor
+        from models import User
+        from sentiment_backends import SENTIMENT_BACKENDS
+
+        try:
+            check_inputs(paths, shard_index, shard_count)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        if backend is not None and backend not in SENTIMENT_BACKENDS:
+            raise click.BadParameter(f'Unknown sentiment backend: {backend}', param_hint='--backend')
+        if output_format == 'parquet' and not parquet_available():
+            raise click.BadParameter('Parquet output needs pyarrow installed', param_hint='--format')
+        user_id = None
+        if output_format == 'db':
+            user = User.query.filter_by(username=username).first() if username else None
+            if user is None:
+                raise click.BadParameter(f'No user named {username}' if username else
+                                         '--format db needs --user', param_hint='--user')
+            user_id = user.id
+
+        processor = FileProcessor(app.config['UPLOAD_FOLDER'],
+                                  workers=app.config['ANALYSIS_WORKERS'] if workers is None else workers,
+                                  chunk_size=app.config['ANALYSIS_CHUNK_SIZE'],
+                                  analyzer_config=configure_analyzers(app.config))
+
+        def report(name, blocks):
+            click.echo(f'  {name}: {blocks} blocks')
+
+        click.echo(f'Shard {shard_index} of {shard_count}: {len(paths)} input files')
+        try:
+            shard = run_shard(list(paths), shard_index, shard_count, processor, output_dir, output_format,
+                              user_id, backend, rows_per_file or ROWS_PER_FILE,
+                              app.config['INSERT_BATCH_SIZE'], progress=report)
+        finally:
+            processor.shutdown()
+        total = shard['totals']['total']
+        elapsed = shard['elapsed_seconds']
+        click.echo(f"Shard {shard_index} of {shard_count}: {total} texts in {elapsed:.1f}s "
+                   f"({total / elapsed if elapsed else 0:,.0f} texts/s), "
+                   f"{len(shard['outputs']) or 'no'} part files")
+
+    @app.cli.command('batch-merge')
+    @click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+    @click.option('--out', type=click.Path(dir_okay=False), help='Write the merged stats as JSON here')
+    def batch_merge(paths, out):
+        """Combine the shard stats files (or directories of them) of one batch-analyze run"""
+        from batch_runner import merge_stats, write_stats
+
+        try:
+            merged = merge_stats(paths)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        if out:
+            write_stats(out, merged)
+        totals = merged['totals']
+        click.echo(f"{merged['shard_count']} shards, {totals['total']} texts: "
+                   f"{totals['positive']} positive, {totals['negative']} negative, "
+                   f"{totals['neutral']} neutral, average polarity {totals['avg_polarity']:.3f}")
+        for name, counters in merged['by_source'].items():
+            click.echo(f"  {name}: {counters['total']} texts, average polarity {counters['avg_polarity']:.3f}")
@@ -0,0 +1,341 @@
+from datetime import datetime
+from sqlalchemy import bindparam, case, func, insert, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from metrics import stage_timer
+from search import write_keywords
+from models import SentimentAnalysis, SentimentRollup, UserSentimentAggregate
+
+# Result keys copied into SentimentAnalysis rows
+ANALYSIS_COLUMNS = ('user_id', 'text', 'sentiment', 'confidence', 'polarity',
+                    'subjectivity', 'keywords', 'source_type', 'source_name', 'sentence_scores',
+                    'backend', 'model_version', 'occurrences')
+
+
+def bulk_insert_analyses(results, batch_size=1000):
+    """Insert analysis result dicts with executemany, committing every batch_size rows.
+    
+    Uses a Core insert rather than ORM objects; on PostgreSQL SQLAlchemy pages the
+    batch into multi-row VALUES statements (psycopg2 execute_values style).
+    Returns the number of rows written.
+    """
+    saved_count = 0
+    batch = []
+    for result in results:
+        batch.append(_analysis_row(result))
+        if len(batch) >= batch_size:
+            _insert_batch(batch)
+            saved_count += len(batch)
+            batch = []
+    if batch:
+        _insert_batch(batch)
+        saved_count += len(batch)
+    return saved_count
+
+
+def insert_analyses(results):
+    """Insert analysis result dicts in a single transaction and return their ids.
+
+    Ids come back in input order where the dialect can sort multi-row RETURNING
+    (SQLite 3.35+, PostgreSQL); otherwise the list holds None for every row.
+    """
+    rows = [_analysis_row(result) for result in results]
+    if not rows:
+        return []
+
+    try:
+        with stage_timer('db_insert'):
+            ids = _insert_rows(rows)
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return ids
+
+
+def _analysis_row(result):
+    row = {column: result.get(column) for column in ANALYSIS_COLUMNS}
+    row['source_type'] = row['source_type'] or 'text'
+    row['occurrences'] = row['occurrences'] or 1
+    # Set explicitly so the time-series rollups bucket rows exactly as stored
+    row['created_at'] = result.get('created_at') or datetime.utcnow()
+    return row
+
+
+def _insert_batch(rows):
+    try:
+        with stage_timer('db_insert'):
+            _insert_rows(rows)
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _insert_rows(rows):
+    """Insert analysis rows plus their keyword and aggregate rows in the current transaction.
+
+    Keyword rows need the new ids, so they are only written where the dialect can
+    return them in input order; `flask rebuild-search-index` fills them in elsewhere.
+    """
+    table = SentimentAnalysis.__table__
+    if db.session.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        ids = db.session.execute(statement, rows).scalars().all()
+    else:
+        db.session.execute(insert(table), rows)
+        ids = [None] * len(rows)
+
+    write_keywords((analysis_id, row['user_id'], row['keywords'])
+                   for row, analysis_id in zip(rows, ids) if analysis_id is not None)
+    update_aggregates(rows)
+    return ids
+
+
+def add_occurrences(increments):
+    """Add further occurrences to stored analyses, given {analysis id: added count}.
+
+    Aggregates and rollups count stored rows, so a text stored once with an
+    occurrence count weighs once in the statistics.
+    """
+    if not increments:
+        return
+    table = SentimentAnalysis.__table__
+    try:
+        with stage_timer('db_insert'):
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('analysis_id'))
+                .values(occurrences=func.coalesce(table.c.occurrences, 1) + bindparam('added')),
+                [{'analysis_id': analysis_id, 'added': added}
+                 for analysis_id, added in increments.items()]
+            )
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def ensure_columns():
+    """Add nullable columns missing from tables created before they were declared"""
+    engine = db.engine
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(
+                    f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}'
+                ))
+
+
+def ensure_indexes():
+    """Create declared indexes missing from tables that predate them"""
+    bind = db.session.get_bind()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+
+AGGREGATE_COUNTERS = ('total', 'positive', 'negative', 'neutral',
+                      'polarity_sum', 'subjectivity_sum', 'confidence_sum')
+
+
+def update_aggregates(rows, removed=()):
+    """Add new analysis rows to the per-user aggregates and rollups in the current transaction.
+
+    Rows in removed are taken back out, so re-scored rows pass their old values
+    there and their new values in rows.
+    """
+    deltas = {}
+    for sign, signed_rows in ((1, rows), (-1, removed)):
+        for row in signed_rows:
+            _add_to_delta(deltas, (row['user_id'], row.get('source_type') or 'text'), row, sign)
+
+    _upsert_counters(UserSentimentAggregate.__table__,
+                     [dict(delta, user_id=user_id, source_type=source_type)
+                      for (user_id, source_type), delta in deltas.items()])
+
+    update_rollups(rows, removed)
+
+
+ROLLUP_GRANULARITIES = ('hour', 'day')
+
+
+def bucket_start(timestamp, granularity):
+    """Truncate a timestamp to the start of its hour or day"""
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def update_rollups(rows, removed=()):
+    """Add new analysis rows to the hourly and daily rollups (and take removed rows out)
+    in the current transaction"""
+    deltas = {}
+    for sign, signed_rows in ((1, rows), (-1, removed)):
+        for row in signed_rows:
+            created_at = row.get('created_at') or datetime.utcnow()
+            for granularity in ROLLUP_GRANULARITIES:
+                key = (row['user_id'], granularity, bucket_start(created_at, granularity),
+                       row.get('source_name') or '')
+                _add_to_delta(deltas, key, row, sign)
+
+    _upsert_counters(SentimentRollup.__table__,
+                     [dict(delta, user_id=user_id, granularity=granularity, bucket=bucket,
+                           source_name=source_name)
+                      for (user_id, granularity, bucket, source_name), delta in deltas.items()])
+
+
+def _add_to_delta(deltas, key, row, sign=1):
+    delta = deltas.get(key)
+    if delta is None:
+        delta = deltas[key] = dict.fromkeys(AGGREGATE_COUNTERS, 0)
+        delta['polarity_sum'] = delta['subjectivity_sum'] = delta['confidence_sum'] = 0.0
+    delta['total'] += sign
+    if row['sentiment'] in ('positive', 'negative', 'neutral'):
+        delta[row['sentiment']] += sign
+    delta['polarity_sum'] += sign * (row.get('polarity') or 0.0)
+    delta['subjectivity_sum'] += sign * (row.get('subjectivity') or 0.0)
+    delta['confidence_sum'] += sign * (row.get('confidence') or 0.0)
+
+
+# Built once per table and dialect: constructing them per call dominated the time
+# writers hold SQLite's write lock
+_upsert_statements = {}
+
+
+def _upsert_counters(table, rows):
+    """Add each row's counters to the row with the same primary key, creating missing rows"""
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    keys = [column.name for column in table.primary_key.columns]
+
+    if dialect in ('sqlite', 'postgresql'):
+        statement = _upsert_statements.get((table.name, dialect))
+        if statement is None:
+            dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            statement = dialect_insert(table)
+            statement = _upsert_statements[(table.name, dialect)] = statement.on_conflict_do_update(
+                index_elements=keys,
+                set_={name: table.c[name] + statement.excluded[name] for name in AGGREGATE_COUNTERS}
+            )
+        db.session.execute(statement, rows)
+        return
+
+    for row in rows:
+        updated = db.session.execute(
+            table.update()
+            .where(*[table.c[name] == row[name] for name in keys])
+            .values({name: table.c[name] + row[name] for name in AGGREGATE_COUNTERS})
+        ).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(**row))
+
+
+def backfill_aggregates():
+    """Build the aggregates and rollups once for history that predates them.
+
+    A startup migration: it only runs while the aggregate or rollup table is
+    empty and analyses exist. On PostgreSQL concurrent starters queue on a table
+    lock and find the work done; SQLite serializes them on its write lock, and a
+    repeated rebuild yields the same rows. Returns True if it rebuilt.
+    """
+    def needed():
+        empty = any(db.session.execute(select(table.c.user_id).limit(1)).first() is None
+                    for table in (UserSentimentAggregate.__table__, SentimentRollup.__table__))
+        return (empty
+                and db.session.execute(select(SentimentAnalysis.__table__.c.id).limit(1)).first() is not None)
+
+    if not needed():
+        db.session.rollback()
+        return False
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(text(f'LOCK TABLE {UserSentimentAggregate.__table__.name} IN SHARE ROW EXCLUSIVE MODE'))
+        if not needed():
+            db.session.rollback()
+            return False
+    rebuild_aggregates()
+    return True
+
+
+def rebuild_aggregates(user_id=None):
+    """Recompute aggregates from stored analyses, for one user or everyone"""
+    table = UserSentimentAggregate.__table__
+    analyses = SentimentAnalysis.__table__
+    source_type = func.coalesce(analyses.c.source_type, 'text')
+
+    def sentiment_count(label):
+        return func.sum(case((analyses.c.sentiment == label, 1), else_=0))
+
+    query = select(
+        analyses.c.user_id,
+        source_type,
+        func.count(),
+        sentiment_count('positive'),
+        sentiment_count('negative'),
+        sentiment_count('neutral'),
+        func.coalesce(func.sum(analyses.c.polarity), 0.0),
+        func.coalesce(func.sum(analyses.c.subjectivity), 0.0),
+        func.coalesce(func.sum(analyses.c.confidence), 0.0),
+    ).group_by(analyses.c.user_id, source_type)
+
+    delete = table.delete()
+    if user_id is not None:
+        query = query.where(analyses.c.user_id == user_id)
+        delete = delete.where(table.c.user_id == user_id)
+
+    try:
+        db.session.execute(delete)
+        db.session.execute(table.insert().from_select(
+            ['user_id', 'source_type'] + list(AGGREGATE_COUNTERS), query
+        ))
+        _rebuild_rollups(user_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def rebuild_rollups(user_id=None):
+    """Recompute time-series rollups from stored analyses, for one user or everyone"""
+    try:
+        _rebuild_rollups(user_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _rebuild_rollups(user_id):
+    table = SentimentRollup.__table__
+    analyses = SentimentAnalysis.__table__
+    delete = table.delete()
+    query = select(analyses.c.user_id, analyses.c.created_at, analyses.c.source_name,
+                   analyses.c.sentiment, analyses.c.polarity, analyses.c.subjectivity,
+                   analyses.c.confidence)
+    if user_id is not None:
+        delete = delete.where(table.c.user_id == user_id)
+        query = query.where(analyses.c.user_id == user_id)
+    db.session.execute(delete)
+
+    # Bucketing in Python keeps this portable across dialects; memory grows with
+    # the number of buckets, not rows
+    deltas = {}
+    for row in db.session.execute(query.execution_options(yield_per=5000)).mappings():
+        created_at = row['created_at'] or datetime.utcnow()
+        for granularity in ROLLUP_GRANULARITIES:
+            key = (row['user_id'], granularity, bucket_start(created_at, granularity),
+                   row['source_name'] or '')
+            _add_to_delta(deltas, key, row)
+
+    rows = [dict(delta, user_id=key[0], granularity=key[1], bucket=key[2], source_name=key[3])
+            for key, delta in deltas.items()]
+    if rows:
+        db.session.execute(insert(table), rows)
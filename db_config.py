@@ -0,0 +1,75 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+SQLITE_JOURNAL_MODES = ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'OFF')
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def database_settings(environ=os.environ):
+    """Connection tuning from the environment, for both SQLite and PostgreSQL"""
+    settings = {
+        # SQLite: WAL lets readers and one writer work concurrently; NORMAL only
+        # syncs at checkpoints, which is durable against application crashes
+        'SQLITE_JOURNAL_MODE': environ.get('SQLITE_JOURNAL_MODE', 'WAL').upper(),
+        'SQLITE_SYNCHRONOUS': environ.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper(),
+        # How long a writer waits for the lock before "database is locked"
+        'SQLITE_BUSY_TIMEOUT_MS': int(environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000)),
+        # Reads go through a memory map of up to this many MB (0 disables)
+        'SQLITE_MMAP_MB': int(environ.get('SQLITE_MMAP_MB', 256)),
+        # PostgreSQL: connections per process, extra connections under bursts,
+        # seconds to wait for a free one, and a per-statement limit (0 disables)
+        'DB_POOL_SIZE': int(environ.get('DB_POOL_SIZE', 5)),
+        'DB_MAX_OVERFLOW': int(environ.get('DB_MAX_OVERFLOW', 10)),
+        'DB_POOL_TIMEOUT': int(environ.get('DB_POOL_TIMEOUT', 30)),
+        'DB_STATEMENT_TIMEOUT_MS': int(environ.get('DB_STATEMENT_TIMEOUT_MS', 30000)),
+    }
+    if settings['SQLITE_JOURNAL_MODE'] not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Unknown SQLITE_JOURNAL_MODE: {settings['SQLITE_JOURNAL_MODE']}")
+    if settings['SQLITE_SYNCHRONOUS'] not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"Unknown SQLITE_SYNCHRONOUS: {settings['SQLITE_SYNCHRONOUS']}")
+    return settings
+
+
+def engine_options(database_uri, settings, base_options=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URI, on top of base_options"""
+    options = dict(base_options or {})
+    backend = make_url(database_uri).get_backend_name()
+    if backend == 'postgresql':
+        options.update(pool_size=settings['DB_POOL_SIZE'],
+                       max_overflow=settings['DB_MAX_OVERFLOW'],
+                       pool_timeout=settings['DB_POOL_TIMEOUT'])
+        if settings['DB_STATEMENT_TIMEOUT_MS']:
+            connect_args = dict(options.get('connect_args', {}))
+            connect_args['options'] = f"-c statement_timeout={settings['DB_STATEMENT_TIMEOUT_MS']}"
+            options['connect_args'] = connect_args
+    elif backend == 'sqlite':
+        # pysqlite's own busy handler, matching the PRAGMA set on connect
+        connect_args = dict(options.get('connect_args', {}))
+        connect_args['timeout'] = settings['SQLITE_BUSY_TIMEOUT_MS'] / 1000
+        options['connect_args'] = connect_args
+    return options
+
+
+def configure_engine(engine, settings):
+    """Apply per-connection SQLite PRAGMAs to every new connection of an engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings['SQLITE_BUSY_TIMEOUT_MS']}",
+        f"PRAGMA synchronous = {settings['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA mmap_size = {settings['SQLITE_MMAP_MB'] * 1024 * 1024}",
+    ]
+    # In-memory databases have no journal file to switch
+    if engine.url.database not in (None, '', ':memory:'):
+        pragmas.insert(0, f"PRAGMA journal_mode = {settings['SQLITE_JOURNAL_MODE']}")
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import re
+import sqlite3
+import zlib
+import numpy as np
+
+# MinHash over shingles of word and punctuation tokens; 16 LSH bands of 4 rows make
+# texts with Jaccard similarity around 0.5 and up likely candidates, which are then
+# checked against the threshold using their full signatures. Token (not character)
+# shingles keep "very good" and "very bad", or ":)" and ":(", apart in short reviews.
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+_ROWS = NUM_PERM // BANDS
+_MERSENNE = (1 << 61) - 1
+_rng = np.random.default_rng(20240521)
+_PERM_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+# Odd multipliers folding each band's rows (and its index) into one 64-bit key
+_BAND_MIX = _rng.integers(1, 1 << 63, _ROWS + 1, dtype=np.uint64) | np.uint64(1)
+
+_TOKEN = re.compile(r"\w[\w']*|[^\w\s]+")
+
+# Host parameters per IN (...) lookup, below SQLite's historical 999 limit
+_LOOKUP_SIZE = 500
+# Texts per vectorized MinHash block (shingles x NUM_PERM uint64 values each)
+_SIGNATURE_BLOCK = 128
+
+
+def exact_key(text):
+    """64-bit digest of a text with whitespace normalized, as analysis sees it"""
+    digest = hashlib.blake2b(' '.join(text.split()).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+def shingle_hashes(text):
+    """Distinct crc32 hashes of the runs of SHINGLE_SIZE lowercase tokens in a text"""
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) <= SHINGLE_SIZE:
+        return [zlib.crc32(' '.join(tokens).encode('utf-8'))]
+    return list({zlib.crc32(' '.join(tokens[i:i + SHINGLE_SIZE]).encode('utf-8'))
+                 for i in range(len(tokens) - SHINGLE_SIZE + 1)})
+
+
+def minhash_signatures(texts):
+    """(len(texts), NUM_PERM) uint32 MinHash signatures, computed a block at a time"""
+    signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    for start in range(0, len(texts), _SIGNATURE_BLOCK):
+        block = [shingle_hashes(text) for text in texts[start:start + _SIGNATURE_BLOCK]]
+        offsets = np.cumsum([0] + [len(hashes) for hashes in block[:-1]])
+        flat = np.fromiter((h for hashes in block for h in hashes), dtype=np.uint64)
+        permuted = (flat[:, None] * _PERM_A + _PERM_B) % _MERSENNE
+        signatures[start:start + len(block)] = np.minimum.reduceat(permuted, offsets, axis=0) & 0xFFFFFFFF
+    return signatures
+
+
+def band_keys(signatures):
+    """(len(signatures), BANDS) int64 LSH bucket keys, distinct per band"""
+    rows = signatures.reshape(len(signatures), BANDS, _ROWS).astype(np.uint64)
+    band_index = np.arange(BANDS, dtype=np.uint64) + np.uint64(1)
+    keys = (rows * _BAND_MIX[:_ROWS]).sum(axis=2) + band_index * _BAND_MIX[_ROWS]
+    return keys.view(np.int64)
+
+
+class DedupPlan:
+    """Representative of every text in one chunk, and which texts need analysis"""
+
+    def __init__(self, reps, fresh):
+        self.reps = reps  # representative id per input position
+        self.fresh = fresh  # (rep, position) of texts seen for the first time
+
+    @property
+    def duplicates(self):
+        return len(self.reps) - len(self.fresh)
+
+    def counts(self):
+        """Occurrences of each representative in this chunk"""
+        counts = {}
+        for rep in self.reps:
+            counts[rep] = counts.get(rep, 0) + 1
+        return counts
+
+
+class Deduplicator:
+    """Finds repeated and near-repeated texts across one ingestion run.
+
+    Everything seen so far lives in a private temporary SQLite database (deleted on
+    close), so memory is bounded by the chunk being planned however long the file.
+    mode 'exact' matches texts equal up to whitespace; 'near' also matches texts
+    whose estimated Jaccard similarity over token shingles reaches threshold.
+    """
+
+    def __init__(self, mode='exact', threshold=0.8):
+        if mode not in ('exact', 'near'):
+            raise ValueError(f'Unknown dedup mode: {mode}')
+        self.mode = mode
+        self.threshold = threshold
+        self.duplicates = 0
+        self._next_rep = 0
+        self._db = sqlite3.connect('')
+        self._db.executescript('''
+            CREATE TABLE reps (rep INTEGER PRIMARY KEY, analysis_id INTEGER, result TEXT,
+                               signature BLOB);
+            CREATE TABLE exact (key INTEGER PRIMARY KEY, rep INTEGER NOT NULL);
+            CREATE TABLE bands (key INTEGER PRIMARY KEY, rep INTEGER NOT NULL);
+        ''')
+
+    def plan(self, texts):
+        """Map each text to a representative, assigning new ones to unseen texts"""
+        keys = [exact_key(text) for text in texts]
+        known = self._lookup('exact', keys)
+        reps = [None] * len(texts)
+        first_seen = {}  # exact key -> position of its first occurrence in this chunk
+        fresh_positions = []
+        for i, key in enumerate(keys):
+            rep = known.get(key)
+            if rep is not None:
+                reps[i] = rep
+            elif key in first_seen:
+                continue  # resolved below, once its first occurrence has a rep
+            else:
+                first_seen[key] = i
+                fresh_positions.append(i)
+
+        if self.mode == 'near' and fresh_positions:
+            fresh = self._match_near(texts, keys, fresh_positions, reps)
+        else:
+            fresh = []
+            for i in fresh_positions:
+                reps[i] = self._new_rep()
+                fresh.append((reps[i], i))
+            self._db.executemany('INSERT INTO exact VALUES (?, ?)',
+                                 [(keys[i], reps[i]) for i in fresh_positions])
+
+        self._db.commit()
+
+        for i, key in enumerate(keys):
+            if reps[i] is None:
+                reps[i] = reps[first_seen[key]]
+        plan = DedupPlan(reps, fresh)
+        self.duplicates += plan.duplicates
+        return plan
+
+    def _match_near(self, texts, keys, positions, reps):
+        signatures = minhash_signatures([texts[i] for i in positions])
+        text_bands = band_keys(signatures).tolist()
+        stored_bands = self._lookup('bands', [key for bands in text_bands for key in bands])
+        candidate_signatures = self._signatures(set(stored_bands.values()))
+
+        fresh = []
+        chunk_bands = {}
+        for i, signature, bands in zip(positions, signatures, text_bands):
+            candidates = {rep for band_key in bands
+                          for rep in (stored_bands.get(band_key), chunk_bands.get(band_key))
+                          if rep is not None}
+            if candidates:
+                candidates = list(candidates)
+                matrix = np.array([candidate_signatures[rep] for rep in candidates])
+                similarity = np.count_nonzero(matrix == signature, axis=1) / NUM_PERM
+                best = int(similarity.argmax())
+                if similarity[best] >= self.threshold:
+                    reps[i] = candidates[best]
+                    continue
+            reps[i] = self._new_rep()
+            fresh.append((reps[i], i))
+            candidate_signatures[reps[i]] = signature
+            for band_key in bands:
+                chunk_bands.setdefault(band_key, reps[i])
+
+        # Near matches also become exact keys, so their repeats skip MinHash next time
+        self._db.executemany('INSERT OR IGNORE INTO exact VALUES (?, ?)',
+                             [(keys[i], reps[i]) for i in positions])
+        self._db.executemany('INSERT OR IGNORE INTO bands VALUES (?, ?)', chunk_bands.items())
+        self._db.executemany('INSERT INTO reps (rep, signature) VALUES (?, ?)',
+                             [(rep, candidate_signatures[rep].tobytes()) for rep, _ in fresh])
+        return fresh
+
+    def remember(self, plan, results=None, analysis_ids=None):
+        """Store the result and/or stored row id of each fresh text for later occurrences"""
+        results = results or [None] * len(plan.fresh)
+        analysis_ids = analysis_ids or [None] * len(plan.fresh)
+        rows = []
+        for (rep, _), result, analysis_id in zip(plan.fresh, results, analysis_ids):
+            if result is not None:
+                result = json.dumps({key: value for key, value in result.items() if key != 'text'})
+            rows.append((rep, analysis_id, result))
+        self._db.executemany(
+            'INSERT INTO reps (rep, analysis_id, result) VALUES (?, ?, ?) '
+            'ON CONFLICT (rep) DO UPDATE SET analysis_id = excluded.analysis_id, result = excluded.result',
+            rows
+        )
+        self._db.commit()
+
+    def fan_out(self, plan, texts, results):
+        """Per-position results: each text gets its representative's analysis"""
+        by_rep = {rep: result for (rep, _), result in zip(plan.fresh, results)}
+        by_rep.update({rep: result for rep, (_, result) in
+                       self.stored(set(plan.reps) - set(by_rep)).items()})
+        return [dict(by_rep[rep], text=text) for rep, text in zip(plan.reps, texts)]
+
+    def stored(self, reps):
+        """{rep: (analysis_id, result)} for representatives remembered earlier"""
+        found = {}
+        reps = list(reps)
+        for start in range(0, len(reps), _LOOKUP_SIZE):
+            batch = reps[start:start + _LOOKUP_SIZE]
+            query = (f'SELECT rep, analysis_id, result FROM reps '
+                     f'WHERE rep IN ({",".join("?" * len(batch))})')
+            for rep, analysis_id, result in self._db.execute(query, batch):
+                found[rep] = (analysis_id, json.loads(result) if result else None)
+        return found
+
+    def close(self):
+        """Drop the temporary index"""
+        self._db.close()
+
+    def _new_rep(self):
+        self._next_rep += 1
+        return self._next_rep
+
+    def _lookup(self, table, keys):
+        found = {}
+        keys = list(set(keys))
+        for start in range(0, len(keys), _LOOKUP_SIZE):
+            batch = keys[start:start + _LOOKUP_SIZE]
+            query = f'SELECT key, rep FROM {table} WHERE key IN ({",".join("?" * len(batch))})'
+            found.update(self._db.execute(query, batch))
+        return found
+
+    def _signatures(self, reps):
+        signatures = {}
+        reps = list(reps)
+        for start in range(0, len(reps), _LOOKUP_SIZE):
+            batch = reps[start:start + _LOOKUP_SIZE]
+            query = f'SELECT rep, signature FROM reps WHERE rep IN ({",".join("?" * len(batch))})'
+            for rep, signature in self._db.execute(query, batch):
+                signatures[rep] = np.frombuffer(signature, dtype=np.uint32)
+        return signatures
@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import select
+from app import db
+from models import SentimentAnalysis
+from search import filter_analyses, parse_filter_args
+
+EXPORT_COLUMNS = ['id', 'text', 'sentiment', 'confidence', 'polarity',
+                  'subjectivity', 'keywords', 'source_type', 'source_name', 'created_at',
+                  'sentence_scores', 'backend', 'model_version']
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Rows fetched per round trip (server-side cursor on PostgreSQL) and per output chunk
+FETCH_SIZE = 1000
+
+
+def parse_export_args(args):
+    """Validate export query parameters into (format, columns, filters)"""
+    export_format = args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format: {export_format}')
+
+    columns = EXPORT_COLUMNS
+    if args.get('columns'):
+        columns = [c.strip() for c in args['columns'].split(',') if c.strip()]
+        unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+        if unknown or not columns:
+            raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+
+    return export_format, columns, parse_filter_args(args)
+
+
+def iter_export_rows(user_id, columns, filters):
+    """Yield projected rows as tuples, streaming from the database"""
+    table = SentimentAnalysis.__table__
+    query = filter_analyses(select(*[table.c[c] for c in columns]).where(table.c.user_id == user_id),
+                            filters)
+    query = query.order_by(table.c.created_at.desc(), table.c.id.desc())
+
+    result = db.session.execute(query.execution_options(yield_per=FETCH_SIZE))
+    for row in result:
+        yield tuple(value.isoformat() if isinstance(value, datetime) else value
+                    for value in row)
+
+
+def stream_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % FETCH_SIZE == 0:
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+
+def stream_jsonl(rows, columns):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row))))
+        if len(lines) >= FETCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def stream_parquet(rows, columns):
+    """Write one Parquet row group per FETCH_SIZE rows, yielding bytes as they are written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(c, pa.type_for_alias(_PARQUET_TYPES[c])) for c in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= FETCH_SIZE:
+            writer.write_table(_parquet_table(pa, schema, columns, batch))
+            batch = []
+            yield sink.drain()
+    if batch:
+        writer.write_table(_parquet_table(pa, schema, columns, batch))
+    writer.close()
+    yield sink.drain()
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _parquet_table(pa, schema, columns, rows):
+    return pa.Table.from_arrays(
+        [pa.array([row[i] for row in rows], type=schema.field(c).type) for i, c in enumerate(columns)],
+        schema=schema
+    )
+
+
+def _drain(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+# Arrow type aliases per exported column
+_PARQUET_TYPES = {
+    'id': 'int64', 'text': 'string', 'sentiment': 'string', 'confidence': 'double',
+    'polarity': 'double', 'subjectivity': 'double', 'keywords': 'string',
+    'source_type': 'string', 'source_name': 'string', 'created_at': 'string',
+    'sentence_scores': 'string', 'backend': 'string', 'model_version': 'string',
+}
+
+
+class _ChunkSink:
+    """Minimal writable file object that hands written bytes back in chunks"""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
@@ -1,14 +1,57 @@
 import os
+import io
 import csv
-import pandas as pd
+import time
+import uuid
+from collections import deque
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
 from werkzeug.utils import secure_filename
 from sentiment_analyzer import SentimentAnalyzer
+from sentiment_backends import configure_backends
+from result_cache import create_cache
+from analyzer_registry import get_analyzer
+from metrics import STAGE_SECONDS, configure_shared, flush, stage_timer
+from mmap_reader import MappedLines, read_range
+
+# Per-process analyzer used by pool workers
+_worker_analyzer = None
+
+def _init_worker(analyzer_config):
+    """Create and warm one analyzer per worker process"""
+    global _worker_analyzer
+    configure_backends(analyzer_config)
+    configure_shared(analyzer_config.get('METRICS_DIR'))
+    _worker_analyzer = SentimentAnalyzer(cache=create_cache(analyzer_config),
+                                         keyword_mode=analyzer_config.get('KEYWORD_MODE') or 'fast',
+                                         backend=analyzer_config.get('SENTIMENT_BACKEND') or 'textblob')
+    _worker_analyzer.get_backend()
+
+def _analyze_chunk(texts, backend=None):
+    """Analyze one chunk of texts inside a worker process"""
+    results = _worker_analyzer.analyze_batch(texts, backend=backend)
+    flush()  # pool workers exit without running atexit hooks
+    return results
+
+def _analyze_range(filepath, byte_range, backend=None):
+    """Read and analyze one byte range of a TXT file inside a worker process"""
+    results = _worker_analyzer.analyze_batch(read_range(filepath, *byte_range), backend=backend)
+    flush()
+    return results
 
 class FileProcessor:
-    def __init__(self, upload_folder):
+    def __init__(self, upload_folder, workers=0, chunk_size=2000, analyzer=None, analyzer_config=None):
         self.upload_folder = upload_folder
-        self.analyzer = SentimentAnalyzer()
+        self._analyzer = analyzer  # None uses the process-wide shared analyzer
         self.allowed_extensions = {'txt', 'csv'}
+        self.workers = workers  # 0 analyzes in the calling process
+        self.chunk_size = max(1, chunk_size)
+        self.analyzer_config = analyzer_config or {}  # cache and keyword settings for pool workers
+        self._pool = None
+    
+    @property
+    def analyzer(self):
+        return self._analyzer or get_analyzer()
     
     def is_allowed_file(self, filename):
         """Check if file extension is allowed"""
@@ -19,86 +62,174 @@ class FileProcessor:
         """Save uploaded file and return filename"""
         if file and self.is_allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            filepath = os.path.join(self.upload_folder, filename)
+            # Unique on disk so queued uploads with the same name don't collide
+            filepath = os.path.join(self.upload_folder, f'{uuid.uuid4().hex}_{filename}')
             file.save(filepath)
             return filename, filepath
         return None, None
     
     def process_file(self, filepath, filename):
         """Process uploaded file and extract text for analysis"""
+        return [text for texts, _ in self.iter_text_chunks(filepath, filename) for text in texts]
+    
+    def iter_text_chunks(self, filepath, filename, chunk_size=None):
+        """Stream texts from a file as (texts, bytes_read) chunks with bounded memory"""
+        chunk_size = chunk_size or self.chunk_size
         file_extension = filename.rsplit('.', 1)[1].lower()
         
         try:
             if file_extension == 'txt':
-                return self._process_txt_file(filepath)
+                # Memory-mapped: lines are decoded one at a time straight from the page cache
+                source = MappedLines(filepath)
+                texts = source.iter_texts()
+                position = lambda: source.position
             elif file_extension == 'csv':
-                return self._process_csv_file(filepath)
+                source = open(filepath, 'rb')
+                texts = self._iter_csv_texts(source)
+                position = source.tell
+            else:
+                return
+            
+            with source:
+                # Parse time excludes whatever the consumer does between chunks
+                batch = []
+                started = time.perf_counter()
+                for text in texts:
+                    batch.append(text)
+                    if len(batch) >= chunk_size:
+                        STAGE_SECONDS.observe(time.perf_counter() - started, stage='parse')
+                        yield batch, position()
+                        batch = []
+                        started = time.perf_counter()
+                if batch:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, stage='parse')
+                    yield batch, position()
         except Exception as e:
             raise Exception(f"Error processing file: {str(e)}")
-        
-        return []
     
     def _process_txt_file(self, filepath):
         """Process TXT file"""
-        texts = []
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as file:
-            content = file.read()
-            # Split by lines or paragraphs for individual analysis
-            lines = content.split('\n')
-            for line in lines:
-                line = line.strip()
-                if line and len(line) > 10:  # Only process meaningful lines
-                    texts.append(line)
-        return texts
+        with MappedLines(filepath) as lines:
+            return list(lines.iter_texts())
     
     def _process_csv_file(self, filepath):
         """Process CSV file"""
-        texts = []
+        with open(filepath, 'rb') as handle:
+            return list(self._iter_csv_texts(handle))
+    
+    def _iter_csv_texts(self, handle):
+        """Yield text cells from a binary CSV handle, reading rows in chunks"""
+        yielded = False
         try:
-            # Try to read CSV with pandas
-            df = pd.read_csv(filepath, encoding='utf-8')
+            # pandas costs ~0.3s to import, so only CSV parsing pays for it
+            import pandas as pd
             
-            # Look for text columns (common names)
-            text_columns = []
-            for col in df.columns:
-                col_lower = col.lower()
-                if any(keyword in col_lower for keyword in ['text', 'comment', 'review', 'message', 'content', 'description']):
-                    text_columns.append(col)
-            
-            # If no obvious text columns, use all string columns
-            if not text_columns:
-                text_columns = df.select_dtypes(include=['object']).columns.tolist()
-            
-            # Extract text from identified columns
-            for col in text_columns:
-                for value in df[col].dropna():
-                    if isinstance(value, str) and len(value.strip()) > 10:
-                        texts.append(value.strip())
-                        
-        except Exception as e:
+            # Try to read CSV with pandas, a chunk of rows at a time
+            text_columns = None
+            for df in pd.read_csv(handle, encoding='utf-8', chunksize=self.chunk_size):
+                if text_columns is None:
+                    text_columns = self._pick_text_columns(df)
+                
+                # Extract text from identified columns
+                for col in text_columns:
+                    for value in df[col].dropna():
+                        if isinstance(value, str) and len(value.strip()) > 10:
+                            yielded = True
+                            yield value.strip()
+        except Exception:
+            if yielded:
+                raise
             # Fallback to basic CSV reading
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as file:
-                csv_reader = csv.reader(file)
-                for row in csv_reader:
+            handle.seek(0)
+            reader = io.TextIOWrapper(handle, encoding='utf-8', errors='ignore', newline='')
+            try:
+                for row in csv.reader(reader):
                     for cell in row:
                         if cell and len(cell.strip()) > 10:
-                            texts.append(cell.strip())
+                            yield cell.strip()
+            finally:
+                reader.detach()
+    
+    def _pick_text_columns(self, df):
+        """Choose text columns from the header, or string columns of the first chunk"""
+        # Look for text columns (common names)
+        text_columns = []
+        for col in df.columns:
+            col_lower = str(col).lower()
+            if any(keyword in col_lower for keyword in ['text', 'comment', 'review', 'message', 'content', 'description']):
+                text_columns.append(col)
+        
+        # If no obvious text columns, use all string columns
+        if not text_columns:
+            text_columns = df.select_dtypes(include=['object']).columns.tolist()
+        return text_columns
+    
+    def analyze_file_content(self, texts, source_name, user_id, backend=None):
+        """Analyze extracted texts and return results in input order; backend None uses the default"""
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
         
-        return texts
-    
-    def analyze_file_content(self, texts, source_name, user_id):
-        """Analyze extracted texts and return results"""
-        results = []
-        for text in texts:
-            analysis = self.analyzer.analyze_text(text)
-            if analysis:
-                analysis['source_type'] = 'file'
-                analysis['source_name'] = source_name
-                analysis['user_id'] = user_id
-                results.append(analysis)
+        if self.workers > 0 and len(chunks) > 1:
+            # Stage timers inside pool workers stay in those processes; time the whole fan-out here
+            with stage_timer('pool_analyze'):
+                chunk_results = list(self._get_pool().map(_analyze_chunk, chunks, repeat(backend)))
+        else:
+            chunk_results = (self.analyzer.analyze_batch(chunk, backend=backend) for chunk in chunks)
+        
+        return [analysis for chunk in chunk_results
+                for analysis in self._tag_results(chunk, source_name, user_id)]
+    
+    def can_analyze_ranges(self, filename):
+        """True when pool workers can read this file's byte ranges themselves (TXT files)"""
+        return self.workers > 0 and filename.rsplit('.', 1)[1].lower() == 'txt'
+    
+    def iter_analyzed_ranges(self, filepath, source_name, user_id, backend=None, blocks=None):
+        """Analyze a TXT file in the worker pool, yielding (results, bytes_read) in file order.
         
+        Workers are sent (path, start, end) and map the file themselves, so no text is
+        parsed or pickled on the way in; at most two ranges per worker are in flight.
+        blocks limits the work to those (start, end) ranges of the file.
+        """
+        with MappedLines(filepath) as lines:
+            target = self.chunk_size * lines.average_line_bytes()
+            ranges = [byte_range for start, end in blocks or [(0, lines.size)]
+                      for byte_range in lines.split(target, start, end)]
+        
+        pool = self._get_pool()
+        pending = deque()
+        for byte_range in ranges:
+            pending.append((pool.submit(_analyze_range, filepath, byte_range, backend), byte_range[1]))
+            if len(pending) >= 2 * self.workers:
+                yield self._collect_range(pending.popleft(), source_name, user_id)
+        while pending:
+            yield self._collect_range(pending.popleft(), source_name, user_id)
+    
+    def _collect_range(self, submitted, source_name, user_id):
+        future, end = submitted
+        started = time.perf_counter()
+        results = future.result()
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage='pool_analyze')
+        return self._tag_results(results, source_name, user_id), end
+    
+    def _tag_results(self, results, source_name, user_id):
+        for analysis in results:
+            analysis['source_type'] = 'file'
+            analysis['source_name'] = source_name
+            analysis['user_id'] = user_id
         return results
     
+    def _get_pool(self):
+        """Start the worker pool on first use and keep it for later uploads"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self.analyzer_config,))
+        return self._pool
+    
+    def shutdown(self):
+        """Stop the worker pool, if one was started"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+    
     def cleanup_file(self, filepath):
         """Remove uploaded file after processing"""
         try:
@@ -0,0 +1,208 @@
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from database import add_occurrences, bulk_insert_analyses, insert_analyses
+from metrics import BYTES_INGESTED, stage_timer
+from models import AnalysisJob
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """In-process background workers for upload analysis jobs"""
+
+    def __init__(self):
+        self.app = None
+        self.file_processor = None
+        self.workers = 1
+        self.stale_after = timedelta(seconds=900)
+        self._queue = queue.Queue()
+        self._threads = []
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app, file_processor, workers=1, stale_seconds=900):
+        """Attach to the app; worker threads start with the first request in each process"""
+        self.app = app
+        self.file_processor = file_processor
+        self.workers = max(1, workers)
+        self.stale_after = timedelta(seconds=stale_seconds)
+        # Threads started at import would stay behind in a gunicorn --preload master
+        app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        """Start worker threads in this process, fail jobs orphaned by a dead worker and
+        pick up jobs left queued by a previous run"""
+        if self._started_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_pid == os.getpid():
+                return
+            # A forked child inherits the parent's queue object but none of its threads
+            self._queue = queue.Queue()
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._started_pid = os.getpid()
+
+            with self.app.app_context():
+                self._fail_stale_jobs()
+                for (job_id,) in db.session.query(AnalysisJob.id).filter_by(status='queued'):
+                    self._queue.put(job_id)
+
+    def _fail_stale_jobs(self):
+        """Mark running jobs without recent progress failed so their pollers finish.
+
+        They are not re-run: rows from their committed chunks are already stored.
+        Jobs still making progress in another process keep a fresh heartbeat.
+        """
+        heartbeat = db.func.coalesce(AnalysisJob.heartbeat_at, AnalysisJob.started_at, AnalysisJob.created_at)
+        stale = (AnalysisJob.status == 'running', heartbeat < datetime.utcnow() - self.stale_after)
+        for job_id, filepath in db.session.query(AnalysisJob.id, AnalysisJob.filepath).filter(*stale).all():
+            # Conditional, so each orphan is failed (and its upload removed) by one process only
+            failed = AnalysisJob.query.filter(AnalysisJob.id == job_id, *stale).update({
+                'status': 'failed', 'finished_at': datetime.utcnow(),
+                'error': 'Interrupted: the worker processing this job stopped; upload the file again',
+            }, synchronize_session=False)
+            db.session.commit()
+            if failed:
+                logger.warning('Job %s was left running by a dead worker; marked failed', job_id)
+                # analyze-file jobs point at the caller's own file, which stays in place
+                if os.path.dirname(os.path.abspath(filepath)) == os.path.abspath(self.file_processor.upload_folder):
+                    self.file_processor.cleanup_file(filepath)
+
+    def submit(self, job_id):
+        """Queue a job id for processing"""
+        self.ensure_started()
+        self._queue.put(job_id)
+
+    def _worker_loop(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    self._run(job_id)
+            except Exception:
+                logger.exception('Job %s crashed', job_id)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id):
+        # Claim atomically so jobs re-queued by several processes run only once
+        claimed = AnalysisJob.query.filter_by(id=job_id, status='queued').update(
+            {'status': 'running', 'started_at': datetime.utcnow(), 'heartbeat_at': datetime.utcnow()}
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(AnalysisJob, job_id)
+        try:
+            process_upload_job(job, self.file_processor)
+            job.status = 'completed'
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(AnalysisJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            logger.exception('Job %s failed', job_id)
+        finally:
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            self.file_processor.cleanup_file(job.filepath)
+
+
+def process_upload_job(job, file_processor):
+    """Stream, analyze and store one uploaded file, committing progress per chunk"""
+    job.size_bytes = os.path.getsize(job.filepath)
+    db.session.commit()
+
+    config = current_app.config
+    batch_size = config['INSERT_BATCH_SIZE']
+    step = file_processor.chunk_size * max(1, file_processor.workers)
+    deduplicator = None
+    if config['DEDUP_MODE'] != 'off':
+        from dedup import Deduplicator
+        deduplicator = Deduplicator(config['DEDUP_MODE'], config['DEDUP_THRESHOLD'])
+    try:
+        if config['DEDUP_MODE'] != 'near' and file_processor.can_analyze_ranges(job.filename):
+            # Workers map the file and read their own byte ranges; nothing is parsed here.
+            # Exact dedup runs over what each range returns, after it was scored
+            for results, bytes_read in file_processor.iter_analyzed_ranges(
+                    job.filepath, job.filename, job.user_id, job.backend):
+                if deduplicator is None:
+                    saved_count = bulk_insert_analyses(results, batch_size)
+                else:
+                    texts = [result['text'] for result in results]
+                    with stage_timer('dedup'):
+                        plan = deduplicator.plan(texts)
+                    saved_count = _store_plan(plan, texts, [results[i] for _, i in plan.fresh],
+                                              deduplicator, config['DEDUP_STORE'], batch_size)
+                    job.duplicates = deduplicator.duplicates
+                _record_chunk(job, len(results), saved_count, bytes_read)
+        else:
+            for texts, bytes_read in file_processor.iter_text_chunks(job.filepath, job.filename, step):
+                if deduplicator is None:
+                    results = file_processor.analyze_file_content(texts, job.filename, job.user_id,
+                                                                  job.backend)
+                    saved_count = bulk_insert_analyses(results, batch_size)
+                else:
+                    saved_count = _store_deduplicated(job, texts, file_processor, deduplicator,
+                                                      config['DEDUP_STORE'], batch_size)
+                    job.duplicates = deduplicator.duplicates
+                _record_chunk(job, len(texts), saved_count, bytes_read)
+    finally:
+        if deduplicator is not None:
+            deduplicator.close()
+
+    if not job.total:
+        raise Exception('No text content found in file')
+
+
+def _record_chunk(job, count, saved_count, bytes_read):
+    """Add one stored chunk to the job's progress counters and commit them"""
+    job.total += count
+    job.processed += count
+    job.saved_count += saved_count
+    BYTES_INGESTED.inc(bytes_read - (job.bytes_read or 0), source='upload')
+    job.bytes_read = bytes_read
+    job.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _store_deduplicated(job, texts, file_processor, deduplicator, store, batch_size):
+    """Analyze a chunk's unseen texts once, then store a row per occurrence ('fanout')
+    or one row per distinct text with its occurrence count ('count')"""
+    with stage_timer('dedup'):
+        plan = deduplicator.plan(texts)
+    fresh = file_processor.analyze_file_content([texts[i] for _, i in plan.fresh],
+                                                job.filename, job.user_id, job.backend)
+    return _store_plan(plan, texts, fresh, deduplicator, store, batch_size)
+
+
+def _store_plan(plan, texts, fresh, deduplicator, store, batch_size):
+    """Store a planned chunk of texts given the analyses of its fresh ones"""
+    if store == 'count':
+        counts = plan.counts()
+        for (rep, _), result in zip(plan.fresh, fresh):
+            result['occurrences'] = counts.pop(rep)
+        deduplicator.remember(plan, analysis_ids=insert_analyses(fresh))
+        # Whatever is left repeats texts stored by earlier chunks
+        add_occurrences({analysis_id: counts[rep]
+                         for rep, (analysis_id, _) in deduplicator.stored(counts).items()
+                         if analysis_id is not None})
+        return len(fresh)
+
+    deduplicator.remember(plan, fresh)
+    with stage_timer('dedup'):
+        results = deduplicator.fan_out(plan, texts, fresh)
+    return bulk_insert_analyses(results, batch_size)
+
+
+job_queue = JobQueue()
@@ -0,0 +1,68 @@
+import re
+from collections import Counter
+
+# Common stop words to filter out of keywords
+STOP_WORDS = frozenset({
+    'this', 'that', 'with', 'have', 'will', 'from', 'they', 'know',
+    'want', 'been', 'good', 'much', 'some', 'time', 'very', 'when',
+    'come', 'here', 'just', 'like', 'long', 'make', 'many', 'over',
+    'such', 'take', 'than', 'them', 'well', 'were', 'what'
+})
+
+# Words, plus clause punctuation so bigrams never span a comma or sentence break
+WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9'\-]*[a-z0-9]|[a-z0-9]|[.,;:!?()\"]")
+
+MAX_KEYWORDS = 10
+
+
+class FastKeywordExtractor:
+    """Content words plus adjacent content-word bigrams, counted with one regex pass"""
+
+    name = 'fast'
+
+    def extract(self, cleaned_text, blob=None):
+        tokens = WORD_PATTERN.findall(cleaned_text.lower())
+        keep = [len(token) > 3 and token not in STOP_WORDS for token in tokens]
+
+        words = [token for token, kept in zip(tokens, keep) if kept]
+        # Bigrams of neighbouring content words stand in for noun phrases ("battery life")
+        bigrams = [f'{tokens[i]} {tokens[i + 1]}'
+                   for i in range(len(tokens) - 1) if keep[i] and keep[i + 1]]
+
+        return dict(Counter(words + bigrams).most_common(MAX_KEYWORDS))
+
+
+class NounPhraseKeywordExtractor:
+    """TextBlob noun phrases plus content words; slower but linguistically aware"""
+
+    name = 'accurate'
+
+    def extract(self, cleaned_text, blob=None):
+        if blob is None:
+            from textblob import TextBlob
+            blob = TextBlob(cleaned_text)
+
+        # Get noun phrases
+        noun_phrases = list(blob.noun_phrases)
+
+        # Get individual words (filter out stop words and short words)
+        words = [word.lower() for word in blob.words
+                 if len(word) > 3 and word.lower() not in STOP_WORDS]
+
+        # Combine and count
+        keyword_counts = Counter(noun_phrases + words)
+        return dict(keyword_counts.most_common(MAX_KEYWORDS))
+
+
+KEYWORD_EXTRACTORS = {
+    FastKeywordExtractor.name: FastKeywordExtractor,
+    NounPhraseKeywordExtractor.name: NounPhraseKeywordExtractor,
+}
+
+
+def get_keyword_extractor(mode):
+    """Return an extractor instance for a registered mode name"""
+    try:
+        return KEYWORD_EXTRACTORS[mode]()
+    except KeyError:
+        raise ValueError(f'Unknown keyword mode: {mode}')
@@ -0,0 +1,176 @@
+import csv
+import hashlib
+import os
+import zlib
+import numpy as np
+from vader_engine import NEGATIONS
+
+CLASSES = ('negative', 'neutral', 'positive')
+
+HASH_BITS = 20
+_HASH_MASK = (1 << HASH_BITS) - 1
+
+# Punctuation and contrast words end the scope of a negation
+_SCOPE_BREAKS = frozenset('.,;!?') | {'but'}
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_MODEL_PATH = os.path.join(DATA_DIR, 'hashed_linear.npz')
+LABELED_SAMPLE_PATH = os.path.join(DATA_DIR, 'labeled_sample.tsv')
+
+
+def feature_ids(tokens):
+    """Hashed unigram, negation-scoped unigram and bigram features of one token list"""
+    features = []
+    negated = False
+    previous = None
+    for token in tokens:
+        word = token.lower().replace('’', "'")
+        if word in _SCOPE_BREAKS:
+            negated = False
+            previous = None
+            features.append(word)
+            continue
+        # "not good" and "good" are different features; so is the bigram
+        features.append(f'~{word}' if negated else word)
+        if previous is not None:
+            features.append(f'{previous} {word}')
+        if word in NEGATIONS or word.endswith("n't"):
+            negated = True
+        previous = word
+    return [zlib.crc32(feature.encode('utf-8')) & _HASH_MASK for feature in features]
+
+
+def _sparse_rows(token_lists):
+    """Flat (row, feature id, value) arrays, each row scaled to unit length"""
+    ids_per_row = [feature_ids(tokens) for tokens in token_lists]
+    lengths = np.fromiter((len(ids) for ids in ids_per_row), dtype=np.int64, count=len(ids_per_row))
+    rows = np.repeat(np.arange(len(ids_per_row)), lengths)
+    ids = np.fromiter((i for row in ids_per_row for i in row), dtype=np.int64, count=int(lengths.sum()))
+    values = 1.0 / np.sqrt(np.maximum(lengths, 1))[rows]
+    return rows, ids, values
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class HashedLinearModel:
+    """Multinomial logistic regression over hashed features, stored sparsely"""
+
+    def __init__(self, ids, weights, bias):
+        self.ids = ids  # sorted feature ids with a learned weight row
+        self.weights = np.vstack((weights, np.zeros((1, len(CLASSES)))))  # last row: unseen
+        self.bias = bias
+
+    def predict_proba(self, token_lists):
+        """Class probabilities (rows in CLASSES order) for a list of token lists"""
+        count = len(token_lists)
+        rows, ids, values = _sparse_rows(token_lists)
+        positions = np.searchsorted(self.ids, ids)
+        positions[positions == len(self.ids)] = 0
+        found = self.ids[positions] == ids if len(self.ids) else np.zeros(len(ids), dtype=bool)
+        positions = np.where(found, positions, len(self.ids))
+        contributions = self.weights[positions] * values[:, None]
+        logits = np.column_stack([np.bincount(rows, weights=contributions[:, k], minlength=count)
+                                  for k in range(len(CLASSES))]) + self.bias
+        return _softmax(logits)
+
+    def digest(self):
+        """Short hash of the weights, as saved, identifying this model's scores"""
+        digest = hashlib.blake2b(digest_size=8)
+        for array in (self.ids.astype(np.uint32), self.weights[:-1].astype(np.float16),
+                      self.bias.astype(np.float32)):
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    def save(self, path):
+        """Write the model as a compressed .npz"""
+        np.savez_compressed(path, ids=self.ids.astype(np.uint32),
+                            weights=self.weights[:-1].astype(np.float16),
+                            bias=self.bias.astype(np.float32), hash_bits=HASH_BITS)
+
+    @classmethod
+    def load(cls, path=None):
+        """Read a model written by save()"""
+        with np.load(path or DEFAULT_MODEL_PATH) as data:
+            if int(data['hash_bits']) != HASH_BITS:
+                raise ValueError(f'{path} was trained with {int(data["hash_bits"])} hash bits')
+            return cls(data['ids'].astype(np.int64), data['weights'].astype(np.float64),
+                       data['bias'].astype(np.float64))
+
+
+def train(token_lists, labels, sample_weights=None, epochs=300, learning_rate=0.5, l2=1e-4):
+    """Fit a HashedLinearModel with full-batch AdaGrad; labels are CLASSES names"""
+    count = len(token_lists)
+    rows, ids, values = _sparse_rows(token_lists)
+    feature_space, columns = np.unique(ids, return_inverse=True)
+    targets = np.zeros((count, len(CLASSES)))
+    targets[np.arange(count), [CLASSES.index(label) for label in labels]] = 1.0
+    sample_weights = np.ones(count) if sample_weights is None else np.asarray(sample_weights, dtype=np.float64)
+    sample_weights = sample_weights / sample_weights.sum()
+
+    weights = np.zeros((len(feature_space), len(CLASSES)))
+    bias = np.zeros(len(CLASSES))
+    weight_history = np.full_like(weights, 1e-8)
+    bias_history = np.full_like(bias, 1e-8)
+    for _ in range(epochs):
+        contributions = weights[columns] * values[:, None]
+        logits = np.column_stack([np.bincount(rows, weights=contributions[:, k], minlength=count)
+                                  for k in range(len(CLASSES))]) + bias
+        error = (_softmax(logits) - targets) * sample_weights[:, None]
+        gradient = np.column_stack([
+            np.bincount(columns, weights=values * error[rows, k], minlength=len(feature_space))
+            for k in range(len(CLASSES))
+        ]) + l2 * weights
+        bias_gradient = error.sum(axis=0)
+        weight_history += gradient ** 2
+        bias_history += bias_gradient ** 2
+        weights -= learning_rate * gradient / np.sqrt(weight_history)
+        bias -= learning_rate * bias_gradient / np.sqrt(bias_history)
+
+    # Features whose weights barely moved are not worth storing
+    keep = np.abs(weights).max(axis=1) >= 1e-3
+    return HashedLinearModel(feature_space[keep], weights[keep], bias)
+
+
+def lexicon_examples(lexicon, min_valence=1.0):
+    """Single-word training examples from a valence lexicon, plus their negations.
+
+    They give the model a prior for opinion words that never occur in the labeled
+    sample; the negated forms teach it what "not" does to them. Each ends in a period
+    so that a full stop alone doesn't read as neutral.
+    """
+    token_lists = []
+    labels = []
+    for word, valence in lexicon.items():
+        if abs(valence) < min_valence:
+            continue
+        label, flipped = ('positive', 'negative') if valence > 0 else ('negative', 'positive')
+        token_lists += [[word, '.'], ['not', word, '.']]
+        labels += [label, flipped]
+    return token_lists, labels
+
+
+def load_labeled_sample(path=None, split=None):
+    """Return (texts, labels) from a label/split/text TSV, optionally one split only"""
+    texts = []
+    labels = []
+    with open(path or LABELED_SAMPLE_PATH, encoding='utf-8', newline='') as handle:
+        for row in csv.DictReader(handle, delimiter='\t', quoting=csv.QUOTE_NONE):
+            if split is None or row['split'] == split:
+                texts.append(row['text'])
+                labels.append(row['label'])
+    return texts, labels
+
+
+def train_from_sample(path=None, split='train', lexicon_weight=0.2, **options):
+    """Train on a labeled sample split plus down-weighted lexicon examples"""
+    from vader_engine import build_lexicon, tokenize
+
+    texts, labels = load_labeled_sample(path, split)
+    token_lists = [tokenize(text) for text in texts]
+    lexicon_tokens, lexicon_labels = lexicon_examples(build_lexicon())
+    sample_weights = [1.0] * len(texts) + [lexicon_weight] * len(lexicon_tokens)
+    return train(token_lists + lexicon_tokens, labels + lexicon_labels, sample_weights, **options)
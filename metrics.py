@@ -0,0 +1,308 @@
+import atexit
+import bisect
+import cProfile
+import glob
+import json
+import os
+import random
+import threading
+import time
+from flask import Response, abort, g, request
+
+# Latency buckets in seconds, from sub-millisecond stages up to long uploads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY = []
+
+# With a shared directory (configure_shared) every process, pool workers included, writes
+# its samples to <dir>/<pid>.json at most this often, and render() sums all the files
+FLUSH_SECONDS = 1.0
+
+_shared_dir = None
+_last_flush = 0.0
+_flush_lock = threading.Lock()
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        if _shared_dir is not None:
+            _maybe_flush()
+
+    def snapshot(self):
+        """{label key: value} recorded by this process"""
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(value, other):
+        return value + other
+
+    def samples(self, values):
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # label key -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        self._observe(tuple(labels.get(name, '') for name in self.labelnames), value)
+
+    def _observe(self, key, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+        if _shared_dir is not None:
+            _maybe_flush()
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, tuple(labels.get(name, '') for name in self.labelnames))
+
+    def snapshot(self):
+        """{label key: bucket counts and sum} recorded by this process"""
+        with self._lock:
+            return {key: list(state) for key, state in self._values.items()}
+
+    @staticmethod
+    def merge(state, other):
+        return [a + b for a, b in zip(state, other)]
+
+    def samples(self, values):
+        for key, state in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield f'{self.name}_bucket', dict(labels, le=le), cumulative
+            yield f'{self.name}_sum', labels, state[-1]
+            yield f'{self.name}_count', labels, cumulative
+
+
+class _Timer:
+    # A plain class rather than @contextmanager: it is entered on every analyzed text
+    __slots__ = ('histogram', 'key', 'started')
+
+    def __init__(self, histogram, key):
+        self.histogram = histogram
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram._observe(self.key, time.perf_counter() - self.started)
+        return False
+
+
+STAGE_SECONDS = Histogram(
+    'sentiment_stage_seconds',
+    'Time spent per pipeline stage (one observation per call or batch)',
+    ('stage',)
+)
+TEXTS_ANALYZED = Counter(
+    'sentiment_texts_analyzed_total', 'Texts analyzed, by analyzer path', ('path',)
+)
+BYTES_INGESTED = Counter(
+    'sentiment_bytes_ingested_total', 'Request and upload bytes accepted for analysis', ('source',)
+)
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Request latency per route', ('method', 'route')
+)
+REQUESTS = Counter(
+    'http_requests_total', 'Requests per route and status code', ('method', 'route', 'status')
+)
+
+
+def stage_timer(stage):
+    """Context manager timing one pipeline stage"""
+    return _Timer(STAGE_SECONDS, (stage,))
+
+
+def configure_shared(path):
+    """Aggregate metrics across processes through files in path (None keeps them per process)"""
+    global _shared_dir
+    if path and _shared_dir is None:
+        os.makedirs(path, exist_ok=True)
+        atexit.register(flush)
+    _shared_dir = path or None
+
+
+def flush():
+    """Write this process's samples to its file in the shared directory, if one is set"""
+    global _last_flush
+    if _shared_dir is None:
+        return
+    with _flush_lock:
+        _last_flush = time.monotonic()
+        data = {metric.name: [[list(key), value] for key, value in metric.snapshot().items()]
+                for metric in REGISTRY}
+        path = os.path.join(_shared_dir, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as handle:
+            json.dump(data, handle)
+        os.replace(path + '.tmp', path)
+
+
+def _maybe_flush():
+    if time.monotonic() - _last_flush >= FLUSH_SECONDS and not _flush_lock.locked():
+        flush()
+
+
+def _reset_after_fork():
+    # A forked worker starts from zero; what the parent recorded stays in the parent's file
+    global _flush_lock, _last_flush
+    _flush_lock = threading.Lock()
+    _last_flush = 0.0
+    for metric in REGISTRY:
+        metric._lock = threading.Lock()
+        metric._values = {}
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def collect():
+    """{metric name: {label key: value}} for this process, or summed over every process
+    that wrote to the shared directory"""
+    if _shared_dir is None:
+        return {metric.name: metric.snapshot() for metric in REGISTRY}
+    flush()
+    merge = {metric.name: metric.merge for metric in REGISTRY}
+    totals = {name: {} for name in merge}
+    for path in glob.glob(os.path.join(_shared_dir, '*.json')):
+        try:
+            with open(path) as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            continue  # removed or replaced while listing
+        for name, entries in data.items():
+            if name not in totals:
+                continue
+            values = totals[name]
+            for key, value in entries:
+                key = tuple(key)
+                values[key] = value if key not in values else merge[name](values[key], value)
+    return totals
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    values = collect()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.help_text}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, labels, value in metric.samples(values[metric.name]):
+            if labels:
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f'{name}{{{label_text}}} {value}')
+            else:
+                lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestProfiler:
+    """Profiles a random sample of requests and dumps one .prof file per request"""
+
+    def __init__(self, sample_rate, output_dir, routes=None):
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.routes = routes  # None profiles every route
+        # cProfile cannot nest, so at most one request is profiled at a time
+        self._active = threading.Lock()
+
+    def maybe_start(self, route):
+        if self.routes is not None and route not in self.routes:
+            return None
+        if random.random() >= self.sample_rate or not self._active.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def finish(self, profiler, route):
+        profiler.disable()
+        try:
+            slug = route.strip('/').replace('/', '_').replace('<', '').replace('>', '') or 'index'
+            profiler.dump_stats(os.path.join(self.output_dir, f'{slug}-{time.time_ns()}.prof'))
+        finally:
+            self._active.release()
+
+
+def register_metrics(app):
+    """Time every request and serve /metrics"""
+    configure_shared(app.config.get('METRICS_DIR'))
+    profiler = None
+    if app.config.get('PROFILE_SAMPLE_RATE'):
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+        profiler = RequestProfiler(app.config['PROFILE_SAMPLE_RATE'], app.config['PROFILE_DIR'],
+                                   app.config.get('PROFILE_ROUTES'))
+
+    def route_of():
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        if profiler is not None:
+            g.request_profiler = profiler.maybe_start(route_of())
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = route_of()
+            REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route)
+            REQUESTS.inc(method=request.method, route=route, status=str(response.status_code))
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # Teardown also runs after unhandled errors, so the profiler lock is always released
+        active = g.pop('request_profiler', None)
+        if active is not None:
+            profiler.finish(active, route_of())
+
+    @app.route('/metrics')
+    def metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+        return Response(render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,131 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from analyzer_registry import get_analyzer
+from database import insert_analyses
+from metrics import Histogram, stage_timer
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = Histogram(
+    'sentiment_micro_batch_size', '/analyze requests scored and stored per micro-batch',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+
+class _Pending:
+    __slots__ = ('user_id', 'text', 'options', 'future')
+
+    def __init__(self, user_id, text, options):
+        self.user_id = user_id
+        self.text = text
+        self.options = options  # (keywords, sentences, weighting, backend)
+        self.future = Future()
+
+
+class AnalyzeBatcher:
+    """Collects concurrent /analyze requests into micro-batches scored and stored together.
+
+    Request threads submit a text and block on its future. One dispatcher thread per
+    process takes the first waiting request, gathers whatever else arrives within
+    the window (up to max_size), scores each set of identical options with one
+    analyze_batch call, stores the whole batch in one transaction and hands every
+    caller its own result. Only threaded (or greenlet) workers have concurrent
+    requests to gather; a sync worker would just add the window to each request.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.window = 0.0
+        self.max_size = 1
+        self._queue = queue.Queue()
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app, window_ms=0, max_size=64):
+        """Attach to the app; a window of 0 leaves /analyze unbatched"""
+        self.app = app
+        self.window = max(0.0, window_ms) / 1000
+        self.max_size = max(1, max_size)
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def ensure_started(self):
+        """Start the dispatcher thread in this process"""
+        if self._started_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_pid == os.getpid():
+                return
+            # A forked child inherits the parent's queue object but not its thread
+            self._queue = queue.Queue()
+            threading.Thread(target=self._dispatch_loop, name='analyze-batcher', daemon=True).start()
+            self._started_pid = os.getpid()
+
+    def submit(self, user_id, text, keywords=True, sentences=False, weighting=None, backend=None):
+        """Queue one text; the future resolves to its stored result (or None) or raises"""
+        self.ensure_started()
+        pending = _Pending(user_id, text, (keywords, sentences, weighting, backend))
+        self._queue.put(pending)
+        return pending.future
+
+    def _dispatch_loop(self):
+        while True:
+            batch = self._collect()
+            try:
+                with self.app.app_context():
+                    self._run(batch)
+            except Exception as e:
+                logger.exception('Micro-batch of %d requests failed', len(batch))
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+
+    def _collect(self):
+        """Block for one request, then take more until the window closes or the batch is full"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, batch):
+        BATCH_SIZE.observe(len(batch))
+        groups = {}
+        for pending in batch:
+            groups.setdefault(pending.options, []).append(pending)
+
+        scored = []
+        analyzer = get_analyzer()
+        for (keywords, sentences, weighting, backend), members in groups.items():
+            try:
+                results = analyzer.analyze_batch([pending.text for pending in members], keywords=keywords,
+                                                 sentences=sentences, weighting=weighting, backend=backend)
+            except ValueError as e:
+                # Bad options fail only the requests that asked for them
+                for pending in members:
+                    pending.future.set_exception(e)
+                continue
+            scored.extend(zip(members, results))
+
+        if not scored:
+            return
+        with stage_timer('micro_batch_store'):
+            ids = insert_analyses([dict(result, user_id=pending.user_id, source_type='text')
+                                   for pending, result in scored])
+        for (pending, result), analysis_id in zip(scored, ids):
+            result['analysis_id'] = analysis_id
+            pending.future.set_result(result)
+
+
+analyze_batcher = AnalyzeBatcher()
@@ -0,0 +1,86 @@
+import mmap
+import os
+import re
+
+# Bytes sampled from the start of a file to estimate its average line length
+SAMPLE_BYTES = 1 << 16
+
+# iter_texts copies and splits the map in line-aligned blocks of about this size
+READ_BLOCK_BYTES = 1 << 20
+
+# Line endings are \n, \r\n or a bare \r, as text-mode reads and bytes.splitlines accept them
+_NEWLINE = re.compile(rb'\r\n|\r|\n')
+
+
+class MappedLines:
+    """Line-delimited UTF-8 text read through a read-only memory map.
+
+    The file is never loaded or decoded as a whole: it is copied out of the page
+    cache a block at a time and decoded a line at a time, and split() cuts it into byte
+    ranges on line boundaries so separate processes can each map the same file
+    and read only their own range.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.position = 0  # offset just past the last line read
+        self._file = open(path, 'rb')
+        # mmap refuses empty files; they simply have no lines
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def average_line_bytes(self):
+        """Mean line length in the first SAMPLE_BYTES of the file"""
+        if not self.size:
+            return 1
+        sample = min(self.size, SAMPLE_BYTES)
+        head = self._map[:sample]
+        return max(1, sample // max(1, head.count(b'\n'), head.count(b'\r')))
+
+    def split(self, target_bytes, start=0, end=None):
+        """(start, end) byte ranges of about target_bytes each, ending on line boundaries.
+
+        start must be a line boundary; by default the whole file is split.
+        """
+        end = self.size if end is None else end
+        ranges = []
+        while start < end:
+            stop = min(end, start + max(1, target_bytes))
+            if stop < end:
+                newline = _NEWLINE.search(self._map, stop - 1, end)
+                stop = end if newline is None else newline.end()
+            ranges.append((start, stop))
+            start = stop
+        return ranges
+
+    def iter_texts(self, start=0, end=None):
+        """Yield meaningful lines (stripped, over 10 characters) starting in [start, end)"""
+        if self._map is None:
+            return
+        end = self.size if end is None else end
+        for block_start, block_end in self.split(READ_BLOCK_BYTES, start, end):
+            position = block_start
+            for raw in self._map[block_start:block_end].splitlines(keepends=True):
+                position += len(raw)
+                self.position = position
+                line = raw.decode('utf-8', errors='ignore').strip()
+                if len(line) > 10:  # Only process meaningful lines
+                    yield line
+
+
+def read_range(path, start, end):
+    """Meaningful lines of one byte range of a file, as a worker process reads them"""
+    with MappedLines(path) as lines:
+        return list(lines.iter_texts(start, end))
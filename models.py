@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 from app import db
 from flask_login import UserMixin
@@ -13,6 +14,7 @@ class User(UserMixin, db.Model):
     
     # Relationship with sentiment analyses
     analyses = db.relationship('SentimentAnalysis', backref='user', lazy='dynamic')
+    jobs = db.relationship('AnalysisJob', backref='user', lazy='dynamic')
     
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -21,20 +23,41 @@ class User(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
     
     def get_stats(self):
-        """Get user's analysis statistics"""
-        total_analyses = self.analyses.count()
-        positive_count = self.analyses.filter_by(sentiment='positive').count()
-        negative_count = self.analyses.filter_by(sentiment='negative').count()
-        neutral_count = self.analyses.filter_by(sentiment='neutral').count()
+        """Get user's analysis statistics from the maintained aggregates"""
+        aggregates = UserSentimentAggregate.query.filter_by(user_id=self.id).all()
         
-        return {
-            'total': total_analyses,
-            'positive': positive_count,
-            'negative': negative_count,
-            'neutral': neutral_count
-        }
+        stats = {'total': 0, 'positive': 0, 'negative': 0, 'neutral': 0, 'sources': {}}
+        polarity_sum = confidence_sum = subjectivity_sum = 0.0
+        for aggregate in aggregates:
+            stats['total'] += aggregate.total
+            stats['positive'] += aggregate.positive
+            stats['negative'] += aggregate.negative
+            stats['neutral'] += aggregate.neutral
+            stats['sources'][aggregate.source_type] = aggregate.total
+            polarity_sum += aggregate.polarity_sum
+            confidence_sum += aggregate.confidence_sum
+            subjectivity_sum += aggregate.subjectivity_sum
+        
+        total = stats['total'] or 1
+        stats['avg_polarity'] = polarity_sum / total
+        stats['avg_confidence'] = confidence_sum / total
+        stats['avg_subjectivity'] = subjectivity_sum / total
+        return stats
+    
+    def get_distribution(self, stats=None):
+        """Sentiment counts in the shape used by the charts"""
+        stats = stats or self.get_stats()
+        return {'positive': stats['positive'], 'negative': stats['negative'],
+                'neutral': stats['neutral']}
 
 class SentimentAnalysis(db.Model):
+    __table_args__ = (
+        # Newest-first listing and keyset pagination per user
+        db.Index('ix_sentiment_analysis_user_created', 'user_id', 'created_at', 'id'),
+        # Sentiment filters, in the same order
+        db.Index('ix_sentiment_analysis_user_sentiment', 'user_id', 'sentiment', 'created_at', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     text = db.Column(db.Text, nullable=False)
@@ -45,6 +68,10 @@ class SentimentAnalysis(db.Model):
     keywords = db.Column(db.Text)  # JSON string of extracted keywords
     source_type = db.Column(db.String(50), default='text')  # text, file, url
     source_name = db.Column(db.String(255))  # filename or url
+    sentence_scores = db.Column(db.Text)  # packed per-sentence spans and scores (sentences.py)
+    backend = db.Column(db.String(20))  # scoring backend (sentiment_backends.py); NULL for textblob-era rows
+    model_version = db.Column(db.String(64))  # backend version that produced the scores; NULL predates versioning
+    occurrences = db.Column(db.Integer, default=1)  # times the text occurred in its upload (DEDUP_STORE=count)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -55,8 +82,129 @@ class SentimentAnalysis(db.Model):
             'confidence': self.confidence,
             'polarity': self.polarity,
             'subjectivity': self.subjectivity,
-            'keywords': self.keywords,
+            'keywords': json.loads(self.keywords) if self.keywords else None,
             'source_type': self.source_type,
             'source_name': self.source_name,
+            'sentence_scores': self.sentence_scores,
+            'backend': self.backend,
+            'model_version': self.model_version,
+            'occurrences': self.occurrences or 1,
             'created_at': self.created_at.isoformat()
         }
+
+class Keyword(db.Model):
+    """Keyword dictionary: each normalized keyword stored once, referenced by id"""
+    id = db.Column(db.Integer, primary_key=True)
+    text = db.Column(db.String(100), unique=True, nullable=False)  # lowercased, whitespace-collapsed
+
+class AnalysisKeyword(db.Model):
+    """One (analysis, keyword id, count) row per keyword of an analysis, for keyword filters and top-N"""
+    __table_args__ = (
+        # Analyses with a keyword per user, and per-user keyword totals from the index alone
+        db.Index('ix_analysis_keyword_user_keyword', 'user_id', 'keyword_id', 'analysis_id', 'count'),
+        # SQLite clusters rows on the primary key instead of keeping a rowid table beside it
+        {'sqlite_with_rowid': False},
+    )
+    
+    analysis_id = db.Column(db.Integer, db.ForeignKey('sentiment_analysis.id'), primary_key=True)
+    keyword_id = db.Column(db.Integer, db.ForeignKey('keyword.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=1)
+
+class UserSentimentAggregate(db.Model):
+    """Running per-user, per-source totals, updated with every insert"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    source_type = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    positive = db.Column(db.Integer, nullable=False, default=0)
+    negative = db.Column(db.Integer, nullable=False, default=0)
+    neutral = db.Column(db.Integer, nullable=False, default=0)
+    polarity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    subjectivity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class SentimentRollup(db.Model):
+    """Hourly and daily per-user, per-source totals for time-series charts"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    granularity = db.Column(db.String(8), primary_key=True)  # hour, day
+    bucket = db.Column(db.DateTime, primary_key=True)  # start of the hour/day (UTC)
+    source_name = db.Column(db.String(255), primary_key=True, default='')  # '' when unnamed
+    total = db.Column(db.Integer, nullable=False, default=0)
+    positive = db.Column(db.Integer, nullable=False, default=0)
+    negative = db.Column(db.Integer, nullable=False, default=0)
+    neutral = db.Column(db.Integer, nullable=False, default=0)
+    polarity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    subjectivity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class AnalysisJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    filepath = db.Column(db.String(512), nullable=False)
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed
+    backend = db.Column(db.String(20))  # scoring backend; NULL uses the app default
+    total = db.Column(db.Integer, default=0)  # texts extracted so far
+    processed = db.Column(db.Integer, default=0)
+    size_bytes = db.Column(db.BigInteger, default=0)
+    bytes_read = db.Column(db.BigInteger, default=0)
+    saved_count = db.Column(db.Integer, default=0)
+    duplicates = db.Column(db.Integer, default=0)  # texts collapsed into an earlier one by dedup
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # last progress commit while running
+    finished_at = db.Column(db.DateTime)
+    
+    @property
+    def progress(self):
+        """Completion percentage (0-100)"""
+        if self.status == 'completed':
+            return 100.0
+        # Files are streamed, so progress is measured in bytes read
+        if not self.size_bytes:
+            return 0.0
+        return round(min(100.0, 100.0 * (self.bytes_read or 0) / self.size_bytes), 1)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'backend': self.backend,
+            'total': self.total,
+            'processed': self.processed,
+            'saved_count': self.saved_count,
+            'duplicates': self.duplicates or 0,
+            'size_bytes': self.size_bytes,
+            'bytes_read': self.bytes_read,
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class ReanalysisJob(db.Model):
+    """Re-scoring of stored analyses after a backend's model changed, checkpointed per chunk"""
+    id = db.Column(db.Integer, primary_key=True)
+    backend = db.Column(db.String(20), nullable=False)
+    model_version = db.Column(db.String(64), nullable=False)  # version rows are brought up to
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed
+    last_id = db.Column(db.Integer, default=0)  # checkpoint: every row up to this id is done
+    max_id = db.Column(db.Integer, default=0)  # newest row when the job started
+    processed = db.Column(db.Integer, default=0)
+    relabeled = db.Column(db.Integer, default=0)  # rows whose sentiment label changed
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    @property
+    def progress(self):
+        """Completion percentage (0-100), by id range covered"""
+        if self.status == 'completed':
+            return 100.0
+        if not self.max_id:
+            return 0.0
+        return round(min(100.0, 100.0 * (self.last_id or 0) / self.max_id), 1)
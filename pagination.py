@@ -0,0 +1,78 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+class KeysetPage:
+    """One page of newest-first results plus the cursor for the next page"""
+
+    cursor_mode = True
+
+    def __init__(self, items, total, per_page, next_cursor=None, cursor=None):
+        self.items = items
+        self.total = total
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.cursor is not None
+
+    @property
+    def pages(self):
+        return -(-self.total // self.per_page) if self.total else 0
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque URL-safe cursor for a (created_at, id) position"""
+    payload = json.dumps([created_at.isoformat(), row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def encode_id_cursor(row_id):
+    """Opaque cursor for pages ordered by id alone"""
+    return base64.urlsafe_b64encode(str(row_id).encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_id_cursor(cursor):
+    """Inverse of encode_id_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def keyset_paginate(query, model, cursor=None, per_page=20, total=0):
+    """Page a query newest-first by (created_at, id) without OFFSET scans"""
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    # Fetch one extra row to learn whether another page exists
+    items = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return KeysetPage(items, total, per_page, next_cursor=next_cursor, cursor=cursor)
@@ -0,0 +1,169 @@
+import logging
+from datetime import datetime
+from sqlalchemy import bindparam, func, or_, select
+from app import db
+from database import update_aggregates
+from metrics import stage_timer
+from models import ReanalysisJob, SentimentAnalysis
+from sentiment_backends import SENTIMENT_BACKENDS, get_backend
+
+logger = logging.getLogger(__name__)
+
+# Id span relabeled per transaction; each one holds the write lock only briefly
+RELABEL_CHUNK_SIZE = 50000
+# Rows re-scored per transaction (and checkpoint) by a re-analysis job
+REANALYSIS_CHUNK_SIZE = 2000
+
+# Columns the aggregates and rollups are computed from
+_AGGREGATE_FIELDS = ('user_id', 'source_type', 'source_name', 'created_at',
+                     'sentiment', 'polarity', 'subjectivity', 'confidence')
+
+
+def backend_filter(name):
+    """Rows scored by a backend; rows from before the backend column are TextBlob's"""
+    column = SentimentAnalysis.__table__.c.backend
+    if name == 'textblob':
+        return or_(column == name, column.is_(None))
+    return column == name
+
+
+def relabel(backends=None, chunk_size=RELABEL_CHUNK_SIZE, progress=None):
+    """Re-derive stored labels from stored scores under the current thresholds.
+
+    A set-based UPDATE per id range touches only rows whose label changes;
+    those rows are read first so the aggregates and rollups can move them
+    between sentiment counts. Returns {backend: rows relabeled}.
+    """
+    table = SentimentAnalysis.__table__
+    bounds = db.session.execute(select(func.min(table.c.id), func.max(table.c.id))).first()
+    relabeled = {}
+    for name in backends or SENTIMENT_BACKENDS:
+        relabeled[name] = 0
+        if bounds[0] is None:
+            continue
+        label = SENTIMENT_BACKENDS[name].label_sql(table.c.polarity, table.c.subjectivity)
+        for start in range(bounds[0] - 1, bounds[1], chunk_size):
+            changed = (backend_filter(name), table.c.id > start, table.c.id <= start + chunk_size,
+                       table.c.polarity.isnot(None), table.c.sentiment != label)
+            try:
+                rows = db.session.execute(
+                    select(*[table.c[field] for field in _AGGREGATE_FIELDS], label.label('label'))
+                    .where(*changed)
+                ).mappings().all()
+                if rows:
+                    db.session.execute(table.update().where(*changed).values(sentiment=label))
+                    update_aggregates([dict(row, sentiment=row['label']) for row in rows], removed=rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            relabeled[name] += len(rows)
+            if progress:
+                progress(name, min(start + chunk_size, bounds[1]), bounds[1], relabeled[name])
+    return relabeled
+
+
+def stale_rows(name, version):
+    """Condition for rows of a backend scored by another model version"""
+    column = SentimentAnalysis.__table__.c.model_version
+    return (backend_filter(name), or_(column.is_(None), column != version))
+
+
+def start_reanalysis(name):
+    """The unfinished re-analysis job for a backend's current model, or a new one.
+
+    Returns None when no stored row needs re-scoring.
+    """
+    version = get_backend(name).version
+    job = (ReanalysisJob.query.filter_by(backend=name, model_version=version)
+           .filter(ReanalysisJob.status != 'completed')
+           .order_by(ReanalysisJob.id.desc()).first())
+    if job is not None:
+        return job
+
+    table = SentimentAnalysis.__table__
+    if db.session.execute(select(table.c.id).where(*stale_rows(name, version)).limit(1)).first() is None:
+        return None
+    # Rows stored after this point are scored by the current model already
+    job = ReanalysisJob(backend=name, model_version=version,
+                        max_id=db.session.execute(select(func.max(table.c.id))).scalar() or 0)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def run_reanalysis(job, analyzer, chunk_size=REANALYSIS_CHUNK_SIZE, sentence_weighting=None, progress=None):
+    """Re-score a job's stale rows in id order, committing each chunk with its checkpoint.
+
+    The chunk's scores, labels, aggregates and the job's last_id are written in
+    one short transaction, so an interrupted job resumes exactly where it left
+    off. Scoring happens outside any transaction. Keywords are left alone; they
+    do not depend on the scoring model.
+    """
+    table = SentimentAnalysis.__table__
+    if job.model_version != get_backend(job.backend).version:
+        raise ValueError(f'Job {job.id} targets {job.backend} model {job.model_version}, '
+                         f'but {get_backend(job.backend).version} is loaded')
+    job.status = 'running'
+    job.started_at = job.started_at or datetime.utcnow()
+    db.session.commit()
+
+    update = table.update().where(table.c.id == bindparam('analysis_id')).values(
+        sentiment=bindparam('new_sentiment'), polarity=bindparam('new_polarity'),
+        subjectivity=bindparam('new_subjectivity'), confidence=bindparam('new_confidence'),
+        sentence_scores=bindparam('new_sentence_scores'), model_version=job.model_version,
+    )
+    query = select(table.c.id, table.c.text, table.c.sentence_scores,
+                   *[table.c[field] for field in _AGGREGATE_FIELDS])
+    while True:
+        rows = db.session.execute(
+            query.where(table.c.id > job.last_id, table.c.id <= job.max_id,
+                        *stale_rows(job.backend, job.model_version))
+            .order_by(table.c.id).limit(chunk_size)
+        ).mappings().all()
+        # End the read snapshot before scoring: a WAL reader can't later become a writer
+        db.session.commit()
+        if not rows:
+            break
+
+        scored = _rescore(rows, analyzer, job.backend, sentence_weighting)
+        try:
+            with stage_timer('reanalysis_store'):
+                db.session.execute(update, [
+                    {'analysis_id': row['id'], 'new_sentiment': result['sentiment'],
+                     'new_polarity': result['polarity'], 'new_subjectivity': result['subjectivity'],
+                     'new_confidence': result['confidence'], 'new_sentence_scores': result['sentence_scores']}
+                    for row, result in scored
+                ])
+                update_aggregates([dict(row, sentiment=result['sentiment'], polarity=result['polarity'],
+                                        subjectivity=result['subjectivity'], confidence=result['confidence'])
+                                   for row, result in scored],
+                                  removed=[row for row, _ in scored])
+                job.last_id = rows[-1]['id']
+                job.processed += len(rows)
+                job.relabeled += sum(1 for row, result in scored if row['sentiment'] != result['sentiment'])
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if progress:
+            progress(job)
+
+    job.status = 'completed'
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def _rescore(rows, analyzer, backend, sentence_weighting):
+    """(row, result) pairs; rows stored in sentence mode are re-scored per sentence"""
+    scored = []
+    for sentences in (False, True):
+        group = [row for row in rows if (row['sentence_scores'] is not None) == sentences
+                 and row['text'] and row['text'].strip()]
+        if group:
+            results = analyzer.analyze_batch([row['text'] for row in group], keywords=False,
+                                             sentences=sentences, weighting=sentence_weighting,
+                                             backend=backend)
+            scored.extend(zip(group, results))
+    return scored
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Rough per-entry overhead of the key, tuple and OrderedDict node, in bytes
+ENTRY_OVERHEAD = 240
+
+
+class ResultCache:
+    """Bounded LRU cache of analysis results keyed by a hash of the cleaned text.
+
+    Entries are evicted once either max_entries or max_bytes is exceeded. With a
+    persist_path, results are also written to a SQLite file that several processes
+    can share, and memory misses fall back to it before re-analyzing.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=None, persist_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.persistent_hits = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS result_cache (key BLOB PRIMARY KEY, value TEXT NOT NULL)'
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(cleaned_text, namespace=''):
+        """Hash cleaned text (plus the analysis mode) into a compact key"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(namespace.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(cleaned_text.encode('utf-8'))
+        return digest.digest()
+
+    def get(self, key):
+        """Return a copy of the cached result for key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(value[0])
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value FROM result_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row:
+                    self.hits += 1
+                    self.persistent_hits += 1
+                    result = json.loads(row[0])
+                    self._store(key, result, len(row[0]))
+                    return dict(result)
+
+            self.misses += 1
+            return None
+
+    def record_hit(self):
+        """Count a hit served outside get(), e.g. a repeat within one batch"""
+        with self._lock:
+            self.hits += 1
+
+    def put(self, key, result):
+        """Cache a result (without its original text)"""
+        self.put_many([(key, result)])
+
+    def put_many(self, items):
+        """Cache several (key, result) pairs, persisting them in one transaction"""
+        rows = []
+        with self._lock:
+            for key, result in items:
+                result = {k: v for k, v in result.items() if k != 'text'}
+                encoded = json.dumps(result)
+                self._store(key, result, len(encoded))
+                rows.append((key, encoded))
+            if self._db is not None and rows:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO result_cache (key, value) VALUES (?, ?)', rows
+                )
+                self._db.commit()
+
+    def _store(self, key, result, size):
+        size += ENTRY_OVERHEAD
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._entries[key] = (result, size)
+        self._bytes += size
+
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all in-memory and persisted entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute('DELETE FROM result_cache')
+                self._db.commit()
+
+    def stats(self):
+        """Hit/miss/eviction counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'persistent_hits': self.persistent_hits,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+def create_cache(config):
+    """Build the result cache from app config, or None when disabled"""
+    max_entries = config.get('RESULT_CACHE_SIZE', 0)
+    if not max_entries:
+        return None
+    return ResultCache(max_entries=max_entries,
+                       max_bytes=config.get('RESULT_CACHE_MAX_BYTES'),
+                       persist_path=config.get('RESULT_CACHE_PATH'))
@@ -1,18 +1,39 @@
-import os
 import json
-import csv
 from datetime import datetime
-from flask import render_template, request, jsonify, redirect, url_for, flash, session, send_file
+from flask import render_template, request, jsonify, redirect, url_for, flash, session, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
 from app import db
-from models import User, SentimentAnalysis
-from sentiment_analyzer import SentimentAnalyzer
+from models import User, SentimentAnalysis, AnalysisJob
+from analyzer_registry import configure_analyzers, get_analyzer
+from sentiment_backends import SENTIMENT_BACKENDS
 from file_processor import FileProcessor
+from job_queue import job_queue
+from micro_batch import analyze_batcher
+from database import insert_analyses, update_aggregates
+from batch_api import BatchRequestError, parse_batch_body, parse_flag
+from pagination import keyset_paginate
+from search import (MAX_TOP_KEYWORDS, parse_filter_args, parse_search_args, search_page,
+                    top_keywords, write_keywords)
+from metrics import BYTES_INGESTED, stage_timer
+from timeseries import load_timeseries, parse_timeseries_args
+from exporter import (EXPORT_FORMATS, iter_export_rows, parquet_available, parse_export_args,
+                      stream_csv, stream_jsonl, stream_parquet)
 
 def register_routes(app):
-    analyzer = SentimentAnalyzer()
-    file_processor = FileProcessor(app.config['UPLOAD_FOLDER'])
+    # Analyzers load lazily, once per process, on the first request that needs one
+    analyzer_config = configure_analyzers(app.config)
+    file_processor = FileProcessor(app.config['UPLOAD_FOLDER'],
+                                   workers=app.config['ANALYSIS_WORKERS'],
+                                   chunk_size=app.config['ANALYSIS_CHUNK_SIZE'],
+                                   analyzer_config=analyzer_config)
+    job_queue.init_app(app, file_processor, workers=app.config['JOB_WORKERS'],
+                       stale_seconds=app.config['JOB_STALE_SECONDS'])
+    analyze_batcher.init_app(app, window_ms=app.config['ANALYZE_BATCH_WINDOW_MS'],
+                             max_size=app.config['ANALYZE_BATCH_MAX_SIZE'])
+    
+    def wants_json():
+        return request.accept_mimetypes.best == 'application/json'
     
     @app.route('/')
     def index():
@@ -32,13 +53,13 @@ def register_routes(app):
         ).limit(10).all()
         
         # Get sentiment distribution for charts
-        all_analyses = current_user.analyses.all()
-        distribution = analyzer.get_sentiment_distribution(all_analyses)
+        distribution = current_user.get_distribution(stats)
         
         return render_template('dashboard.html', 
                              stats=stats, 
                              recent_analyses=recent_analyses,
-                             distribution=distribution)
+                             distribution=distribution,
+                             backends=list(SENTIMENT_BACKENDS))
     
     @app.route('/analyze', methods=['POST'])
     @login_required
@@ -49,9 +70,21 @@ def register_routes(app):
         
         if not text:
             return jsonify({'error': 'No text provided'}), 400
+        BYTES_INGESTED.inc(request.content_length or 0, source='analyze')
         
-        # Analyze text
-        result = analyzer.analyze_text(text)
+        # Analyze text; clients that only need the score can skip keyword extraction,
+        # sentences=true scores each sentence and combines them with `weighting`,
+        # and `backend` picks the scoring backend
+        keywords = data.get('keywords', True) is not False
+        sentences = data.get('sentences') is True
+        if analyze_batcher.enabled:
+            return analyze_batched(text, keywords, sentences, data.get('weighting'), data.get('backend'))
+        try:
+            result = get_analyzer().analyze_text(text, keywords=keywords,
+                                                 sentences=sentences, weighting=data.get('weighting'),
+                                                 backend=data.get('backend'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         if not result:
             return jsonify({'error': 'Unable to analyze text'}), 400
         
@@ -64,164 +97,335 @@ def register_routes(app):
         analysis.polarity = result['polarity']
         analysis.subjectivity = result['subjectivity']
         analysis.keywords = result['keywords']
+        analysis.sentence_scores = result['sentence_scores']
+        analysis.backend = result['backend']
+        analysis.model_version = result['model_version']
         analysis.source_type = 'text'
+        analysis.created_at = datetime.utcnow()
         
         try:
-            db.session.add(analysis)
-            db.session.commit()
+            with stage_timer('db_insert'):
+                db.session.add(analysis)
+                db.session.flush()
+                write_keywords([(analysis.id, current_user.id, analysis.keywords)])
+                update_aggregates([{'user_id': current_user.id, 'source_type': 'text',
+                                    'created_at': analysis.created_at, **result}])
+                db.session.commit()
             
             # Return result with analysis ID
             result['analysis_id'] = analysis.id
-            return jsonify(result)
+            return analysis_response(result, sentences)
             
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': 'Failed to save analysis'}), 500
     
+    def analyze_batched(text, keywords, sentences, weighting, backend):
+        """Score and store one /analyze text as part of a micro-batch of concurrent requests"""
+        user_id = current_user.id
+        # Hand the pooled connection back while waiting: the dispatcher needs one to store the batch
+        db.session.close()
+        future = analyze_batcher.submit(user_id, text, keywords=keywords, sentences=sentences,
+                                        weighting=weighting, backend=backend)
+        try:
+            result = future.result()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': 'Failed to save analysis'}), 500
+        if not result:
+            return jsonify({'error': 'Unable to analyze text'}), 400
+        return analysis_response(result, sentences)
+    
+    def decode_keywords(result):
+        """Return keywords as an object, the shape SentimentAnalysis.to_dict uses"""
+        if result.get('keywords') is not None:
+            result['keywords'] = json.loads(result['keywords'])
+        return result
+    
+    def analysis_response(result, sentences):
+        decode_keywords(result)
+        if sentences:
+            from sentences import unpack_sentence_scores
+            result['sentences'] = unpack_sentence_scores(result['sentence_scores'], result['text'])
+        return jsonify(result)
+    
+    @app.route('/api/analyze/batch', methods=['POST'])
+    @login_required
+    def api_analyze_batch():
+        """Analyze many texts in one request; results are returned in input order"""
+        max_bytes = app.config['BATCH_MAX_BYTES']
+        if request.content_length and request.content_length > max_bytes:
+            return jsonify({'error': f'Request body exceeds {max_bytes} bytes'}), 413
+        body = request.stream.read(max_bytes + 1)
+        if len(body) > max_bytes:
+            return jsonify({'error': f'Request body exceeds {max_bytes} bytes'}), 413
+        
+        try:
+            with stage_timer('parse'):
+                texts, options = parse_batch_body(body, request.mimetype, app.config['BATCH_MAX_ITEMS'])
+        except BatchRequestError as e:
+            return jsonify({'error': str(e)}), e.status
+        BYTES_INGESTED.inc(len(body), source='batch_api')
+        
+        persist = parse_flag(request.args.get('persist', options.get('persist')))
+        keywords = parse_flag(request.args.get('keywords', options.get('keywords')))
+        source_name = options.get('source_name') or request.args.get('source_name')
+        sentences = parse_flag(request.args.get('sentences', options.get('sentences')), default=False)
+        weighting = request.args.get('weighting', options.get('weighting'))
+        backend = request.args.get('backend', options.get('backend'))
+        
+        try:
+            results = get_analyzer().analyze_batch(texts, keywords=keywords, sentences=sentences,
+                                                   weighting=weighting, backend=backend)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if persist:
+            for result in results:
+                result['user_id'] = current_user.id
+                result['source_type'] = 'api'
+                result['source_name'] = source_name
+            try:
+                ids = insert_analyses(results)
+            except Exception as e:
+                return jsonify({'error': 'Failed to save analyses'}), 500
+            for result, analysis_id in zip(results, ids):
+                del result['user_id']
+                result['analysis_id'] = analysis_id
+        for result in results:
+            decode_keywords(result)
+        if sentences:
+            from sentences import unpack_sentence_scores
+            for result in results:
+                result['sentences'] = unpack_sentence_scores(result['sentence_scores'], result['text'])
+        
+        return jsonify({'count': len(results), 'persisted': persist, 'results': results})
+    
     @app.route('/upload', methods=['POST'])
     @login_required
     def upload_file():
-        """File upload and analysis endpoint"""
-        if 'file' not in request.files:
-            flash('No file selected', 'error')
+        """File upload endpoint; analysis runs as a background job"""
+        def upload_error(message):
+            if wants_json():
+                return jsonify({'error': message}), 400
+            flash(message, 'error')
             return redirect(url_for('dashboard'))
         
+        if 'file' not in request.files:
+            return upload_error('No file selected')
+        
         file = request.files['file']
         if file.filename == '':
-            flash('No file selected', 'error')
-            return redirect(url_for('dashboard'))
+            return upload_error('No file selected')
         
         if not file_processor.is_allowed_file(file.filename):
-            flash('File type not allowed. Please upload TXT or CSV files.', 'error')
-            return redirect(url_for('dashboard'))
+            return upload_error('File type not allowed. Please upload TXT or CSV files.')
+        
+        backend = request.form.get('backend') or None
+        if backend and backend not in SENTIMENT_BACKENDS:
+            return upload_error(f'Unknown sentiment backend: {backend}')
+        
+        filename, filepath = file_processor.save_file(file)
+        if not filename:
+            return upload_error('Error saving file')
+        
+        job = AnalysisJob()
+        job.user_id = current_user.id
+        job.filename = filename
+        job.filepath = filepath
+        job.backend = backend
         
         try:
-            # Save file
-            filename, filepath = file_processor.save_file(file)
-            if not filename:
-                flash('Error saving file', 'error')
-                return redirect(url_for('dashboard'))
-            
-            # Process file and extract texts
-            texts = file_processor.process_file(filepath, filename)
-            if not texts:
-                flash('No text content found in file', 'error')
-                file_processor.cleanup_file(filepath)
-                return redirect(url_for('dashboard'))
-            
-            # Analyze extracted texts
-            analysis_results = file_processor.analyze_file_content(texts, filename, current_user.id)
-            
-            # Save analyses to database
-            saved_count = 0
-            for result in analysis_results:
-                analysis = SentimentAnalysis()
-                analysis.user_id = result['user_id']
-                analysis.text = result['text']
-                analysis.sentiment = result['sentiment']
-                analysis.confidence = result['confidence']
-                analysis.polarity = result['polarity']
-                analysis.subjectivity = result['subjectivity']
-                analysis.keywords = result['keywords']
-                analysis.source_type = result['source_type']
-                analysis.source_name = result['source_name']
-                db.session.add(analysis)
-                saved_count += 1
-            
+            db.session.add(job)
             db.session.commit()
-            
-            # Cleanup uploaded file
-            file_processor.cleanup_file(filepath)
-            
-            flash(f'Successfully analyzed {saved_count} text entries from {filename}', 'success')
-            return redirect(url_for('results'))
-            
         except Exception as e:
             db.session.rollback()
-            try:
-                if filename and 'filepath' in locals():
-                    file_processor.cleanup_file(filepath)
-            except:
-                pass
-            flash(f'Error processing file: {str(e)}', 'error')
-            return redirect(url_for('dashboard'))
+            file_processor.cleanup_file(filepath)
+            return upload_error('Error queuing file for analysis')
+        
+        job_queue.submit(job.id)
+        
+        if wants_json():
+            return jsonify(job.to_dict()), 202
+        flash(f'{filename} queued for analysis', 'info')
+        return redirect(url_for('dashboard'))
+    
+    @app.route('/api/jobs')
+    @login_required
+    def api_jobs():
+        """Recent upload jobs for the current user"""
+        jobs = current_user.jobs.order_by(AnalysisJob.created_at.desc()).limit(20).all()
+        return jsonify({'jobs': [job.to_dict() for job in jobs]})
+    
+    @app.route('/api/jobs/<int:job_id>')
+    @login_required
+    def api_job_status(job_id):
+        """Status and progress of a single upload job"""
+        job = current_user.jobs.filter_by(id=job_id).first()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job.to_dict())
     
     @app.route('/results')
     @login_required
     def results():
         """Display analysis results"""
-        page = request.args.get('page', 1, type=int)
         per_page = 20
+        stats = current_user.get_stats()
         
-        analyses = current_user.analyses.order_by(
-            SentimentAnalysis.created_at.desc()
-        ).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        if 'page' in request.args:
+            # Numbered pages (OFFSET); totals come from the aggregates, not COUNT(*)
+            page = request.args.get('page', 1, type=int)
+            analyses = current_user.analyses.order_by(
+                SentimentAnalysis.created_at.desc(), SentimentAnalysis.id.desc()
+            ).paginate(
+                page=page, per_page=per_page, error_out=False, count=False
+            )
+            analyses.total = stats['total']
+        else:
+            # Keyset pagination: constant cost however deep the page
+            try:
+                analyses = keyset_paginate(current_user.analyses, SentimentAnalysis,
+                                           cursor=request.args.get('cursor'),
+                                           per_page=per_page, total=stats['total'])
+            except ValueError:
+                return redirect(url_for('results'))
         
         # Get sentiment distribution
-        all_analyses = current_user.analyses.all()
-        distribution = analyzer.get_sentiment_distribution(all_analyses)
+        distribution = current_user.get_distribution(stats)
         
         return render_template('results.html', 
                              analyses=analyses, 
+                             stats=stats,
                              distribution=distribution)
     
+    @app.route('/api/analyses')
+    @login_required
+    def api_analyses():
+        """Cursor-paginated analysis history as JSON"""
+        per_page = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        sentiment = request.args.get('sentiment')
+        stats = current_user.get_stats()
+        
+        query = current_user.analyses
+        total = stats['total']
+        if sentiment:
+            if sentiment not in ('positive', 'negative', 'neutral'):
+                return jsonify({'error': 'Invalid sentiment filter'}), 400
+            query = query.filter_by(sentiment=sentiment)
+            total = stats[sentiment]
+        
+        try:
+            page = keyset_paginate(query, SentimentAnalysis, cursor=request.args.get('cursor'),
+                                   per_page=per_page, total=total)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'items': [analysis.to_dict() for analysis in page.items],
+            'next_cursor': page.next_cursor,
+            'total': page.total
+        })
+    
+    @app.route('/api/search')
+    @login_required
+    def api_search():
+        """Full-text and keyword search over the user's analyses, newest stored first"""
+        per_page = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        try:
+            terms, filters = parse_search_args(request.args)
+            with stage_timer('search'):
+                page = search_page(current_user.id, terms, filters,
+                                   cursor=request.args.get('cursor'), per_page=per_page)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'items': [analysis.to_dict() for analysis in page.items],
+            'next_cursor': page.next_cursor
+        })
+    
+    @app.route('/api/keywords/top')
+    @login_required
+    def api_top_keywords():
+        """The user's most frequent keywords, optionally by sentiment and date range"""
+        limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_TOP_KEYWORDS)
+        try:
+            filters = parse_filter_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        with stage_timer('top_keywords'):
+            keywords = top_keywords(current_user.id, filters, limit=limit)
+        return jsonify({'keywords': keywords})
+    
     @app.route('/export')
     @login_required
     def export_results():
-        """Export user's analysis results to CSV"""
-        analyses = current_user.analyses.order_by(SentimentAnalysis.created_at.desc()).all()
+        """Stream the user's analysis results as CSV, JSON Lines or Parquet"""
+        try:
+            export_format, columns, filters = parse_export_args(request.args)
+        except ValueError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('results'))
         
-        if not analyses:
+        if not current_user.get_stats()['total']:
             flash('No data to export', 'warning')
             return redirect(url_for('results'))
         
-        # Create export filename
+        if export_format == 'parquet' and not parquet_available():
+            flash('Parquet export requires pyarrow to be installed', 'error')
+            return redirect(url_for('results'))
+        
+        mimetype, extension = EXPORT_FORMATS[export_format]
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'sentiment_analysis_{current_user.username}_{timestamp}.csv'
-        filepath = os.path.join(app.config['EXPORT_FOLDER'], filename)
+        filename = f'sentiment_analysis_{current_user.username}_{timestamp}.{extension}'
         
-        try:
-            with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['id', 'text', 'sentiment', 'confidence', 'polarity', 
-                            'subjectivity', 'keywords', 'source_type', 'source_name', 'created_at']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for analysis in analyses:
-                    writer.writerow({
-                        'id': analysis.id,
-                        'text': analysis.text,
-                        'sentiment': analysis.sentiment,
-                        'confidence': analysis.confidence,
-                        'polarity': analysis.polarity,
-                        'subjectivity': analysis.subjectivity,
-                        'keywords': analysis.keywords,
-                        'source_type': analysis.source_type,
-                        'source_name': analysis.source_name,
-                        'created_at': analysis.created_at.isoformat()
-                    })
-            
-            return send_file(filepath, as_attachment=True, download_name=filename)
-            
-        except Exception as e:
-            flash(f'Error exporting data: {str(e)}', 'error')
-            return redirect(url_for('results'))
+        streamer = {'csv': stream_csv, 'jsonl': stream_jsonl, 'parquet': stream_parquet}[export_format]
+        rows = iter_export_rows(current_user.id, columns, filters)
+        return Response(stream_with_context(streamer(rows, columns)), mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
     
     @app.route('/api/stats')
     @login_required
     def api_stats():
         """API endpoint for dashboard statistics"""
         stats = current_user.get_stats()
-        all_analyses = current_user.analyses.all()
-        distribution = analyzer.get_sentiment_distribution(all_analyses)
+        distribution = current_user.get_distribution(stats)
         
         return jsonify({
             'stats': stats,
             'distribution': distribution
         })
     
+    @app.route('/api/timeseries')
+    @login_required
+    def api_timeseries():
+        """Hourly or daily sentiment buckets from the precomputed rollups"""
+        try:
+            granularity, start, end, source_name = parse_timeseries_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        buckets = load_timeseries(current_user.id, granularity, start, end, source_name)
+        return jsonify({
+            'granularity': granularity,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'source_name': source_name,
+            'buckets': buckets
+        })
+    
+    @app.route('/api/cache/stats')
+    @login_required
+    def api_cache_stats():
+        """Result cache hit/miss/eviction counters for this process"""
+        cache = get_analyzer().cache
+        if cache is None:
+            return jsonify({'enabled': False})
+        return jsonify(dict(cache.stats(), enabled=True))
+    
     # Authentication routes
     @app.route('/login', methods=['GET', 'POST'])
     def login():
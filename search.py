@@ -0,0 +1,374 @@
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import column, delete, func, insert, literal_column, select, table, text
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from models import AnalysisKeyword, Keyword, SentimentAnalysis
+from pagination import KeysetPage, decode_id_cursor, encode_id_cursor
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'sentiment_analysis_fts'
+PG_TEXT_INDEX = 'ix_sentiment_analysis_text_search'
+# Text search configuration for PostgreSQL; stemming matches SQLite's porter tokenizer
+PG_TS_CONFIG = 'english'
+
+MAX_QUERY_LENGTH = 200
+MAX_QUERY_TERMS = 10
+MAX_KEYWORD_LENGTH = 100
+
+# Keyword rows written per statement when rebuilding
+REBUILD_BATCH_SIZE = 5000
+# Keywords looked up per IN (...) when interning
+INTERN_BATCH_SIZE = 500
+# Largest limit /api/keywords/top accepts
+MAX_TOP_KEYWORDS = 100
+
+# Quoted phrases, or bare terms (a trailing * makes a prefix search on SQLite)
+_QUERY_TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+_SQLITE_TRIGGERS = (
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON sentiment_analysis BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON sentiment_analysis BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF text ON sentiment_analysis BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);
+    END''',
+)
+
+_fts_available = None
+
+
+def search_backend():
+    """'fts5' (SQLite), 'tsvector' (PostgreSQL) or 'like' where neither is available"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return 'tsvector'
+    if dialect == 'sqlite' and _sqlite_has_fts5():
+        return 'fts5'
+    return 'like'
+
+
+def _sqlite_has_fts5():
+    global _fts_available
+    if _fts_available is None:
+        with db.engine.connect() as connection:
+            options = connection.exec_driver_sql('PRAGMA compile_options').scalars().all()
+        _fts_available = 'ENABLE_FTS5' in options
+    return _fts_available
+
+
+def ensure_search_index():
+    """Create the full-text index and the triggers keeping it in sync, if missing.
+
+    SQLite gets an external-content FTS5 table over sentiment_analysis.text that
+    triggers update on every insert, delete and text update, so Core executemany
+    inserts are indexed too; a newly created index is filled from existing rows.
+    PostgreSQL gets a GIN index on to_tsvector(text), which it maintains itself.
+    """
+    backend = search_backend()
+    with db.engine.begin() as connection:
+        if backend == 'fts5':
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+            ).first()
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"text, content='sentiment_analysis', content_rowid='id', "
+                f"tokenize='porter unicode61 remove_diacritics 2')"
+            )
+            for trigger in _SQLITE_TRIGGERS:
+                connection.exec_driver_sql(trigger)
+            if not exists:
+                connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+        elif backend == 'tsvector':
+            connection.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS {PG_TEXT_INDEX} ON sentiment_analysis "
+                f"USING gin (to_tsvector('{PG_TS_CONFIG}', text))"
+            )
+        else:
+            logger.warning('No full-text index on %s; search falls back to LIKE scans',
+                           db.engine.dialect.name)
+
+
+def rebuild_search_index(user_id=None):
+    """Rebuild the SQLite full-text index and the keyword table from stored analyses.
+
+    Returns the number of keyword rows written. The keyword table is repopulated
+    from the keywords JSON column, for one user or everyone.
+    """
+    if user_id is None and search_backend() == 'fts5':
+        try:
+            db.session.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return _rebuild_keywords(user_id)
+
+
+def _rebuild_keywords(user_id=None):
+    analyses = SentimentAnalysis.__table__
+    keywords = AnalysisKeyword.__table__
+    query = select(analyses.c.id, analyses.c.user_id, analyses.c.keywords).where(
+        analyses.c.keywords.isnot(None)
+    )
+    clear = delete(keywords)
+    if user_id is not None:
+        query = query.where(analyses.c.user_id == user_id)
+        clear = clear.where(keywords.c.user_id == user_id)
+
+    written = 0
+    last_id = 0
+    try:
+        db.session.execute(clear)
+        # Keyset batches rather than one streamed cursor: interning writes in between
+        while True:
+            rows = db.session.execute(
+                query.where(analyses.c.id > last_id).order_by(analyses.c.id).limit(REBUILD_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            written += write_keywords(rows)
+            last_id = rows[-1][0]
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return written
+
+
+def normalize_keyword(keyword):
+    """Lowercased, whitespace-collapsed keyword as stored in the Keyword dictionary"""
+    return ' '.join(str(keyword).lower().split())[:MAX_KEYWORD_LENGTH]
+
+
+def keyword_counts(keywords_json):
+    """{normalized keyword: count} from an analysis's keywords JSON ({keyword: count})"""
+    if not keywords_json:
+        return {}
+    try:
+        keywords = json.loads(keywords_json)
+    except ValueError:
+        return {}
+    if isinstance(keywords, list):
+        keywords = dict.fromkeys(keywords, 1)
+
+    counts = {}
+    for keyword, count in keywords.items():
+        keyword = normalize_keyword(keyword)
+        if keyword:
+            counts[keyword] = counts.get(keyword, 0) + (int(count) or 1)
+    return counts
+
+
+def intern_keywords(words):
+    """{keyword: id} for normalized keywords, adding missing ones to the dictionary.
+
+    Runs in the current transaction. Concurrent writers adding the same keyword
+    are resolved by the unique constraint: the losing insert is skipped and the
+    winner's id read back.
+    """
+    dictionary = Keyword.__table__
+    words = list(set(words))
+    ids = _lookup_keyword_ids(words)
+    missing = [word for word in words if word not in ids]
+    if missing:
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            statement = dialect_insert(dictionary).on_conflict_do_nothing(index_elements=['text'])
+        else:
+            statement = insert(dictionary)
+        db.session.execute(statement, [{'text': word} for word in missing])
+        ids.update(_lookup_keyword_ids(missing))
+    return ids
+
+
+def _lookup_keyword_ids(words):
+    dictionary = Keyword.__table__
+    ids = {}
+    for start in range(0, len(words), INTERN_BATCH_SIZE):
+        ids.update(db.session.execute(
+            select(dictionary.c.text, dictionary.c.id)
+            .where(dictionary.c.text.in_(words[start:start + INTERN_BATCH_SIZE]))
+        ).all())
+    return ids
+
+
+def write_keywords(analyses):
+    """Store keyword rows for (analysis_id, user_id, keywords_json) tuples in the current transaction.
+
+    Keywords are interned into the Keyword dictionary, so each analysis costs
+    three integers per keyword. Returns the number of keyword rows written.
+    """
+    counted = [(analysis_id, user_id, keyword_counts(keywords_json))
+               for analysis_id, user_id, keywords_json in analyses]
+    ids = intern_keywords(keyword for _, _, counts in counted for keyword in counts)
+    rows = [{'analysis_id': analysis_id, 'user_id': user_id, 'keyword_id': ids[keyword], 'count': count}
+            for analysis_id, user_id, counts in counted for keyword, count in counts.items()]
+    if rows:
+        db.session.execute(insert(AnalysisKeyword.__table__), rows)
+    return len(rows)
+
+
+def parse_search_args(args):
+    """Validate /api/search query parameters into (terms, filters)"""
+    query = args.get('q', '').strip()
+    if len(query) > MAX_QUERY_LENGTH:
+        raise ValueError(f'q must be at most {MAX_QUERY_LENGTH} characters')
+    terms = [(phrase.strip(), True) if phrase is not None and phrase.strip() else (word, False)
+             for phrase, word in _QUERY_TERM.findall(query)]
+    terms = [(term, quoted) for term, quoted in terms if term.strip('*')]
+    if len(terms) > MAX_QUERY_TERMS:
+        raise ValueError(f'q may contain at most {MAX_QUERY_TERMS} terms')
+
+    filters = {}
+    keyword = normalize_keyword(args.get('keyword', ''))
+    if keyword:
+        filters['keyword'] = keyword
+    if not terms and not keyword:
+        raise ValueError('Provide q and/or keyword')
+
+    filters.update(parse_filter_args(args))
+    return terms, filters
+
+
+def parse_filter_args(args):
+    """Validate the sentiment and start/end (YYYY-MM-DD, inclusive) query parameters"""
+    filters = {}
+    sentiment = args.get('sentiment')
+    if sentiment:
+        if sentiment not in ('positive', 'negative', 'neutral'):
+            raise ValueError('Invalid sentiment filter')
+        filters['sentiment'] = sentiment
+    for name in ('start', 'end'):
+        if args.get(name):
+            try:
+                filters[name] = datetime.strptime(args[name], '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f'{name} must be a YYYY-MM-DD date')
+    return filters
+
+
+def fts5_query(terms):
+    """FTS5 MATCH expression: every term as a quoted string, implicitly ANDed.
+
+    Quoting keeps user input from being read as FTS5 operators or columns; a
+    trailing * on a bare term becomes a prefix query.
+    """
+    parts = []
+    for term, quoted in terms:
+        prefix = not quoted and term.endswith('*')
+        term = term.rstrip('*') if prefix else term
+        parts.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(parts)
+
+
+def search_page(user_id, terms, filters, cursor=None, per_page=50):
+    """One page of a user's analyses matching the terms and filters, newest stored first.
+
+    Results are ordered by id rather than created_at so the full-text (or keyword)
+    index can drive the query: SQLite walks FTS5 matches in descending rowid order
+    and stops after a page, whether a term matches ten rows or a million.
+    """
+    analyses = SentimentAnalysis.__table__
+    keywords = AnalysisKeyword.__table__
+    backend = search_backend() if terms else None
+    query = select(SentimentAnalysis)
+    order_key = analyses.c.id
+
+    if backend == 'fts5':
+        fts = table(FTS_TABLE, column('rowid'), column(FTS_TABLE))
+        query = query.select_from(fts).join(SentimentAnalysis, analyses.c.id == fts.c.rowid)
+        query = query.where(fts.c[FTS_TABLE].match(fts5_query(terms)))
+        order_key = fts.c.rowid
+    elif backend == 'tsvector':
+        # websearch_to_tsquery parses quotes, "or" and -exclusions and never raises
+        raw = ' '.join(f'"{term}"' if quoted else term.rstrip('*') for term, quoted in terms)
+        # The configuration is inlined so the expression matches the GIN index
+        config = literal_column(f"'{PG_TS_CONFIG}'::regconfig")
+        query = query.where(func.to_tsvector(config, analyses.c.text)
+                            .bool_op('@@')(func.websearch_to_tsquery(config, raw)))
+    elif backend == 'like':
+        for term, _ in terms:
+            term = term.rstrip('*').replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            query = query.where(analyses.c.text.ilike(f'%{term}%', escape='\\'))
+
+    if 'keyword' in filters:
+        keyword_id = (select(Keyword.__table__.c.id)
+                      .where(Keyword.__table__.c.text == filters['keyword']).scalar_subquery())
+        if terms:
+            # Probe the (analysis_id, keyword_id) primary key for each text match
+            query = query.where(select(keywords.c.analysis_id).where(
+                keywords.c.analysis_id == analyses.c.id, keywords.c.keyword_id == keyword_id
+            ).exists())
+        else:
+            # Walk the (user_id, keyword_id, analysis_id) index newest first
+            query = query.join(keywords, keywords.c.analysis_id == analyses.c.id).where(
+                keywords.c.user_id == user_id, keywords.c.keyword_id == keyword_id)
+            order_key = keywords.c.analysis_id
+
+    query = filter_analyses(query.where(analyses.c.user_id == user_id), filters)
+    if cursor:
+        query = query.where(order_key < decode_id_cursor(cursor))
+
+    # Fetch one extra row to learn whether another page exists
+    items = db.session.scalars(query.order_by(order_key.desc()).limit(per_page + 1)).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_id_cursor(items[-1].id)
+    return KeysetPage(items, None, per_page, next_cursor=next_cursor, cursor=cursor)
+
+
+def filter_analyses(query, filters):
+    """Apply parse_filter_args filters to a query over sentiment_analysis"""
+    analyses = SentimentAnalysis.__table__
+    if 'sentiment' in filters:
+        query = query.where(analyses.c.sentiment == filters['sentiment'])
+    if 'start' in filters:
+        query = query.where(analyses.c.created_at >= filters['start'])
+    if 'end' in filters:
+        # End date is inclusive
+        query = query.where(analyses.c.created_at < filters['end'] + timedelta(days=1))
+    return query
+
+
+def top_keywords(user_id, filters, limit=20):
+    """A user's most frequent keywords as [{keyword, count, analyses}], aggregated in SQL.
+
+    count sums keyword occurrences and analyses counts the analyses mentioning
+    it. Unfiltered totals come from the (user_id, keyword_id, analysis_id, count)
+    index alone. With sentiment or date filters the matching analysis ids come
+    from the analysis indexes and each one's keywords from the primary key, so
+    the work follows the rows in range rather than the user's whole history.
+    """
+    analyses = SentimentAnalysis.__table__
+    keywords = AnalysisKeyword.__table__
+    dictionary = Keyword.__table__
+    total = func.sum(keywords.c.count).label('count')
+    ranked = select(keywords.c.keyword_id, total, func.count().label('analyses'))
+    if filters:
+        matching = filter_analyses(select(analyses.c.id).where(analyses.c.user_id == user_id), filters)
+        ranked = ranked.where(keywords.c.analysis_id.in_(matching))
+    else:
+        ranked = ranked.where(keywords.c.user_id == user_id)
+    ranked = (ranked.group_by(keywords.c.keyword_id)
+              .order_by(total.desc(), keywords.c.keyword_id)
+              .limit(limit)
+              .subquery())
+
+    rows = db.session.execute(
+        select(dictionary.c.text, ranked.c.count, ranked.c.analyses)
+        .join(ranked, ranked.c.keyword_id == dictionary.c.id)
+        .order_by(ranked.c.count.desc(), ranked.c.keyword_id)
+    )
+    return [{'keyword': keyword, 'count': count, 'analyses': analysis_count}
+            for keyword, count, analysis_count in rows]
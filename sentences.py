@@ -0,0 +1,85 @@
+import base64
+import re
+import numpy as np
+
+# Sentence ends at . ! ? (or runs of them) followed by whitespace and a capital, digit or
+# quote, so "e.g. this" and "3.5 stars" stay in one sentence; newlines always split
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(“‘])|\s*\n\s*')
+
+SENTENCE_WEIGHTINGS = ('mean', 'length', 'intensity', 'recency')
+
+# Packed layout per row: uint32 count, count x (uint32 start, uint32 end),
+# count x (float16 polarity, float16 subjectivity); base64 so it fits a text column
+_SPAN_TYPE = np.dtype('<u4')
+_SCORE_TYPE = np.dtype('<f2')
+
+
+def split_sentences(text):
+    """Return (start, end) character spans of the non-empty sentences in text"""
+    spans = []
+    start = 0
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        if text[start:match.start()].strip():
+            spans.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text.rstrip())))
+    return spans
+
+
+def sentence_weights(weighting, token_counts, polarities, subjectivities, positions):
+    """Per-sentence weights for aggregating sentences into their document.
+
+    mean weighs sentences equally, length by token count, intensity by how polar
+    each sentence is (so strong opinions outweigh filler), and recency increasingly
+    towards the end of each document, where reviews tend to conclude. Sentences
+    without any opinion words get no weight, as words do at document level.
+    """
+    if weighting == 'mean':
+        weights = np.ones(len(token_counts))
+    elif weighting == 'length':
+        weights = np.maximum(token_counts, 1).astype(np.float64)
+    elif weighting == 'intensity':
+        weights = np.abs(polarities) + 0.05
+    elif weighting == 'recency':
+        weights = positions + 1.0
+    else:
+        raise ValueError(f'Unknown sentence weighting: {weighting}')
+    return weights * ((polarities != 0) | (subjectivities != 0))
+
+
+def aggregate(document_index, count, weights, polarities, subjectivities):
+    """Weighted mean polarity and subjectivity per document"""
+    total = np.bincount(document_index, weights=weights, minlength=count)
+    divisor = np.where(total > 0, total, 1.0)
+    polarity = np.bincount(document_index, weights=weights * polarities, minlength=count) / divisor
+    subjectivity = np.bincount(document_index, weights=weights * subjectivities,
+                               minlength=count) / divisor
+    return polarity, subjectivity
+
+
+def pack_sentence_scores(spans, polarities, subjectivities):
+    """Pack one document's sentence spans and scores into a compact base64 string"""
+    header = np.array([len(spans)], dtype=_SPAN_TYPE)
+    span_array = np.array(spans, dtype=_SPAN_TYPE).reshape(-1)
+    scores = np.column_stack((polarities, subjectivities)).astype(_SCORE_TYPE).reshape(-1)
+    return base64.b64encode(header.tobytes() + span_array.tobytes() + scores.tobytes()).decode('ascii')
+
+
+def unpack_sentence_scores(packed, text=None):
+    """Decode a packed string into sentence dicts, with the sentence text when given"""
+    if not packed:
+        return []
+    raw = base64.b64decode(packed)
+    count = int(np.frombuffer(raw, dtype=_SPAN_TYPE, count=1)[0])
+    spans = np.frombuffer(raw, dtype=_SPAN_TYPE, count=2 * count, offset=4).reshape(-1, 2)
+    scores = np.frombuffer(raw, dtype=_SCORE_TYPE, count=2 * count,
+                           offset=4 + 8 * count).reshape(-1, 2)
+    sentences = []
+    for (start, end), (polarity, subjectivity) in zip(spans.tolist(), scores.tolist()):
+        sentence = {'start': start, 'end': end,
+                    'polarity': round(polarity, 3), 'subjectivity': round(subjectivity, 3)}
+        if text is not None:
+            sentence['text'] = text[start:end]
+        sentences.append(sentence)
+    return sentences
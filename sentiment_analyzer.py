@@ -1,61 +1,195 @@
 import json
 import re
-from textblob import TextBlob
-from collections import Counter
+from keyword_extractors import STOP_WORDS, get_keyword_extractor
+from metrics import TEXTS_ANALYZED, stage_timer
+from sentiment_backends import SENTIMENT_BACKENDS, get_backend
 
 class SentimentAnalyzer:
-    def __init__(self):
-        self.positive_threshold = 0.1
-        self.negative_threshold = -0.1
+    def __init__(self, cache=None, keyword_mode='fast', sentence_weighting='length', backend='textblob'):
+        if backend not in SENTIMENT_BACKENDS:
+            raise ValueError(f'Unknown sentiment backend: {backend}')
+        self.cache = cache  # optional ResultCache shared across calls
+        self.keyword_mode = keyword_mode  # 'fast' or 'accurate' (TextBlob noun phrases)
+        self.keyword_extractor = get_keyword_extractor(keyword_mode)
+        self.sentence_weighting = sentence_weighting  # default for sentence-level mode
+        self.backend = backend  # default scoring backend; calls may pick another
     
-    def analyze_text(self, text):
-        """Analyze sentiment of given text"""
+    def analyze_text(self, text, keywords=True, sentences=False, weighting=None, backend=None):
+        """Analyze sentiment of given text; keywords=False skips keyword extraction"""
         if not text or not text.strip():
             return None
         
+        if sentences:
+            # Sentence scoring is batched even for one text
+            return self.analyze_batch([text], keywords, sentences=True, weighting=weighting,
+                                      backend=backend)[0]
+        
+        backend = self.get_backend(backend)
+        TEXTS_ANALYZED.inc(path='single')
+        
         # Clean text
-        cleaned_text = self._clean_text(text)
+        with stage_timer('clean'):
+            cleaned_text = self._clean_text(text)
+        
+        if self.cache is not None:
+            key = self.cache.make_key(cleaned_text, self._cache_namespace(keywords, backend))
+            cached = self.cache.get(key)
+            if cached is not None:
+                cached['text'] = text
+                return cached
+            result = self._analyze_cleaned(text, cleaned_text, keywords, backend)
+            self.cache.put(key, result)
+            return result
+        
+        return self._analyze_cleaned(text, cleaned_text, keywords, backend)
+    
+    def _analyze_cleaned(self, text, cleaned_text, keywords, backend):
+        """Run one backend on already cleaned text"""
+        with stage_timer('sentiment'):
+            polarity, subjectivity, blob = backend.analyze(cleaned_text)
+        
+        # Extract keywords
+        extracted = None
+        if keywords:
+            with stage_timer('keywords'):
+                extracted = self.keyword_extractor.extract(cleaned_text, blob)
         
-        # Create TextBlob object
-        blob = TextBlob(cleaned_text)
+        return self._build_result(text, polarity, subjectivity, extracted, backend)
+    
+    def analyze_batch(self, texts, keywords=True, sentences=False, weighting=None, backend=None):
+        """Analyze sentiment for multiple texts in one vectorized pass.
+        
+        With sentences=True every sentence is scored in the same pass and the document
+        score is their weighted mean (see sentences.SENTENCE_WEIGHTINGS).
+        """
+        texts = [text for text in texts if text and text.strip()]
+        if not texts:
+            return []
+        backend = self.get_backend(backend)
+        if sentences:
+            from sentences import SENTENCE_WEIGHTINGS
+            weighting = weighting or self.sentence_weighting
+            if weighting not in SENTENCE_WEIGHTINGS:
+                raise ValueError(f'Unknown sentence weighting: {weighting}')
+        TEXTS_ANALYZED.inc(len(texts), path='sentences' if sentences else 'batch')
         
-        # Get polarity and subjectivity
-        sentiment_obj = blob.sentiment
-        polarity = sentiment_obj.polarity
-        subjectivity = sentiment_obj.subjectivity
+        with stage_timer('clean'):
+            cleaned_texts = [self._clean_text(text) for text in texts]
+        if self.cache is None:
+            return self._score_batch(texts, cleaned_texts, keywords, sentences, weighting, backend)
         
-        # Determine sentiment category
-        if polarity > self.positive_threshold:
-            sentiment = 'positive'
-        elif polarity < self.negative_threshold:
-            sentiment = 'negative'
+        # Score each distinct uncached text once, then fill results in input order.
+        # Sentence spans index the original text, so that mode keys on it uncleaned.
+        namespace = self._cache_namespace(keywords, backend)
+        if sentences:
+            namespace = f'{namespace}:sentences:{weighting}'
+        key_texts = texts if sentences else cleaned_texts
+        keys = [self.cache.make_key(key_text, namespace) for key_text in key_texts]
+        results = [None] * len(texts)
+        pending = {}
+        for i, key in enumerate(keys):
+            if key in pending:
+                pending[key].append(i)
+                self.cache.record_hit()
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                cached['text'] = texts[i]
+                results[i] = cached
+            else:
+                pending[key] = [i]
+        
+        if pending:
+            first = [positions[0] for positions in pending.values()]
+            scored = self._score_batch([texts[i] for i in first],
+                                       [cleaned_texts[i] for i in first], keywords,
+                                       sentences, weighting, backend)
+            self.cache.put_many(zip(pending, scored))
+            for positions, result in zip(pending.values(), scored):
+                for i in positions:
+                    results[i] = dict(result, text=texts[i])
+        return results
+    
+    def _score_batch(self, texts, cleaned_texts, keywords, sentences, weighting, backend):
+        """Tokenize and score cleaned texts with one backend"""
+        packed = [None] * len(texts)
+        with stage_timer('sentiment'):
+            if sentences:
+                polarities, subjectivities, packed = self._score_sentences(texts, weighting, backend)
+            else:
+                token_lists = [backend.tokenize(cleaned) for cleaned in cleaned_texts]
+                polarities, subjectivities = backend.score(token_lists)
+        
+        if keywords:
+            extract = self.keyword_extractor.extract
+            with stage_timer('keywords'):
+                extracted = [extract(cleaned) for cleaned in cleaned_texts]
         else:
-            sentiment = 'neutral'
+            extracted = [None] * len(texts)
+        
+        return [self._build_result(text, polarity, subjectivity, text_keywords, backend, sentence_scores)
+                for text, polarity, subjectivity, text_keywords, sentence_scores
+                in zip(texts, polarities.tolist(), subjectivities.tolist(), extracted, packed)]
+    
+    def _score_sentences(self, texts, weighting, backend):
+        """Score every sentence of every text in one backend call, then aggregate per text"""
+        import numpy as np
+        from sentences import aggregate, pack_sentence_scores, sentence_weights, split_sentences
         
-        # Calculate confidence score (0-1)
-        confidence = abs(polarity)
+        token_lists = []
+        document_index = []
+        positions = []
+        spans_per_text = []
+        for i, text in enumerate(texts):
+            spans = split_sentences(text) or [(0, len(text))]
+            spans_per_text.append(spans)
+            for position, (start, end) in enumerate(spans):
+                token_lists.append(backend.tokenize(self._clean_text(text[start:end])))
+                document_index.append(i)
+                positions.append(position)
         
-        # Extract keywords
-        keywords = self._extract_keywords(blob)
+        polarities, subjectivities = backend.score(token_lists)
+        document_index = np.array(document_index, dtype=np.int64)
+        weights = sentence_weights(weighting, np.array([len(t) for t in token_lists]),
+                                   polarities, subjectivities,
+                                   np.array(positions, dtype=np.float64))
+        doc_polarity, doc_subjectivity = aggregate(document_index, len(texts), weights,
+                                                   polarities, subjectivities)
         
+        bounds = np.concatenate(([0], np.cumsum([len(spans) for spans in spans_per_text])))
+        packed = [pack_sentence_scores(spans, polarities[bounds[i]:bounds[i + 1]],
+                                       subjectivities[bounds[i]:bounds[i + 1]])
+                  for i, spans in enumerate(spans_per_text)]
+        return doc_polarity, doc_subjectivity, packed
+    
+    def _cache_namespace(self, keywords, backend):
+        # Single and batch scores agree, so both paths share entries per backend and keyword mode;
+        # a new model version or changed thresholds start afresh
+        return (f"{backend.name}@{backend.version}/{backend.labeling()}:"
+                f"{self.keyword_mode if keywords else 'no-keywords'}")
+    
+    def get_backend(self, name=None):
+        """Shared scoring backend by name, defaulting to this analyzer's; loads it on first use"""
+        return get_backend(name or self.backend)
+    
+    def classify(self, polarity, subjectivity=0.0, backend=None):
+        """Map scores to a sentiment category using the backend's cut-offs"""
+        return self.get_backend(backend).classify(polarity, subjectivity)
+    
+    def _build_result(self, text, polarity, subjectivity, keywords, backend, sentence_scores=None):
+        """Assemble the result dict shared by single and batch analysis"""
         return {
             'text': text,
-            'sentiment': sentiment,
-            'confidence': confidence,
+            'sentiment': backend.classify(polarity, subjectivity),
+            'confidence': abs(polarity),
             'polarity': polarity,
             'subjectivity': subjectivity,
-            'keywords': json.dumps(keywords)
+            'keywords': json.dumps(keywords) if keywords is not None else None,
+            'sentence_scores': sentence_scores,  # packed per-sentence scores (sentence mode)
+            'backend': backend.name,
+            'model_version': backend.version
         }
     
-    def analyze_batch(self, texts):
-        """Analyze sentiment for multiple texts"""
-        results = []
-        for text in texts:
-            result = self.analyze_text(text)
-            if result:
-                results.append(result)
-        return results
-    
     def _clean_text(self, text):
         """Clean and preprocess text"""
         # Remove URLs
@@ -64,30 +198,9 @@ class SentimentAnalyzer:
         text = ' '.join(text.split())
         return text
     
-    def _extract_keywords(self, blob):
-        """Extract important keywords from text"""
-        # Get noun phrases
-        noun_phrases = list(blob.noun_phrases)
-        
-        # Get individual words (filter out stop words and short words)
-        words = [word.lower() for word in blob.words 
-                if len(word) > 3 and word.lower() not in self._get_stop_words()]
-        
-        # Combine and count
-        all_keywords = noun_phrases + words
-        keyword_counts = Counter(all_keywords)
-        
-        # Return top 10 keywords
-        return dict(keyword_counts.most_common(10))
-    
     def _get_stop_words(self):
         """Common stop words to filter out"""
-        return {
-            'this', 'that', 'with', 'have', 'will', 'from', 'they', 'know',
-            'want', 'been', 'good', 'much', 'some', 'time', 'very', 'when',
-            'come', 'here', 'just', 'like', 'long', 'make', 'many', 'over',
-            'such', 'take', 'than', 'them', 'well', 'were', 'what'
-        }
+        return STOP_WORDS
     
     def get_sentiment_distribution(self, analyses):
         """Calculate sentiment distribution from analysis results"""
@@ -0,0 +1,193 @@
+import threading
+
+
+class SentimentBackend:
+    """Scores cleaned texts as polarity in [-1, 1] and subjectivity in [0, 1].
+
+    Subclasses implement tokenize() and score(); analyze() and classify() have
+    threshold-based defaults. Models load in __init__, so instances come from
+    get_backend() and are shared per process.
+
+    version identifies the scores: it is stored with every row, and stored rows
+    whose version differs are re-scored by `flask reanalyze`. Labels are derived
+    from the stored scores, so threshold changes only need `flask relabel`.
+    """
+
+    name = None
+    version = '1'  # bump whenever the same text would get different scores
+    positive_threshold = 0.1
+    negative_threshold = -0.1
+
+    def tokenize(self, cleaned_text):
+        raise NotImplementedError
+
+    def score(self, token_lists):
+        """Return (polarity, subjectivity) NumPy arrays for a list of token lists"""
+        raise NotImplementedError
+
+    def analyze(self, cleaned_text):
+        """Score one text; returns (polarity, subjectivity, blob or None)"""
+        polarities, subjectivities = self.score([self.tokenize(cleaned_text)])
+        return float(polarities[0]), float(subjectivities[0]), None
+
+    def classify(self, polarity, subjectivity):
+        """Map scores to a sentiment category"""
+        if polarity > self.positive_threshold:
+            return 'positive'
+        elif polarity < self.negative_threshold:
+            return 'negative'
+        return 'neutral'
+
+    @classmethod
+    def labeling(cls):
+        """Identifies how classify() maps scores to labels under the current thresholds"""
+        return f'{cls.positive_threshold!r}/{cls.negative_threshold!r}'
+
+    @classmethod
+    def label_sql(cls, polarity, subjectivity):
+        """classify() as a SQL expression over stored score columns"""
+        from sqlalchemy import case
+        return case((polarity > cls.positive_threshold, 'positive'),
+                    (polarity < cls.negative_threshold, 'negative'),
+                    else_='neutral')
+
+
+class TextBlobBackend(SentimentBackend):
+    """TextBlob's pattern lexicon; batches go through the vectorized lexicon engine"""
+
+    name = 'textblob'
+
+    def __init__(self):
+        from importlib.metadata import version
+        from batch_engine import BatchSentimentEngine, tokenize
+        self.engine = BatchSentimentEngine()
+        self.tokenize = tokenize
+        # Scores follow TextBlob's bundled lexicon
+        self.version = f"{SentimentBackend.version}+textblob{version('textblob')}"
+
+    def score(self, token_lists):
+        return self.engine.score(token_lists)
+
+    def analyze(self, cleaned_text):
+        # The blob is handed on so 'accurate' keyword extraction doesn't parse the text twice
+        from textblob import TextBlob
+        blob = TextBlob(cleaned_text)
+        sentiment = blob.sentiment
+        return sentiment.polarity, sentiment.subjectivity, blob
+
+
+class VaderBackend(SentimentBackend):
+    """Pure-Python VADER-style rules tuned for social media: caps, emoji, boosters, "but" """
+
+    name = 'vader'
+    # VADER's conventional compound-score cut-offs
+    positive_threshold = 0.05
+    negative_threshold = -0.05
+
+    def __init__(self):
+        from vader_engine import VaderEngine, tokenize
+        self.engine = VaderEngine()
+        self.tokenize = tokenize
+
+    def score(self, token_lists):
+        import numpy as np
+        scores = [self.engine.scores(tokens) for tokens in token_lists]
+        polarities = np.fromiter((s[0] for s in scores), dtype=np.float64, count=len(scores))
+        subjectivities = np.fromiter((s[1] for s in scores), dtype=np.float64, count=len(scores))
+        return polarities, subjectivities
+
+
+class LinearBackend(SentimentBackend):
+    """Logistic regression over hashed word and bigram features (linear_model.py)"""
+
+    name = 'linear'
+    model_path = None  # LINEAR_MODEL_PATH; None loads linear_model.DEFAULT_MODEL_PATH
+
+    def __init__(self):
+        from linear_model import HashedLinearModel
+        from vader_engine import tokenize
+        self.model = HashedLinearModel.load(self.model_path)
+        self.tokenize = tokenize
+        # Retraining changes the scores, so the version is the weights' digest
+        self.version = self.model.digest()
+
+    def score(self, token_lists):
+        # Polarity is P(positive) - P(negative), subjectivity 1 - P(neutral)
+        probabilities = self.model.predict_proba(token_lists)
+        return probabilities[:, 2] - probabilities[:, 0], 1.0 - probabilities[:, 1]
+
+    def classify(self, polarity, subjectivity):
+        # Most probable class, recovered from the two scores
+        positive = (subjectivity + polarity) / 2
+        negative = (subjectivity - polarity) / 2
+        neutral = 1.0 - subjectivity
+        if positive > negative and positive > neutral:
+            return 'positive'
+        elif negative > positive and negative > neutral:
+            return 'negative'
+        return 'neutral'
+
+    @classmethod
+    def labeling(cls):
+        return 'argmax'
+
+    @classmethod
+    def label_sql(cls, polarity, subjectivity):
+        # classify() with the class probabilities expanded: positive beats negative
+        # when polarity > 0, and beats neutral when (s + p) / 2 > 1 - s
+        from sqlalchemy import and_, case
+        return case((and_(polarity > 0, 3 * subjectivity + polarity > 2), 'positive'),
+                    (and_(polarity < 0, 3 * subjectivity - polarity > 2), 'negative'),
+                    else_='neutral')
+
+
+SENTIMENT_BACKENDS = {
+    TextBlobBackend.name: TextBlobBackend,
+    VaderBackend.name: VaderBackend,
+    LinearBackend.name: LinearBackend,
+}
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def parse_thresholds(value):
+    """{backend: (positive, negative)} from 'textblob:0.1:-0.1,vader:0.05:-0.05'"""
+    thresholds = {}
+    for entry in filter(None, (part.strip() for part in (value or '').split(','))):
+        try:
+            name, positive, negative = entry.split(':')
+            positive, negative = float(positive), float(negative)
+        except ValueError:
+            raise ValueError(f'Sentiment thresholds must look like backend:positive:negative, not {entry!r}')
+        if name not in SENTIMENT_BACKENDS:
+            raise ValueError(f'Unknown sentiment backend: {name}')
+        if SENTIMENT_BACKENDS[name].labeling() == 'argmax':
+            raise ValueError(f'The {name} backend labels by its most probable class and has no thresholds')
+        if negative > positive:
+            raise ValueError(f'The negative threshold for {name} is above the positive one')
+        thresholds[name] = (positive, negative)
+    return thresholds
+
+
+def configure_backends(config):
+    """Apply analyzer config to the backends of this process: label thresholds
+    ({backend: (positive, negative)}) and the linear model file"""
+    for name, (positive, negative) in (config.get('SENTIMENT_THRESHOLDS') or {}).items():
+        backend = SENTIMENT_BACKENDS[name]
+        backend.positive_threshold = positive
+        backend.negative_threshold = negative
+    LinearBackend.model_path = config.get('LINEAR_MODEL_PATH')
+
+
+def get_backend(name):
+    """Return this process's shared backend instance for a registered name"""
+    backend = _backends.get(name)
+    if backend is None:
+        if name not in SENTIMENT_BACKENDS:
+            raise ValueError(f'Unknown sentiment backend: {name}')
+        with _lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = _backends[name] = SENTIMENT_BACKENDS[name]()
+    return backend
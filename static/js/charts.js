@@ -216,6 +216,32 @@ function initializeTrendChart(trendData) {
     window.trendChart = new Chart(ctx, config);
 }
 
+/**
+ * Load precomputed rollup buckets from the server and draw the trend chart
+ */
+function loadTrendChart(granularity = 'day', days = 30) {
+    const start = new Date(Date.now() - days * 24 * 60 * 60 * 1000).toISOString().slice(0, 19);
+    const params = new URLSearchParams({ granularity: granularity, start: start });
+    
+    return fetch(`/api/timeseries?${params}`)
+        .then(response => {
+            if (!response.ok) throw new Error(`Timeseries request failed: ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            const label = bucket => granularity === 'hour'
+                ? bucket.slice(5, 13).replace('T', ' ') + 'h'
+                : bucket.slice(0, 10);
+            initializeTrendChart({
+                labels: data.buckets.map(b => label(b.bucket)),
+                positive: data.buckets.map(b => b.positive),
+                neutral: data.buckets.map(b => b.neutral),
+                negative: data.buckets.map(b => b.negative)
+            });
+        })
+        .catch(error => console.error('Error loading trend chart:', error));
+}
+
 /**
  * Initialize confidence distribution chart (bar chart)
  */
@@ -484,6 +510,7 @@ document.addEventListener('DOMContentLoaded', initializeAllCharts);
 window.ChartUtils = {
     initializeDistributionChart,
     initializeTrendChart,
+    loadTrendChart,
     initializeConfidenceChart,
     createSentimentGauge,
     updateChartData,
@@ -18,6 +18,9 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Initialize enhanced file upload
     initializeEnhancedFileUpload();
+    
+    // Initialize background upload jobs
+    initializeUploadJobs();
 });
 
 /**
@@ -246,8 +249,9 @@ function showToast(message, type = 'info') {
             <strong class="me-auto">${type.charAt(0).toUpperCase() + type.slice(1)}</strong>
             <button type="button" class="btn-close" data-bs-dismiss="toast"></button>
         </div>
-        <div class="toast-body glass-card">${message}</div>
+        <div class="toast-body glass-card"></div>
     `;
+    toast.querySelector('.toast-body').textContent = message;
     
     document.body.appendChild(toast);
     
@@ -599,6 +603,119 @@ function updateFileDisplay(uploadArea, file) {
     }, 500);
 }
 
+/**
+ * Submit uploads as background jobs and poll their progress
+ */
+function initializeUploadJobs() {
+    const form = document.getElementById('uploadForm');
+    const container = document.getElementById('uploadJobs');
+    if (!form || !container) return;
+    
+    const pollInterval = 1000;
+    const polling = new Set();
+    
+    form.addEventListener('submit', function(e) {
+        e.preventDefault();
+        const submitBtn = form.querySelector('button[type="submit"]');
+        
+        fetch(form.action, {
+            method: 'POST',
+            headers: { 'Accept': 'application/json' },
+            body: new FormData(form)
+        })
+        .then(response => response.json())
+        .then(job => {
+            if (job.error) {
+                throw new Error(job.error);
+            }
+            form.dispatchEvent(new CustomEvent('upload:queued', { detail: job }));
+            showToast(`${job.filename} queued for analysis`, 'info');
+            renderJob(job);
+            pollJob(job.id);
+        })
+        .catch(error => {
+            showToast('Error uploading file: ' + error.message, 'error');
+        })
+        .finally(() => {
+            if (submitBtn) setLoadingState(submitBtn, false);
+        });
+    });
+    
+    // Resume polling for jobs still running from an earlier page load
+    fetch('/api/jobs', { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(data => {
+            data.jobs
+                .filter(job => job.status === 'queued' || job.status === 'running')
+                .forEach(job => {
+                    renderJob(job);
+                    pollJob(job.id);
+                });
+        })
+        .catch(error => console.warn('Unable to load upload jobs', error));
+    
+    function pollJob(jobId) {
+        if (polling.has(jobId)) return;
+        polling.add(jobId);
+        
+        const poll = () => {
+            fetch(`/api/jobs/${jobId}`, { headers: { 'Accept': 'application/json' } })
+                .then(response => response.json())
+                .then(job => {
+                    renderJob(job);
+                    if (job.status === 'completed') {
+                        polling.delete(jobId);
+                        showToast(`Analyzed ${job.saved_count} text entries from ${job.filename}`, 'success');
+                    } else if (job.status === 'failed') {
+                        polling.delete(jobId);
+                        showToast(`Error processing ${job.filename}: ${job.error}`, 'error');
+                    } else {
+                        setTimeout(poll, pollInterval);
+                    }
+                })
+                .catch(() => setTimeout(poll, pollInterval * 5));
+        };
+        poll();
+    }
+    
+    function renderJob(job) {
+        let item = document.getElementById(`job-${job.id}`);
+        if (!item) {
+            item = document.createElement('div');
+            item.id = `job-${job.id}`;
+            item.className = 'upload-job mb-2';
+            container.prepend(item);
+        }
+        
+        const barClass = {
+            completed: 'bg-success',
+            failed: 'bg-danger'
+        }[job.status] || 'progress-bar-striped progress-bar-animated';
+        
+        item.innerHTML = `
+            <div class="d-flex justify-content-between small mb-1">
+                <span><i class="fas fa-file-alt me-1"></i><span class="job-filename"></span></span>
+                <span class="text-muted job-detail"></span>
+            </div>
+            <div class="progress" style="height: 6px;">
+                <div class="progress-bar ${barClass}" role="progressbar" style="width: ${job.progress}%"></div>
+            </div>
+        `;
+        // File names and errors come from the user and the server, so they go in as text
+        item.querySelector('.job-filename').textContent = job.filename;
+        const detail = item.querySelector('.job-detail');
+        detail.textContent = `${job.status} \u00b7 `;
+        if (job.status === 'completed') {
+            const link = document.createElement('a');
+            link.href = '/results';
+            link.textContent = `${job.saved_count} saved`;
+            detail.append(link);
+        } else {
+            detail.append(job.status === 'failed' ? job.error || '' : `${job.processed} / ${job.total || '?'}`);
+        }
+    }
+}
+
 // Export functions for use in other scripts
 window.SentimentApp = {
     setLoadingState,
@@ -0,0 +1,34 @@
+from mmap_reader import MappedLines, read_range
+
+LINES = ['first line of the file', 'second line of the file', 'third line of the file',
+         'fourth line of the file']
+
+
+def write(tmp_path, data):
+    path = tmp_path / 'lines.txt'
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_line_endings(tmp_path):
+    for newline in (b'\n', b'\r\n', b'\r'):
+        path = write(tmp_path, newline.join(line.encode() for line in LINES) + newline)
+        with MappedLines(path) as lines:
+            assert list(lines.iter_texts()) == LINES
+            assert lines.position == lines.size
+
+
+def test_mixed_line_endings_and_no_final_newline(tmp_path):
+    path = write(tmp_path, b'first line of the file\r\nsecond line of the file\r'
+                           b'third line of the file\nfourth line of the file')
+    with MappedLines(path) as lines:
+        assert list(lines.iter_texts()) == LINES
+
+
+def test_split_on_carriage_returns(tmp_path):
+    path = write(tmp_path, b'\r'.join(line.encode() for line in LINES * 50) + b'\r')
+    with MappedLines(path) as lines:
+        ranges = lines.split(100)
+        assert len(ranges) > 1
+        assert all(lines._map[end - 1:end] == b'\r' for _, end in ranges)
+    assert [text for start, end in ranges for text in read_range(path, start, end)] == LINES * 50
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select
+from app import db
+from database import ROLLUP_GRANULARITIES, bucket_start
+from models import SentimentRollup
+
+BUCKET_WIDTHS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+
+# Default window per granularity when no start date is given
+DEFAULT_SPANS = {'hour': timedelta(days=2), 'day': timedelta(days=30)}
+
+# Largest number of buckets one request may cover (a leap year of days, ~3 months of hours)
+MAX_BUCKETS = 2200
+
+
+def parse_timeseries_args(args, now=None):
+    """Validate query parameters into (granularity, start, end, source_name)"""
+    granularity = args.get('granularity', 'day')
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(ROLLUP_GRANULARITIES)}")
+
+    now = now or datetime.utcnow()
+    bounds = {}
+    for name in ('start', 'end'):
+        value = args.get(name)
+        if value:
+            try:
+                bounds[name] = datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f'{name} must be an ISO date or datetime')
+            if bounds[name].tzinfo is not None:
+                # Stored timestamps and rollup buckets are naive UTC
+                bounds[name] = bounds[name].astimezone(timezone.utc).replace(tzinfo=None)
+
+    # End is inclusive of its whole bucket
+    end = bucket_start(bounds.get('end', now), granularity)
+    start = bucket_start(bounds.get('start', end - DEFAULT_SPANS[granularity]), granularity)
+    if start > end:
+        raise ValueError('start must not be after end')
+    if (end - start) / BUCKET_WIDTHS[granularity] + 1 > MAX_BUCKETS:
+        raise ValueError(f'Range covers more than {MAX_BUCKETS} {granularity} buckets')
+
+    return granularity, start, end, args.get('source_name')
+
+
+def load_timeseries(user_id, granularity, start, end, source_name=None):
+    """Read rollup buckets for a range, summed across sources unless one is named.
+
+    Returns one entry per bucket in the range, including empty ones, so charts
+    get a continuous axis.
+    """
+    table = SentimentRollup.__table__
+    query = select(
+        table.c.bucket,
+        func.sum(table.c.total), func.sum(table.c.positive),
+        func.sum(table.c.negative), func.sum(table.c.neutral),
+        func.sum(table.c.polarity_sum), func.sum(table.c.subjectivity_sum),
+    ).where(
+        table.c.user_id == user_id,
+        table.c.granularity == granularity,
+        table.c.bucket >= start,
+        table.c.bucket <= end,
+    ).group_by(table.c.bucket)
+    if source_name is not None:
+        query = query.where(table.c.source_name == source_name)
+
+    rows = {row[0]: row[1:] for row in db.session.execute(query)}
+
+    buckets = []
+    bucket, width = start, BUCKET_WIDTHS[granularity]
+    while bucket <= end:
+        total, positive, negative, neutral, polarity_sum, subjectivity_sum = \
+            rows.get(bucket, (0, 0, 0, 0, 0.0, 0.0))
+        buckets.append({
+            'bucket': bucket.isoformat(),
+            'total': total,
+            'positive': positive,
+            'negative': negative,
+            'neutral': neutral,
+            'avg_polarity': polarity_sum / total if total else None,
+            'avg_subjectivity': subjectivity_sum / total if total else None,
+        })
+        bucket += width
+    return buckets
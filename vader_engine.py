@@ -0,0 +1,178 @@
+import math
+import re
+
+# VADER's empirically derived constants (Hutto & Gilbert, 2014)
+BOOSTER_INCREMENT = 0.293
+CAPS_INCREMENT = 0.733
+NEGATION_SCALAR = -0.74
+NORMALIZE_ALPHA = 15
+
+# Intensifiers and dampeners: they add or take away intensity from the next opinion word
+BOOSTERS = dict.fromkeys((
+    'absolutely', 'amazingly', 'awfully', 'completely', 'considerably', 'decidedly',
+    'deeply', 'enormously', 'entirely', 'especially', 'exceptionally', 'extremely',
+    'fabulously', 'fully', 'greatly', 'hella', 'highly', 'hugely', 'incredibly',
+    'intensely', 'majorly', 'more', 'most', 'particularly', 'purely', 'quite', 'really',
+    'remarkably', 'so', 'substantially', 'super', 'thoroughly', 'totally', 'tremendously',
+    'truly', 'uber', 'unbelievably', 'unusually', 'utterly', 'very', 'way', 'soo', 'sooo',
+), BOOSTER_INCREMENT)
+BOOSTERS.update(dict.fromkeys((
+    'almost', 'barely', 'hardly', 'kinda', 'less', 'little', 'marginally', 'occasionally',
+    'partly', 'scarcely', 'slightly', 'somewhat', 'sorta',
+), -BOOSTER_INCREMENT))
+
+NEGATIONS = frozenset((
+    'aint', 'arent', 'cannot', 'cant', 'couldnt', 'didnt', 'doesnt', 'dont', 'hadnt',
+    'hasnt', 'havent', 'isnt', 'mightnt', 'mustnt', 'neither', 'neednt', 'never', 'no',
+    'none', 'nope', 'nor', 'not', 'nothing', 'nowhere', 'shouldnt', 'wasnt', 'werent',
+    'without', 'wont', 'wouldnt', 'rarely', 'seldom', 'despite',
+))
+
+# Valences on VADER's -4..4 scale for words the pattern lexicon lacks or scores oddly
+# in reviews and social media (slang, verbs of liking, product failures)
+SOCIAL_LEXICON = {
+    'love': 3.2, 'loved': 2.9, 'loves': 2.7, 'loving': 2.9, 'luv': 2.8, 'adore': 2.9,
+    'adores': 2.8, 'hate': -2.7, 'hated': -3.2, 'hates': -1.9, 'like': 1.5, 'liked': 1.8,
+    'enjoy': 2.2, 'enjoyed': 2.3, 'recommend': 1.5, 'recommended': 1.6, 'thanks': 1.9,
+    'thank': 1.5, 'thx': 1.5, 'kudos': 2.3, 'bravo': 2.7, 'yay': 2.4, 'woohoo': 2.3,
+    'yesss': 2.0, 'lol': 1.8, 'lmao': 2.0, 'rofl': 2.2, 'fav': 2.0, 'fave': 1.9,
+    'gr8': 2.5, 'impressed': 2.0, 'obsessed': 1.6, 'ok': 0.9, 'okay': 0.9, 'meh': -0.3,
+    'ugh': -1.8, 'wtf': -2.8, 'smh': -1.3, 'fml': -2.3, 'nooo': -1.6, 'sucks': -1.5,
+    'suck': -1.5, 'scam': -2.8, 'ripoff': -2.3, 'garbage': -2.0, 'trash': -1.9,
+    'junk': -1.7, 'waste': -1.8, 'wasted': -1.9, 'broke': -1.5, 'fail': -2.5,
+    'fails': -2.0, 'failed': -2.3, 'failing': -2.3, 'crash': -1.7, 'crashes': -1.7,
+    'crashed': -1.7, 'problem': -1.7, 'problems': -1.7, 'issue': -0.6, 'issues': -0.6,
+    'bug': -1.0, 'bugs': -1.2, 'buggy': -1.8, 'lame': -1.8, 'annoyed': -1.6,
+    'annoying': -1.7, 'frustrated': -2.0, 'frustrating': -1.9, 'disappointed': -1.9,
+    'letdown': -1.9, 'regret': -1.9, 'worthless': -1.9, 'refused': -1.2, 'leaks': -1.2,
+    'leaked': -1.2, 'rude': -2.0, 'dirty': -1.9, 'filthy': -2.4, 'delighted': 2.8,
+    'thrilled': 2.5, 'smile': 1.5, 'worth': 0.9, 'hassle': -1.4, 'ruined': -2.4,
+}
+
+EMOTICONS = {
+    ':)': 2.0, ':-)': 2.0, '=)': 2.0, ':]': 1.8, ':d': 2.3, ':-d': 2.3, 'xd': 2.0,
+    ';)': 1.4, ';-)': 1.4, ':p': 1.0, '<3': 1.9, ':(': -1.9, ':-(': -1.9, ":'(": -2.2,
+    ':[': -1.8, ':/': -1.0, ':-/': -1.0, ':|': -0.4, 'd:': -1.6, '</3': -2.6,
+}
+
+EMOJI = {
+    '😀': 2.5, '😃': 2.5, '😄': 2.6, '😁': 2.4, '😆': 2.3, '😊': 2.4, '🙂': 1.5,
+    '😍': 3.0, '🥰': 3.0, '😘': 2.3, '😂': 1.8, '🤣': 2.0, '😉': 1.2, '😎': 1.8,
+    '👍': 2.0, '👏': 2.0, '🙌': 2.0, '💯': 2.0, '👌': 1.8, '🔥': 1.5, '🎉': 2.3,
+    '✨': 1.0, '⭐': 1.5, '🌟': 1.8, '❤': 3.0, '💕': 2.8, '💖': 2.8, '💗': 2.7,
+    '😐': -0.3, '😑': -0.5, '🙄': -1.5, '😒': -1.8, '😞': -2.0, '😔': -1.8, '😢': -2.2,
+    '😭': -2.4, '😡': -3.0, '😠': -2.7, '🤬': -3.2, '👎': -2.0, '💩': -2.2, '🤮': -2.8,
+    '🤢': -2.3, '😤': -1.8, '😩': -2.0, '😫': -2.0, '💔': -2.6, '😬': -0.8, '😱': -1.8,
+}
+
+_EMOTICON_PATTERN = '|'.join(re.escape(e) for e in sorted(EMOTICONS, key=len, reverse=True))
+# Emoticons (before punctuation is split off), emoji, ! and ?, clause punctuation, words
+TOKEN_PATTERN = re.compile(
+    rf"(?<!\w)(?:{_EMOTICON_PATTERN})(?![\w)(])|[\U0001F300-\U0001FAFF☀-➿⭐]|[!?.,;]"
+    r"|[#@]?\w[\w'’\-]*",
+    re.IGNORECASE
+)
+_ELONGATED = re.compile(r'(\w)\1{2,}')
+_NOT_WORD = frozenset('!?.,;')
+
+
+def tokenize(text):
+    """Split text into case-preserving words, emoticons, emoji and ! ? . , ; marks"""
+    return TOKEN_PATTERN.findall(text)
+
+
+def build_lexicon():
+    """Word valences on VADER's scale: the pattern lexicon rescaled, plus SOCIAL_LEXICON"""
+    from textblob.en import sentiment as pattern_sentiment
+
+    lexicon = {}
+    for word, tags in pattern_sentiment.items():
+        polarity = tags[None][0]
+        if polarity and word not in BOOSTERS and word not in NEGATIONS and ' ' not in word:
+            lexicon[word] = round(polarity * 4, 3)
+    lexicon.update(SOCIAL_LEXICON)
+    lexicon.update(EMOTICONS)
+    lexicon.update(EMOJI)
+    return lexicon
+
+
+class VaderEngine:
+    """Rule-based scorer in the style of VADER, aware of caps, emoji, negation and boosters"""
+
+    def __init__(self, lexicon=None):
+        self.lexicon = lexicon if lexicon is not None else build_lexicon()
+
+    def valence(self, token):
+        """Lexicon valence of a token and whether it was stretched ("sooo goood")"""
+        lower = token.lower().lstrip('#').replace('’', "'")
+        value = self.lexicon.get(lower)
+        if value is None and _ELONGATED.search(lower):
+            squeezed = _ELONGATED.sub(r'\1\1', lower)
+            value = self.lexicon.get(squeezed, self.lexicon.get(_ELONGATED.sub(r'\1', lower)))
+            return value, value is not None
+        return value, False
+
+    def scores(self, tokens):
+        """Return (compound, subjectivity) for one tokenized text"""
+        words = [t for t in tokens if t not in _NOT_WORD]
+        lowered = [w.lower().replace('’', "'") for w in words]
+        cased = [w for w in words if w.isalpha()]
+        # Caps only emphasize when the text mixes case ("this is AMAZING")
+        caps_differ = any(w.isupper() for w in cased) and not all(w.isupper() for w in cased)
+
+        sentiments = []
+        for i, word in enumerate(words):
+            value, stretched = self.valence(word)
+            if value is None or lowered[i] in BOOSTERS:
+                sentiments.append(0.0)
+                continue
+            if stretched:
+                value += math.copysign(BOOSTER_INCREMENT, value)
+            if caps_differ and word.isupper() and len(word) > 1:
+                value += math.copysign(CAPS_INCREMENT, value)
+            for distance, damping in ((1, 1.0), (2, 0.95), (3, 0.9)):
+                if i < distance:
+                    break
+                previous = lowered[i - distance]
+                boost = BOOSTERS.get(previous)
+                if boost:
+                    if caps_differ and words[i - distance].isupper():
+                        boost += math.copysign(CAPS_INCREMENT, boost)
+                    # Boosters push away from zero, dampeners towards it
+                    value += math.copysign(1.0, value) * boost * damping
+                if _is_negation(previous):
+                    value *= NEGATION_SCALAR
+            sentiments.append(value)
+
+        # Contrast: what follows "but" outweighs what precedes it
+        if 'but' in lowered:
+            pivot = lowered.index('but')
+            sentiments = ([s * 0.5 for s in sentiments[:pivot]] + [sentiments[pivot]] +
+                          [s * 1.5 for s in sentiments[pivot + 1:]])
+
+        if not sentiments:
+            return 0.0, 0.0
+        total = sum(sentiments)
+        emphasis = min(tokens.count('!'), 4) * 0.292
+        questions = tokens.count('?')
+        if questions > 1:
+            emphasis += questions * 0.18 if questions <= 3 else 0.96
+        if total > 0:
+            total += emphasis
+        elif total < 0:
+            total -= emphasis
+        compound = max(-1.0, min(1.0, total / math.sqrt(total * total + NORMALIZE_ALPHA)))
+
+        positive = sum(s + 1 for s in sentiments if s > 0)
+        negative = sum(1 - s for s in sentiments if s < 0)
+        neutral = sum(1 for s in sentiments if s == 0)
+        if positive > negative:
+            positive += emphasis
+        elif negative > positive:
+            negative += emphasis
+        opinionated = positive + negative
+        return compound, opinionated / (opinionated + neutral) if opinionated else 0.0
+
+
+def _is_negation(word):
+    return word in NEGATIONS or word.replace("'", '') in NEGATIONS or word.endswith("n't")